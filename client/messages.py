@@ -92,6 +92,26 @@ class JobInfoMessage(Message):
         return self.content["tasks"]
 
 
+class JobPredictionMessage(Message):
+
+    def __init__(self, unique_id: str, jobid: str, ttf: float,
+                 tasks: Dict[str, float]) -> None:
+        """
+        ttf is predicted seconds to finish the job and
+        tasks are predicted seconds to finish each task,
+        -1 if it's unknown.
+        """
+        Message.__init__(self, "job.msg", {
+            "subtype": "prediction",
+            "message": {
+                "unique_id": unique_id,
+                "jobid": jobid,
+                "ttf": ttf,
+                "tasks": tasks
+            }
+        })
+
+
 class JobStateChangeMessage(Message):
 
     def __init__(self, unique_id: str, jobid: str,
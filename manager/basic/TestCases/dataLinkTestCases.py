@@ -21,11 +21,14 @@
 # SOFTWARE.
 
 
+import os
 import typing
+import threading
 import unittest
 import asyncio
 from manager.basic.dataLink import DataLinker, DataLink, DataLinkNotify
-from manager.basic.letter import sending, NotifyLetter
+from manager.basic.letter import sending, sending_stream, NotifyLetter, \
+    BinaryStreamLetter
 
 
 async def data_processor(dl: DataLink, data: typing.Any, args: typing.Any) -> None:
@@ -38,6 +41,22 @@ async def data_processor(dl: DataLink, data: typing.Any, args: typing.Any) -> No
         dl.notify(notify)
 
 
+async def stream_processor(dl: DataLink, letter: typing.Any,
+                           args: typing.Any) -> None:
+    if isinstance(letter, BinaryStreamLetter):
+        stored = []  # type: typing.List[bytes]
+        await letter.storeInto(stored.append)
+        dl.notify(DataLinkNotify("Stream", len(b"".join(stored))))
+    else:
+        dl.notify(DataLinkNotify("Stream", letter.getHeader('ident')))
+
+
+async def pid_processor(dl: DataLink, letter: typing.Any,
+                        args: typing.Any) -> None:
+    await letter.skip()
+    dl.notify(DataLinkNotify("Stream", os.getpid()))
+
+
 class DataLinkerTestCases(unittest.IsolatedAsyncioTestCase):
 
     async def asyncSetUp(self) -> None:
@@ -75,3 +94,95 @@ class DataLinkerTestCases(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(["SendDone"], notify_content)
 
         self.dlinker.stop()
+
+    async def test_DataLinker_TCP_Stream(self) -> None:
+        # Setup
+        notify_content = []  # type: typing.List
+
+        path = "./stream_file"
+        with open(path, "wb") as f:
+            f.write(os.urandom(3 * 2 ** 20 + 7))
+
+        self.dlinker.addDataLink("127.0.0.1", 3501, DataLink.TCP_DATALINK,
+                                 stream_processor, None)
+        self.dlinker.addNotify("Stream", lambda msg, arg: notify_content.append(msg), None)
+
+        # Exercise
+        self.dlinker.start()
+        await asyncio.sleep(1)
+
+        try:
+            r, w = await asyncio.open_connection("127.0.0.1", 3501)
+            await sending_stream(w, path, "tid", "v1", "stream_file")
+            # Letters after the file are still in sync.
+            await sending(w, NotifyLetter("Done", "Done", {}))
+            await asyncio.sleep(4)
+
+            # Verify
+            self.assertEqual([3 * 2 ** 20 + 7, "Done"], notify_content)
+        finally:
+            self.dlinker.stop()
+            os.remove(path)
+
+    async def test_DataLinker_NotifyInLoop(self) -> None:
+        # Setup
+        notified = asyncio.Event()
+        threads = []  # type: typing.List
+
+        def cb(msg: typing.Any, arg: typing.Any) -> None:
+            threads.append(threading.get_ident())
+            notified.set()
+
+        self.dlinker.addDataLink("127.0.0.1", 3503, DataLink.TCP_DATALINK,
+                                 data_processor, [])
+        self.dlinker.addNotify("Data", cb, None)
+
+        self.dlinker.start()
+        await asyncio.sleep(1)
+
+        try:
+            r, w = await asyncio.open_connection("127.0.0.1", 3503)
+
+            # Exercise
+            await sending(w, NotifyLetter("9", "9", {}))
+
+            # Verify
+            # Notify is dealt in this loop without polling.
+            await asyncio.wait_for(notified.wait(), timeout=0.5)
+            self.assertEqual([threading.get_ident()], threads)
+        finally:
+            self.dlinker.stop()
+
+    async def test_DataLinker_MultiProcess(self) -> None:
+        # Setup
+        pids = []  # type: typing.List
+
+        path = "./stream_file_mp"
+        with open(path, "wb") as f:
+            f.write(os.urandom(2 ** 16))
+
+        self.dlinker.addDataLink("127.0.0.1", 3504, DataLink.TCP_DATALINK,
+                                 pid_processor, None, procs=3)
+        self.dlinker.addNotify("Stream", lambda msg, arg: pids.append(msg), None)
+
+        self.dlinker.start()
+        await asyncio.sleep(1)
+
+        # Exercise
+        async def upload(n: int) -> None:
+            r, w = await asyncio.open_connection("127.0.0.1", 3504)
+            await sending_stream(w, path, "tid_" + str(n), "v1", "file")
+            w.close()
+
+        try:
+            await asyncio.gather(*[upload(n) for n in range(12)])
+            await asyncio.sleep(1)
+
+            # Verify
+            # Uploads are accepted by several processes and
+            # notifies of them are merged.
+            self.assertEqual(12, len(pids))
+            self.assertGreater(len(set(pids)), 1)
+        finally:
+            self.dlinker.stop()
+            os.remove(path)
@@ -0,0 +1,172 @@
+# MIT License
+#
+# Copyright (c) 2020 Gcom
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# deltaTestCases.py
+
+import io
+import os
+import asyncio
+import hashlib
+import unittest
+import typing as T
+
+from manager.basic.letter import BinaryStreamLetter, sending_file, \
+    querying_delta, file_checksum, receving
+from manager.basic.delta import signature, block_size, delta, patch, \
+    DELTA_CORRUPTED, SAMPLE_MIN
+
+
+class DeltaTestCases(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self) -> None:
+        self.base = os.urandom(2 ** 20)
+        self.basePath = "./delta_base"
+        self.path = "./delta_file"
+        self.rebuilt = "./delta_rebuilt"
+
+        with open(self.basePath, "wb") as f:
+            f.write(self.base)
+
+    async def asyncTearDown(self) -> None:
+        for p in [self.basePath, self.path, self.rebuilt]:
+            if os.path.exists(p):
+                os.remove(p)
+
+    def write(self, content: bytes) -> None:
+        with open(self.path, "wb") as f:
+            f.write(content)
+
+    def roundtrip(self, content: bytes,
+                  ratio: T.Optional[float] = None) -> T.Optional[int]:
+        self.write(content)
+        sig = signature(self.basePath, block_size(len(content)))
+
+        d = io.BytesIO()
+        size = delta(self.path, sig, d, ratio)
+        if size is None:
+            return None
+        self.assertEqual(size, len(d.getvalue()))
+
+        d.seek(0)
+        out = io.BytesIO()
+        checksum = patch(self.basePath, d, out)
+
+        self.assertEqual(content, out.getvalue())
+        self.assertEqual(hashlib.sha256(content).hexdigest(), checksum)
+
+        return size
+
+    async def test_Delta_Identical(self) -> None:
+        size = T.cast(int, self.roundtrip(self.base))
+        self.assertLess(size, 64)
+
+    async def test_Delta_Changed(self) -> None:
+        # Setup
+        content = bytearray(self.base)
+        content[1000:1010] = b"x" * 10
+        content = content[:300000] + b"inserted" + content[300000:-77]
+
+        # Exercise
+        size = T.cast(int, self.roundtrip(bytes(content) + b"tail"))
+
+        # Verify
+        self.assertLess(size, 4 * block_size(len(content)))
+
+    async def test_Delta_Unrelated(self) -> None:
+        content = os.urandom(2 ** 20)
+
+        self.assertIsNone(self.roundtrip(content, ratio=0.5))
+        self.assertIsNotNone(self.roundtrip(content))
+
+    async def test_Delta_Sampled(self) -> None:
+        # Big file that not related to the base is given
+        # up by samples.
+        self.assertIsNone(self.roundtrip(os.urandom(SAMPLE_MIN), ratio=0.5))
+
+        size = T.cast(int, self.roundtrip(
+            self.base * (SAMPLE_MIN // len(self.base)), ratio=0.5))
+        self.assertLess(size, SAMPLE_MIN // 100)
+
+    async def test_Delta_Corrupted(self) -> None:
+        # Setup
+        self.write(self.base)
+        d = io.BytesIO()
+        delta(self.path, signature(self.basePath, 4096), d)
+
+        # Exercise
+        with self.assertRaises(DELTA_CORRUPTED):
+            patch(self.basePath, io.BytesIO(d.getvalue()[:-1]), io.BytesIO())
+
+    async def receiver(self, reader: asyncio.StreamReader,
+                       writer: asyncio.StreamWriter) -> None:
+        query = T.cast(BinaryStreamLetter, await receving(reader))
+        query.bindStream(reader, writer)
+        self.assertTrue(query.acceptDelta())
+        await query.answerDelta("base", signature(
+            self.basePath, block_size(query.getSize())))
+
+        letter = T.cast(BinaryStreamLetter, await receving(reader))
+        letter.bindStream(reader, writer)
+        self.assertEqual("base", letter.getBase())
+
+        await letter.resumeAt(0)
+        d = io.BytesIO()
+        async for chunk in letter.chunks():
+            d.write(chunk)
+        d.seek(0)
+
+        with open(self.rebuilt, "wb") as out:
+            checksum = patch(self.basePath, d, out)
+        await letter.confirm(checksum == letter.getChecksum())
+
+    async def test_Delta_Transfer(self) -> None:
+        # Setup
+        content = self.base[:5000] + os.urandom(100) + self.base[5000:]
+        self.write(content)
+        size, checksum = file_checksum(self.path)
+        letter = BinaryStreamLetter("tid", "file", "v2", size, checksum,
+                                    resume=True)
+
+        server = await asyncio.start_server(
+            self.receiver, "127.0.0.1", 3507)
+        r, w = await asyncio.open_connection("127.0.0.1", 3507)
+
+        # Exercise
+        have, base, sig = await querying_delta(w, r, letter)
+        self.assertFalse(have)
+
+        with open(self.path + ".delta", "wb") as d:
+            dsize = delta(self.path, T.cast(bytes, sig), d)
+        await sending_file(w, BinaryStreamLetter(
+            "tid", "file", "v2", T.cast(int, dsize), checksum,
+            resume=True, base=base), self.path + ".delta", r)
+
+        w.close()
+        server.close()
+        await server.wait_closed()
+        os.remove(self.path + ".delta")
+
+        # Verify
+        self.assertEqual("base", base)
+        self.assertLess(T.cast(int, dsize), size // 10)
+        self.assertEqual((size, checksum), file_checksum(self.rebuilt))
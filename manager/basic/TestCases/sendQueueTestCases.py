@@ -0,0 +1,130 @@
+# MIT License
+#
+# Copyright (c) 2020 Gcom
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# sendQueueTestCases.py
+
+import socket
+import asyncio
+import unittest
+import typing as T
+
+from manager.basic.letter import Letter, LogLetter, HeartbeatLetter, \
+    receving
+from manager.basic.sendQueue import SendQueue, SEND_QUEUE_CLOSED
+
+
+class SendQueueTestCases(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self) -> None:
+        s, r = socket.socketpair()
+        self.reader, self.r_writer = await asyncio.open_connection(sock=r)
+        _, self.writer = await asyncio.open_connection(sock=s)
+
+        self.sendQ = SendQueue(self.writer)
+
+    async def asyncTearDown(self) -> None:
+        self.sendQ.close()
+        self.writer.close()
+        self.r_writer.close()
+
+    async def test_SendQueue_Order(self) -> None:
+        # Setup
+        writes = []  # type: T.List[int]
+        writelines = self.writer.writelines
+
+        def writelines_spy(frames: T.List[bytes]) -> None:
+            writes.append(len(frames))
+            writelines(frames)
+
+        self.writer.writelines = writelines_spy  # type: ignore
+
+        # Exercise
+        await asyncio.gather(*[
+            self.sendQ.send(LogLetter("W", "log", str(i)),
+                            Letter.CODEC_COMPACT)
+            for i in range(100)
+        ])
+
+        received = [await receving(self.reader, timeout=3)
+                    for _ in range(100)]
+
+        # Verify
+        self.assertEqual([str(i) for i in range(100)],
+                         [T.cast(LogLetter, l).getLogMsg() for l in received])
+        self.assertEqual(100, sum(writes))
+        self.assertLess(len(writes), 100)
+        self.assertEqual(0, self.sendQ.numOfPending())
+
+    async def test_SendQueue_LinkClosed(self) -> None:
+        # Setup
+        self.writer.close()
+
+        # Exercise and Verify
+        with self.assertRaises(ConnectionError):
+            await self.sendQ.send(LogLetter("W", "log", "msg"))
+
+    async def test_SendQueue_Close(self) -> None:
+        # Exercise
+        pending = asyncio.ensure_future(
+            self.sendQ.send(LogLetter("W", "log", "msg")))
+        self.sendQ.close()
+
+        # Verify
+        with self.assertRaises(SEND_QUEUE_CLOSED):
+            await pending
+        with self.assertRaises(SEND_QUEUE_CLOSED):
+            await self.sendQ.send(LogLetter("W", "log", "msg"))
+
+    async def test_SendQueue_Priority(self) -> None:
+        # Setup
+        log = LogLetter("W", "log", "make: Entering directory" * 100)
+        frame_len = len(log.toBytesWithLength())
+
+        logs = [asyncio.ensure_future(self.sendQ.send(log))
+                for _ in range(1000)]
+
+        # Wait until link is congested.
+        await asyncio.sleep(0.1)
+        written = len([l for l in logs if l.done()])
+
+        # Exercise
+        heartbeat = asyncio.ensure_future(
+            self.sendQ.send(HeartbeatLetter("W", 1)))
+
+        logs_before = 0
+        while True:
+            letter = await receving(self.reader, timeout=3)
+            if isinstance(letter, HeartbeatLetter):
+                break
+            logs_before += 1
+
+        # Verify
+        # Heartbeat wait behind at most one bulk write.
+        self.assertLess(written, 500)
+        self.assertLessEqual(
+            logs_before,
+            written + SendQueue.BULK_BATCH_BYTES // frame_len + 1)
+
+        await heartbeat
+        for _ in range(1000 - logs_before):
+            await receving(self.reader, timeout=3)
+        await asyncio.gather(*logs)
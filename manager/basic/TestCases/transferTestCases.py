@@ -0,0 +1,408 @@
+# MIT License
+#
+# Copyright (c) 2020 Gcom
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# transferTestCases.py
+
+import os
+import shutil
+import asyncio
+import hashlib
+import unittest
+import typing as T
+
+from manager.basic.letter import Letter, BinaryStreamLetter, \
+    STREAM_CHECKSUM_MISMATCH, STREAM_REFUSED, sending, sending_stream, \
+    sending_file, receving
+from manager.basic.storage import Storage, StoChooser
+from manager.basic.transfer import TransferSession, TransferTable, \
+    TRANSFER_TAKEN_OVER
+
+
+class TransferTestCases(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self) -> None:
+        self.sessions = TransferTable(maxActive=2)
+        self.results = []  # type: T.List[T.Any]
+        self.refuseRanges = False
+        self.resumable = True
+        # Files are received into storage if it's set.
+        self.storage = None  # type: T.Optional[Storage]
+
+        self.content = os.urandom(2 ** 20 + 3)
+        self.path = "./transfer_file"
+        with open(self.path, "wb") as f:
+            f.write(self.content)
+
+        self.server = await asyncio.start_server(
+            self.receiver, "127.0.0.1", 3502)
+
+    async def asyncTearDown(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+        if os.path.exists("./transfer_storage"):
+            shutil.rmtree("./transfer_storage")
+
+        for p in [self.path] + [self.path + "_received_" + tid
+                                for tid in ["tid", "tid_1", "tid_2"]]:
+            if os.path.exists(p):
+                os.remove(p)
+
+    async def receiver(self, reader: asyncio.StreamReader,
+                       writer: asyncio.StreamWriter) -> None:
+        letter = T.cast(BinaryStreamLetter, await receving(reader))
+        letter.bindStream(reader, writer)
+
+        if self.refuseRanges and letter.isRange():
+            await letter.refuse()
+            writer.close()
+            return
+
+        def open_() -> T.Tuple[T.BinaryIO, str]:
+            if self.storage is not None:
+                chooser = T.cast(StoChooser, self.storage.create(
+                    "box", letter.getTid()))
+                return T.cast(T.BinaryIO, chooser), chooser.path()
+
+            path = self.path + "_received_" + letter.getTid()
+            return open(path, "wb"), path
+
+        try:
+            session = await self.sessions.receive(
+                letter, open_, self.resumable)
+            self.results.append(None if session is None else session.path)
+        except Exception as e:
+            self.results.append(e)
+        finally:
+            writer.close()
+
+    async def interrupted(self, length: int, tid: str = "tid") -> None:
+        """
+        Send first length bytes of the file then
+        break the connection.
+        """
+        r, w = await asyncio.open_connection("127.0.0.1", 3502)
+        await sending(w, BinaryStreamLetter(
+            tid, "file", "v1", len(self.content),
+            hashlib.sha256(self.content).hexdigest(), resume=True))
+
+        await receving(r)
+        w.write(self.content[:length])
+        await w.drain()
+        w.close()
+
+        await asyncio.sleep(0.5)
+
+    async def test_Transfer_Resume(self) -> None:
+        # Exercise
+        await self.interrupted(2 ** 19)
+        self.assertIsInstance(self.results[0], ConnectionError)
+        self.assertEqual(2 ** 19, T.cast(TransferSession, self.sessions.get("tid")).offset)
+
+        r, w = await asyncio.open_connection("127.0.0.1", 3502)
+        await sending_stream(w, self.path, "tid", "v1", "file", reader=r)
+        w.close()
+        await asyncio.sleep(0.5)
+
+        # Verify
+        self.assertEqual(self.path + "_received_tid", self.results[1])
+        self.assertEqual(0, self.sessions.numOfSessions())
+        with open(self.path + "_received_tid", "rb") as f:
+            self.assertEqual(self.content, f.read())
+
+    async def test_Transfer_NotResumable(self) -> None:
+        # Setup
+        self.resumable = False
+
+        # Exercise
+        await self.interrupted(2 ** 19)
+
+        # Verify
+        # Broken transfer is discarded.
+        self.assertIsInstance(self.results[0], ConnectionError)
+        self.assertEqual(0, self.sessions.numOfSessions())
+        self.assertFalse(os.path.exists(self.path + "_received_tid"))
+
+        # Exercise
+        r, w = await asyncio.open_connection("127.0.0.1", 3502)
+        await sending_stream(w, self.path, "tid", "v1", "file", reader=r)
+        w.close()
+        await asyncio.sleep(0.5)
+
+        # Verify
+        self.assertEqual(self.path + "_received_tid", self.results[1])
+        with open(self.path + "_received_tid", "rb") as f:
+            self.assertEqual(self.content, f.read())
+
+    async def test_Transfer_EmptyFile(self) -> None:
+        # Setup
+        self.content = b""
+        with open(self.path, "wb") as f:
+            f.write(self.content)
+
+        # Exercise
+        r, w = await asyncio.open_connection("127.0.0.1", 3502)
+        await sending_stream(w, self.path, "tid", "v1", "file", reader=r)
+        w.close()
+        await asyncio.sleep(0.5)
+
+        # Verify
+        self.assertEqual(self.path + "_received_tid", self.results[0])
+        with open(self.path + "_received_tid", "rb") as f:
+            self.assertEqual(b"", f.read())
+
+    async def test_Transfer_ChangedFile(self) -> None:
+        # Setup
+        await self.interrupted(2 ** 19)
+
+        # Exercise
+        # Sender resume with another version of the file.
+        self.content = self.content[::-1]
+        with open(self.path, "wb") as f:
+            f.write(self.content)
+
+        r, w = await asyncio.open_connection("127.0.0.1", 3502)
+        await sending_stream(w, self.path, "tid", "v1", "file", reader=r)
+        w.close()
+        await asyncio.sleep(0.5)
+
+        # Verify
+        with open(self.path + "_received_tid", "rb") as f:
+            self.assertEqual(self.content, f.read())
+
+    async def test_Transfer_Corrupted(self) -> None:
+        # Setup
+        r, w = await asyncio.open_connection("127.0.0.1", 3502)
+        await sending(w, BinaryStreamLetter(
+            "tid", "file", "v1", len(self.content),
+            "0" * 64, resume=True))
+        await receving(r)
+
+        # Exercise
+        w.write(self.content)
+        ack = T.cast(Letter, await receving(r))
+        w.close()
+        await asyncio.sleep(0.5)
+
+        # Verify
+        self.assertEqual("failed", ack.getContent('state'))
+        self.assertIsInstance(self.results[0], STREAM_CHECKSUM_MISMATCH)
+        self.assertEqual(0, self.sessions.numOfSessions())
+        # The file is discarded.
+        self.assertFalse(os.path.exists(self.path + "_received_tid"))
+
+    async def test_Transfer_IntoStorage(self) -> None:
+        # Setup
+        self.storage = Storage("./transfer_storage", None)
+        checksum = hashlib.sha256(self.content).hexdigest()
+
+        # Exercise
+        # A broken transfer that abandoned.
+        await self.interrupted(2 ** 19, "tid_1")
+        self.sessions._idleTimeout = 0
+        self.sessions.evict()
+
+        r, w = await asyncio.open_connection("127.0.0.1", 3502)
+        await sending_stream(w, self.path, "tid", "v1", "file", reader=r)
+        w.close()
+        await asyncio.sleep(0.5)
+
+        # Verify
+        # Digest of the session is passed to Storage.
+        self.assertEqual(checksum, self.storage.hashOf("box", "tid"))
+        self.assertEqual(1, self.storage.numOfBlobs())
+        self.assertFalse(os.path.exists("./transfer_storage/box/tid_1"))
+
+    async def test_Transfer_Parallel(self) -> None:
+        # Exercise
+        async def upload(tid: str) -> None:
+            r, w = await asyncio.open_connection("127.0.0.1", 3502)
+            await sending_stream(w, self.path, tid, "v1", "file", reader=r)
+            w.close()
+
+        await asyncio.gather(*[upload(tid) for tid in ["tid", "tid_1", "tid_2"]])
+        await asyncio.sleep(0.5)
+
+        # Verify
+        self.assertEqual(3, len(self.results))
+        for tid in ["tid", "tid_1", "tid_2"]:
+            with open(self.path + "_received_" + tid, "rb") as f:
+                self.assertEqual(self.content, f.read())
+
+    async def test_Transfer_SessionCounters(self) -> None:
+        # Exercise
+        await self.interrupted(2 ** 19, "tid_1")
+        await self.interrupted(2 ** 18, "tid_2")
+
+        # Verify
+        stats = self.sessions.stats()
+        self.assertEqual(2 ** 19, stats["tid_1"]["offset"])
+        self.assertEqual(2 ** 18, stats["tid_2"]["received"])
+        self.assertEqual(0, self.sessions.numOfActive())
+
+        # Idle sessions are dropped.
+        self.sessions._idleTimeout = 0
+        self.sessions.evict()
+        self.assertEqual(0, self.sessions.numOfSessions())
+
+    async def test_Transfer_TakeOver(self) -> None:
+        # Setup
+        # A stream that stall in the middle of the file.
+        r, w = await asyncio.open_connection("127.0.0.1", 3502)
+        await sending(w, BinaryStreamLetter(
+            "tid", "file", "v1", len(self.content),
+            hashlib.sha256(self.content).hexdigest(), resume=True))
+        await receving(r)
+        w.write(self.content[:2 ** 18])
+        await w.drain()
+        await asyncio.sleep(0.5)
+
+        # Exercise
+        r1, w1 = await asyncio.open_connection("127.0.0.1", 3502)
+        await sending_stream(w1, self.path, "tid", "v1", "file", reader=r1)
+        w1.close()
+
+        # The stale stream wake up.
+        w.write(self.content[2 ** 18:2 ** 19])
+        await w.drain()
+        await asyncio.sleep(0.5)
+        w.close()
+
+        # Verify
+        self.assertEqual(self.path + "_received_tid", self.results[0])
+        self.assertIsInstance(self.results[1], TRANSFER_TAKEN_OVER)
+        with open(self.path + "_received_tid", "rb") as f:
+            self.assertEqual(self.content, f.read())
+
+    async def test_Transfer_StalledStream(self) -> None:
+        # Setup
+        timeout = Letter.STREAM_READ_TIMEOUT
+        Letter.STREAM_READ_TIMEOUT = 0.3  # type: ignore
+
+        # Streams that stall and hold all slots.
+        stalled = []
+        for tid in ["tid_1", "tid_2"]:
+            r, w = await asyncio.open_connection("127.0.0.1", 3502)
+            await sending(w, BinaryStreamLetter(
+                tid, "file", "v1", len(self.content),
+                hashlib.sha256(self.content).hexdigest(), resume=True))
+            await receving(r)
+            w.write(self.content[:2 ** 18])
+            await w.drain()
+            stalled.append(w)
+
+        # Exercise
+        try:
+            r, w = await asyncio.open_connection("127.0.0.1", 3502)
+            await asyncio.wait_for(sending_stream(
+                w, self.path, "tid", "v1", "file", reader=r), timeout=5)
+            w.close()
+            await asyncio.sleep(0.1)
+        finally:
+            Letter.STREAM_READ_TIMEOUT = timeout  # type: ignore
+            for w in stalled:
+                w.close()
+
+        # Verify
+        self.assertEqual(2, len([r for r in self.results
+                                 if isinstance(r, ConnectionError)]))
+        self.assertIn(self.path + "_received_tid", self.results)
+        # Stalled transfers are able to resume.
+        self.assertEqual(2, self.sessions.numOfSessions())
+        self.assertEqual(0, self.sessions.numOfActive())
+
+    async def test_Transfer_Ranges(self) -> None:
+        # Setup
+        letters = BinaryStreamLetter.ranges(
+            "tid", "file", "v1", len(self.content),
+            hashlib.sha256(self.content).hexdigest(), 4)
+
+        # Exercise
+        async def upload(letter: BinaryStreamLetter) -> None:
+            r, w = await asyncio.open_connection("127.0.0.1", 3502)
+            await sending_file(w, letter, self.path, reader=r)
+            w.close()
+
+        await asyncio.gather(*[upload(l) for l in letters])
+        await asyncio.sleep(0.5)
+
+        # Verify
+        self.assertEqual(4, len(letters))
+        self.assertEqual(len(self.content), sum(l.getSize() for l in letters))
+        self.assertEqual([None, None, None, self.path + "_received_tid"],
+                         sorted(self.results, key=lambda r: r is not None))
+        with open(self.path + "_received_tid", "rb") as f:
+            self.assertEqual(self.content, f.read())
+
+    async def test_Transfer_RangeRefused(self) -> None:
+        # Setup
+        self.refuseRanges = True
+        letters = BinaryStreamLetter.ranges(
+            "tid", "file", "v1", len(self.content),
+            hashlib.sha256(self.content).hexdigest(), 2)
+
+        # Exercise
+        r, w = await asyncio.open_connection("127.0.0.1", 3502)
+        with self.assertRaises(STREAM_REFUSED):
+            await sending_file(w, letters[0], self.path, reader=r)
+        w.close()
+
+        # Whole file is accepted.
+        r, w = await asyncio.open_connection("127.0.0.1", 3502)
+        await sending_stream(w, self.path, "tid", "v1", "file", reader=r)
+        w.close()
+        await asyncio.sleep(0.5)
+
+        # Verify
+        self.assertEqual([self.path + "_received_tid"], self.results)
+        self.assertEqual(0, self.sessions.numOfSessions())
+        with open(self.path + "_received_tid", "rb") as f:
+            self.assertEqual(self.content, f.read())
+
+    async def test_Transfer_RangeResume(self) -> None:
+        # Setup
+        letters = BinaryStreamLetter.ranges(
+            "tid", "file", "v1", len(self.content),
+            hashlib.sha256(self.content).hexdigest(), 2)
+
+        # First range is interrupted.
+        r, w = await asyncio.open_connection("127.0.0.1", 3502)
+        await sending(w, letters[0])
+        await receving(r)
+        w.write(self.content[:1000])
+        await w.drain()
+        w.close()
+        await asyncio.sleep(0.5)
+        self.assertEqual(1000, self.sessions.stats()["tid@0"]["offset"])
+
+        # Exercise
+        for letter in [letters[1], letters[0]]:
+            r, w = await asyncio.open_connection("127.0.0.1", 3502)
+            await sending_file(w, letter, self.path, reader=r)
+            w.close()
+        await asyncio.sleep(0.5)
+
+        # Verify
+        self.assertEqual([None, self.path + "_received_tid"], self.results[1:])
+        with open(self.path + "_received_tid", "rb") as f:
+            self.assertEqual(self.content, f.read())
@@ -0,0 +1,93 @@
+# MIT License
+#
+# Copyright (c) 2020 Gcom
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# codecBench.py
+#
+# Letters per second of each codec.
+#
+# Usage: python -m manager.basic.benchmarks.codecBench [seconds]
+
+import sys
+import time
+import typing as T
+
+from manager.basic.letter import Letter, NewLetter, ResponseLetter, \
+    PostTaskLetter, HeartbeatLetter, LogLetter
+
+
+def letters() -> T.List[Letter]:
+    return [
+        NewLetter("1_GL5610", "sn_1", "vsn_1", "2020-10-10 10:10:10",
+                  extra={"resultPath": "./BSP/image/pack.rar",
+                         "cmds": ["echo " + str(i) for i in range(20)]},
+                  needPost="true"),
+        ResponseLetter("Worker", "1_GL5610", Letter.RESPONSE_STATE_IN_PROC),
+        PostTaskLetter("1_Post", "vsn_1", ["cat a b c > d"], "./d",
+                       ["1_GL5610", "1_GL5610-v2", "1_GL8900"]),
+        HeartbeatLetter("Worker", 1024),
+        LogLetter("Worker", "1_GL5610", "make: Entering directory ..." * 4)
+    ]
+
+
+def bench(codec: str, seconds: float) -> T.Tuple[float, float]:
+    """
+    Return letters/sec of encode and letters/sec of decode.
+    """
+    samples = letters()
+    encoded = [l.toBytesWithLength(codec) for l in samples]
+
+    count, begin = 0, time.perf_counter()
+    while time.perf_counter() - begin < seconds:
+        for l in samples:
+            l.toBytesWithLength(codec)
+        count += len(samples)
+    encode_rate = count / (time.perf_counter() - begin)
+
+    count, begin = 0, time.perf_counter()
+    while time.perf_counter() - begin < seconds:
+        for bs in encoded:
+            Letter.parse(bs)
+        count += len(encoded)
+    decode_rate = count / (time.perf_counter() - begin)
+
+    return encode_rate, decode_rate
+
+
+def bytes_per_letter(codec: str) -> float:
+    samples = letters()
+    return sum(len(l.toBytesWithLength(codec)) for l in samples) / len(samples)
+
+
+def main() -> None:
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+
+    print("%-10s %15s %15s %15s" %
+          ("codec", "encode(l/s)", "decode(l/s)", "bytes/letter"))
+    for codec in [Letter.CODEC_JSON, Letter.CODEC_COMPACT]:
+        encode_rate, decode_rate = bench(codec, seconds)
+        print("%-10s %15.0f %15.0f %15.1f" % (
+            codec, encode_rate, decode_rate, bytes_per_letter(codec)))
+
+
+if __name__ == '__main__':
+    main()
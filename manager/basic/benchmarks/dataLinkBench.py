@@ -0,0 +1,124 @@
+# MIT License
+#
+# Copyright (c) 2020 Gcom
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# dataLinkBench.py
+#
+# Load test of a TCP DataLink, many concurrent uploads of files
+# streamed by BinaryStreamLetter to a DataLink served by 1, 2 and
+# 4 processes. Receiver verify checksum of each file so ingestion
+# is CPU bound and scale with processes on a multi-core host.
+#
+# Usage: python -m manager.basic.benchmarks.dataLinkBench
+#            [uploads] [MB per upload] [concurrency]
+
+import os
+import sys
+import time
+import asyncio
+import tempfile
+import typing as T
+
+from manager.basic.dataLink import DataLinker, DataLink, DataLinkNotify
+from manager.basic.letter import BinaryStreamLetter, sending, file_checksum
+
+PORT = 3600
+
+
+async def processor(dl: DataLink, letter: T.Any, args: T.Any) -> None:
+    if isinstance(letter, BinaryStreamLetter):
+        await letter.storeInto(lambda chunk: None)
+        dl.notify(DataLinkNotify("Stored", letter.getSize()))
+
+
+async def upload(port: int, path: str, tid: str,
+                 size: int, checksum: str) -> None:
+    r, w = await asyncio.open_connection("127.0.0.1", port)
+
+    await sending(w, BinaryStreamLetter(tid, "file", "v1", size, checksum))
+    with open(path, "rb") as f:
+        await asyncio.get_running_loop().sendfile(w.transport, f, 0, size)
+
+    w.close()
+
+
+async def bench(procs: int, port: int, path: str, uploads: int,
+                concurrency: int) -> float:
+    """
+    Return MB/sec ingested.
+    """
+    size, checksum = file_checksum(path)
+
+    stored = []  # type: T.List[int]
+    done = asyncio.Event()
+
+    def notified(msg: int, arg: T.Any) -> None:
+        stored.append(msg)
+        if len(stored) == uploads:
+            done.set()
+
+    dlinker = DataLinker()
+    dlinker.addDataLink("127.0.0.1", port, DataLink.TCP_DATALINK,
+                        processor, None, procs=procs)
+    dlinker.addNotify("Stored", notified, None)
+    dlinker.start()
+    await asyncio.sleep(1)
+
+    slots = asyncio.Semaphore(concurrency)
+
+    async def limited(n: int) -> None:
+        async with slots:
+            await upload(port, path, "tid_" + str(n), size, checksum)
+
+    try:
+        begin = time.perf_counter()
+        await asyncio.gather(*[limited(n) for n in range(uploads)])
+        await done.wait()
+        elapsed = time.perf_counter() - begin
+    finally:
+        dlinker.stop()
+
+    return sum(stored) / elapsed / 2 ** 20
+
+
+def main() -> None:
+    uploads = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    mb = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 32
+
+    fd, path = tempfile.mkstemp()
+    with os.fdopen(fd, "wb") as f:
+        f.write(os.urandom(mb * 2 ** 20))
+
+    try:
+        print("cpus: %d" % (os.cpu_count() or 1))
+        print("%-8s %15s" % ("procs", "MB/s"))
+        for i, procs in enumerate([1, 2, 4]):
+            rate = asyncio.run(
+                bench(procs, PORT + i, path, uploads, concurrency))
+            print("%-8d %15.1f" % (procs, rate))
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+# MIT License
+#
+# Copyright (c) 2020 Gcom
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# frameBench.py
+#
+# Frames per second received from a stream of BinaryLetters.
+#
+# Usage: python -m manager.basic.benchmarks.frameBench [seconds]
+
+import sys
+import time
+import socket
+import asyncio
+import typing as T
+
+from manager.basic.letter import Letter, BinaryLetter, receving
+
+
+SIZES = [("1KB", 2 ** 10), ("64KB", 2 ** 16), ("1MB", 2 ** 20)]
+
+
+async def receving_concat(reader: asyncio.StreamReader,
+                          timeout=None) -> T.Optional[Letter]:
+    """
+    Receiver that concatenate chunks, receving() before
+    streaming decoder.
+    """
+    content, remain = b'', 2
+
+    while remain > 0:
+        chunk = await asyncio.wait_for(
+            reader.read(remain), timeout=timeout)
+
+        if chunk == b'':
+            raise ConnectionError
+
+        content += chunk
+        remain = Letter.letterBytesRemain(content)
+
+    return Letter.parse(content)
+
+
+async def bench_async(recv: T.Callable, size: int, seconds: float) -> float:
+    frame = BinaryLetter("tid", b"x" * size, fileName="file") \
+        .toBytesWithLength()
+    batch = max(1, 2 ** 22 // len(frame))
+
+    s, r = socket.socketpair()
+    reader, r_writer = await asyncio.open_connection(
+        sock=r, limit=2 ** 20)
+    _, writer = await asyncio.open_connection(sock=s)
+
+    async def produce() -> None:
+        while True:
+            writer.writelines([frame] * batch)
+            await writer.drain()
+
+    producer = asyncio.create_task(produce())
+
+    count, begin = 0, time.perf_counter()
+    while time.perf_counter() - begin < seconds:
+        for _ in range(batch):
+            await recv(reader, timeout=10)
+        count += batch
+    rate = count / (time.perf_counter() - begin)
+
+    producer.cancel()
+    try:
+        await producer
+    except asyncio.CancelledError:
+        pass
+
+    writer.close()
+    r_writer.close()
+
+    return rate
+
+
+def main() -> None:
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+
+    print("%-6s %18s %18s" % ("size", "concat(frame/s)", "stream(frame/s)"))
+    for name, size in SIZES:
+        before = asyncio.run(bench_async(receving_concat, size, seconds))
+        after = asyncio.run(bench_async(receving, size, seconds))
+        print("%-6s %18.0f %18.0f" % (name, before, after))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+# MIT License
+#
+# Copyright (c) 2020 Gcom
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# letterBench.py
+#
+# Encode, parse and loopback rate of each type of letter,
+# results are written into a JSON file so results of
+# different commits are able to be compared.
+#
+# Usage:
+#   python -m manager.basic.benchmarks.letterBench [output] [seconds]
+
+import sys
+import json
+import time
+import socket
+import asyncio
+import platform
+import subprocess
+import typing as T
+
+from manager.basic.letter import Letter, NewLetter, ResponseLetter, \
+    BinaryLetter, PostTaskLetter, HeartbeatLetter, CommandLetter, \
+    NotifyLetter, LogLetter, sending, receving
+
+
+CODECS = [Letter.CODEC_JSON, Letter.CODEC_COMPACT]
+LOOPBACK_BATCH = 64
+
+
+def samples() -> T.Dict[str, Letter]:
+    letters = {
+        "NewLetter": NewLetter(
+            "1_GL5610", "sn_1", "vsn_1", "2020-10-10 10:10:10",
+            extra={"resultPath": "./BSP/image/pack.rar",
+                   "cmds": ["make -C src/module_" + str(i) + " all"
+                            for i in range(20)]},
+            needPost="true"),
+        "ResponseLetter": ResponseLetter(
+            "Worker", "1_GL5610", Letter.RESPONSE_STATE_IN_PROC),
+        "PostTaskLetter": PostTaskLetter(
+            "1_Post", "vsn_1", ["cat a b c > d"], "./d",
+            ["1_GL5610", "1_GL5610-v2", "1_GL8900"]),
+        "HeartbeatLetter": HeartbeatLetter("Worker", 1024),
+        "CommandLetter": CommandLetter(
+            "accept", {"codec": Letter.CODEC_COMPACT}, target="Worker"),
+        "NotifyLetter": NotifyLetter(
+            "Worker", "WSC", {"state": "0"}),
+        "LogLetter": LogLetter(
+            "Worker", "1_GL5610", "make: Entering directory src/module"),
+    }  # type: T.Dict[str, Letter]
+
+    for name, size in [("1KB", 2 ** 10), ("16KB", 2 ** 14),
+                       ("64KB", 2 ** 16), ("1MB", 2 ** 20)]:
+        letters["BinaryLetter_" + name] = BinaryLetter(
+            "1_GL5610", b"\x5a" * size, fileName="pack.rar",
+            parent="vsn_1")
+
+    return letters
+
+
+def rate(f: T.Callable[[], T.Any], seconds: float) -> float:
+    count, begin = 0, time.perf_counter()
+
+    while True:
+        f()
+        count += 1
+
+        elapsed = time.perf_counter() - begin
+        if elapsed >= seconds:
+            return count / elapsed
+
+
+def parse(bs: bytes) -> None:
+    letter = Letter.parse(bs)
+
+    # Content of large letters are decoded lazily,
+    # access it to count it's cost.
+    assert(letter is not None)
+    letter.content
+
+
+async def loopback(letter: Letter, codec: str, seconds: float) -> float:
+    s, r = socket.socketpair()
+    reader, r_writer = await asyncio.open_connection(
+        sock=r, limit=2 ** 20)
+    _, writer = await asyncio.open_connection(sock=s)
+
+    async def send() -> None:
+        for _ in range(LOOPBACK_BATCH):
+            await sending(writer, letter, codec=codec)
+
+    async def recv() -> None:
+        for _ in range(LOOPBACK_BATCH):
+            await receving(reader)
+
+    count, begin = 0, time.perf_counter()
+    while time.perf_counter() - begin < seconds:
+        await asyncio.gather(send(), recv())
+        count += LOOPBACK_BATCH
+    elapsed = time.perf_counter() - begin
+
+    writer.close()
+    r_writer.close()
+
+    return count / elapsed
+
+
+def bench(seconds: float) -> T.Dict[str, T.Dict[str, T.Dict[str, float]]]:
+    results = {}  # type: T.Dict[str, T.Dict[str, T.Dict[str, float]]]
+
+    for codec in CODECS:
+        results[codec] = {}
+
+        for name, letter in samples().items():
+            bs = letter.toBytesWithLength(codec)
+
+            results[codec][name] = {
+                "bytes": len(bs),
+                "encode": rate(lambda: letter.toBytesWithLength(codec),
+                               seconds),
+                "parse": rate(lambda: parse(bs), seconds),
+                "loopback": asyncio.run(loopback(letter, codec, seconds))
+            }
+
+    return results
+
+
+def revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True,
+            text=True).stdout.strip()
+    except Exception:
+        return ""
+
+
+def main() -> None:
+    output = sys.argv[1] if len(sys.argv) > 1 else "letterBench.json"
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+
+    results = bench(seconds)
+
+    print("%-8s %-20s %10s %12s %12s %12s" %
+          ("codec", "letter", "bytes", "encode/s", "parse/s", "loopback/s"))
+    for codec, letters in results.items():
+        for name, r in letters.items():
+            print("%-8s %-20s %10d %12.0f %12.0f %12.0f" % (
+                codec, name, r["bytes"], r["encode"], r["parse"],
+                r["loopback"]))
+
+    with open(output, "w") as f:
+        json.dump({
+            "revision": revision(),
+            "python": platform.python_version(),
+            "time": time.time(),
+            "seconds": seconds,
+            "results": results
+        }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
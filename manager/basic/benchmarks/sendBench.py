@@ -0,0 +1,100 @@
+# MIT License
+#
+# Copyright (c) 2020 Gcom
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# sendBench.py
+#
+# Letters per second and p99 latency of send under concurrent
+# senders, drain per letter behind a shared lock vs SendQueue.
+#
+# Usage: python -m manager.basic.benchmarks.sendBench [letters] [senders]
+
+import sys
+import time
+import socket
+import asyncio
+import typing as T
+
+from manager.basic.letter import Letter, LogLetter, sending, receving
+from manager.basic.sendQueue import SendQueue
+
+
+def percentile(samples: T.List[float], p: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+
+async def bench(queued: bool, num: int, senders: int) \
+        -> T.Tuple[float, float]:
+    """
+    Return letters/sec and p99 latency in milliseconds.
+    """
+    s, r = socket.socketpair()
+    reader, r_writer = await asyncio.open_connection(sock=r)
+    _, writer = await asyncio.open_connection(sock=s)
+
+    lock = asyncio.Lock()
+    sendQ = SendQueue(writer)
+    latencies = []  # type: T.List[float]
+
+    async def send(letter: Letter) -> None:
+        begin = time.perf_counter()
+        if queued:
+            await sendQ.send(letter, Letter.CODEC_COMPACT)
+        else:
+            await sending(writer, letter, lock=lock,
+                          codec=Letter.CODEC_COMPACT)
+        latencies.append(time.perf_counter() - begin)
+
+    async def sender(ident: int) -> None:
+        for i in range(num // senders):
+            await send(LogLetter("Worker", "log_" + str(ident),
+                                 "make: Entering directory " + str(i)))
+
+    async def receiver(total: int) -> None:
+        for _ in range(total):
+            await receving(reader)
+
+    total = (num // senders) * senders
+    begin = time.perf_counter()
+    await asyncio.gather(receiver(total),
+                         *[sender(i) for i in range(senders)])
+    rate = total / (time.perf_counter() - begin)
+
+    sendQ.close()
+    writer.close()
+    r_writer.close()
+
+    return rate, percentile(latencies, 0.99) * 1000
+
+
+def main() -> None:
+    num = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    senders = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+
+    print("%-12s %15s %15s" % ("sender", "letters/s", "p99(ms)"))
+    for name, queued in [("drain+lock", False), ("SendQueue", True)]:
+        rate, p99 = asyncio.run(bench(queued, num, senders))
+        print("%-12s %15.0f %15.3f" % (name, rate, p99))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+# MIT License
+#
+# Copyright (c) 2020 Gcom
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# transferBench.py
+#
+# Throughput of a file transfer over a local stream, and CPU time
+# spent by the sending loop, 1 KB BinaryLetters vs a
+# BinaryStreamLetter followed by the file. The receiver runs in
+# another thread.
+#
+# Usage: python -m manager.basic.benchmarks.transferBench [MB]
+
+import os
+import sys
+import time
+import socket
+import asyncio
+import tempfile
+import threading
+import typing as T
+
+from manager.basic.letter import BinaryLetter, BinaryStreamLetter, \
+    sending, sending_stream, receving_sock
+
+
+async def send_letters(writer: asyncio.StreamWriter, path: str) -> None:
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(1024)
+            if not chunk:
+                break
+            await sending(writer, BinaryLetter(
+                "tid", chunk, parent="v1", fileName="file"))
+
+    await sending(writer, BinaryLetter(
+        "tid", b"", parent="v1", fileName="file"))
+
+
+def recv_letters(sock: socket.socket, out: T.BinaryIO) -> None:
+    while True:
+        letter = T.cast(BinaryLetter, receving_sock(sock))
+        content = letter.getContent('bytes')
+        if content == b"":
+            break
+        out.write(content)
+
+
+def recv_stream(sock: socket.socket, out: T.BinaryIO) -> None:
+    letter = T.cast(BinaryStreamLetter, receving_sock(sock))
+    remain = letter.getSize()
+    buffer = bytearray(2 ** 18)
+
+    while remain > 0:
+        n = sock.recv_into(buffer, min(remain, len(buffer)))
+        if n == 0:
+            raise ConnectionError
+        out.write(buffer[:n])
+        remain -= n
+
+
+async def bench(mode: str, path: str, size: int) -> T.Tuple[float, float]:
+    """
+    Return MB/sec and CPU seconds of the sending loop.
+    """
+    s, r = socket.socketpair()
+    _, writer = await asyncio.open_connection(sock=s)
+
+    with tempfile.TemporaryFile() as out:
+        receiver = threading.Thread(
+            target=recv_letters if mode == "letters" else recv_stream,
+            args=(r, out))
+
+        begin = time.perf_counter()
+        cpu_begin = time.thread_time()
+        receiver.start()
+
+        if mode == "letters":
+            await send_letters(writer, path)
+        else:
+            await sending_stream(writer, path, "tid", "v1", "file")
+
+        cpu = time.thread_time() - cpu_begin
+        await asyncio.get_running_loop().run_in_executor(
+            None, receiver.join)
+        elapsed = time.perf_counter() - begin
+
+        assert out.tell() == size
+
+    writer.close()
+    r.close()
+
+    return size / elapsed / 2 ** 20, cpu
+
+
+def main() -> None:
+    mb = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+
+    fd, path = tempfile.mkstemp()
+    with os.fdopen(fd, "wb") as f:
+        f.write(os.urandom(mb * 2 ** 20))
+
+    try:
+        print("%-12s %15s %15s" % ("mode", "MB/s", "loop cpu(s)"))
+        for mode in ["letters", "stream"]:
+            rate, cpu = asyncio.run(bench(mode, path, mb * 2 ** 20))
+            print("%-12s %15.1f %15.3f" % (mode, rate, cpu))
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
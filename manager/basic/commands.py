@@ -115,28 +115,56 @@ class PostConfigCmd(Command):
 
 class AcceptCommand(Command):
 
-    def __init__(self) -> None:
-        Command.__init__(self, CMD_ACCEPT, content={})
+    def __init__(self, codec: str = Letter.CODEC_JSON,
+                 compress: str = Letter.COMPRESS_NONE) -> None:
+        # Codec is the codec that master is able to decode,
+        # worker should send letters with it.
+        Command.__init__(self, CMD_ACCEPT,
+                         content={"codec": codec, "compress": compress})
+
+    def codec(self) -> str:
+        return self.content['codec']
+
+    def compress(self) -> str:
+        return self.content['compress']
 
     def toLetter(self) -> CommandLetter:
         cmdLetter = CommandLetter(self.type, content=self.content)
         return cmdLetter
 
     def fromLetter(cl: CommandLetter) -> Optional['AcceptCommand']:
-        return AcceptCommand()
+        codec = cl.getContent('codec')
+        if codec == "":
+            codec = Letter.CODEC_JSON
+
+        return AcceptCommand(codec, cl.getContent('compress'))
 
 
 class AcceptRstCommand(Command):
 
-    def __init__(self) -> None:
-        Command.__init__(self, CMD_ACCEPT_RST, content={})
+    def __init__(self, codec: str = Letter.CODEC_JSON,
+                 compress: str = Letter.COMPRESS_NONE) -> None:
+        # Codec is the codec that master is able to decode,
+        # worker should send letters with it.
+        Command.__init__(self, CMD_ACCEPT_RST,
+                         content={"codec": codec, "compress": compress})
+
+    def codec(self) -> str:
+        return self.content['codec']
+
+    def compress(self) -> str:
+        return self.content['compress']
 
     def toLetter(self) -> CommandLetter:
         cmdLetter = CommandLetter(self.type, content=self.content)
         return cmdLetter
 
     def fromLetter(cl: CommandLetter) -> Optional['AcceptRstCommand']:
-        return AcceptRstCommand()
+        codec = cl.getContent('codec')
+        if codec == "":
+            codec = Letter.CODEC_JSON
+
+        return AcceptRstCommand(codec, cl.getContent('compress'))
 
 
 class LisAddrUpdateCmd(Command):
@@ -22,14 +22,13 @@
 
 import asyncio
 import multiprocessing
-import threading
 import traceback
 from collections import namedtuple
-from manager.basic.letter import receving
+from manager.basic.letter import receving, BinaryStreamLetter
 from typing import Dict, List, Callable, Tuple, Any, \
     Optional
 from asyncio import StreamReader, StreamWriter
-from manager.basic.mmanager import ModuleTDaemon
+from manager.basic.mmanager import ModuleDaemon
 
 
 M_NAME = "DATALINKER"
@@ -95,42 +94,88 @@ class Notifier:
         self._cb(msg, self._arg)
 
 
+class NotifyPipe:
+    """
+    Pipe that carry notifies from DataLink processes to
+    DataLinker, read end of the pipe is watched by event
+    loop of DataLinker so notifies are dealt as soon as
+    they arrive.
+    """
+
+    def __init__(self) -> None:
+        self._r, self._w = multiprocessing.Pipe(duplex=False)
+
+        # Notifies from DataLinks share write end of the pipe.
+        self._lock = multiprocessing.Lock()
+
+    def put(self, notify: Tuple[tag, Any]) -> None:
+        with self._lock:
+            self._w.send(notify)
+
+    def fileno(self) -> int:
+        return self._r.fileno()
+
+    def get_all(self) -> List[Tuple[tag, Any]]:
+        notifies = []
+
+        while self._r.poll():
+            notifies.append(self._r.recv())
+
+        return notifies
+
+
 class DataLink:
 
     TCP_DATALINK = "tcp"
     UDP_DATALINK = "udp"
 
+    # Size of buffer of a DataLink stream, transport is paused
+    # only if twice of this are buffered so several binary frames
+    # are buffered by one read.
+    STREAM_BUFFER_LIMIT = 2 ** 20
+
     def __init__(self, host: str, port: int, protocol: str,
                  processor: Callable[['DataLink', Any, Any], None],
-                 args: Any, notify_q: multiprocessing.Queue) -> None:
+                 args: Any, notify_pipe: NotifyPipe, procs: int = 1) -> None:
         """
         protocol's value is TCP_DATALINK or UDP_DATALINK
+
+        procs processes serve the DataLink, they share the port
+        via SO_REUSEPORT so kernel balance connections among them.
         """
 
         self.host = host
         self.port = port
         self._proto = protocol
-        self._notifyQ = notify_q
+        self._notifyPipe = notify_pipe
 
         # Processor
         self._processor = processor  # type: Callable[[DataLink, Any, Any], None]
         self._args = args  # type: Any
 
-        self._p = None  # type: Optional[multiprocessing.Process]
+        self._procs = procs
+        self._ps = []  # type: List[multiprocessing.Process]
 
     def start(self) -> None:
-        self._p = multiprocessing.Process(
-            target=self.run, args=(self._notifyQ,))
-        self._p.start()
+        for _ in range(self._procs):
+            p = multiprocessing.Process(
+                target=self.run, args=(self._notifyPipe,))
+            p.start()
+
+            self._ps.append(p)
 
     def stop(self) -> None:
-        if self._p is not None:
-            self._p.terminate()
+        for p in self._ps:
+            p.terminate()
+        self._ps = []
+
+    def isReusePort(self) -> bool:
+        return self._procs > 1
 
     def notify(self, notify: DataLinkNotify) -> None:
-        self._notifyQ.put_nowait(tuple(notify))
+        self._notifyPipe.put(tuple(notify))
 
-    def run(self, notify_q: multiprocessing.Queue) -> None:
+    def run(self, notify_pipe: NotifyPipe) -> None:
         # Setup a loop for current thread.
         asyncio.set_event_loop(
             asyncio.new_event_loop())
@@ -147,7 +192,9 @@ class DataLink:
         assert(self._processor is not None)
 
         server = await asyncio.start_server(
-            self._tcp_datalink_factory, self.host, self.port)
+            self._tcp_datalink_factory, self.host, self.port,
+            limit=DataLink.STREAM_BUFFER_LIMIT,
+            reuse_port=self.isReusePort())
         async with server:
             self.server = server
             await server.serve_forever()
@@ -157,7 +204,17 @@ class DataLink:
         while True:
             try:
                 letter = await receving(reader)
+
+                if isinstance(letter, BinaryStreamLetter):
+                    # Content of the file follow the letter,
+                    # processor read it from the stream.
+                    letter.bindStream(reader, writer)
+
                 await self._processor(self, letter, self._args)  # type: ignore
+
+                if isinstance(letter, BinaryStreamLetter):
+                    # Content not consumed by processor.
+                    await letter.skip()
             except Exception:
                 writer.close()
                 break
@@ -166,7 +223,8 @@ class DataLink:
         loop = asyncio.get_running_loop()
         transport, proto = await loop.create_datagram_endpoint(
             lambda: DataLinkProcProtocol(self._processor, self._args),
-            local_addr=(self.host, self.port)
+            local_addr=(self.host, self.port),
+            reuse_port=self.isReusePort()
         )
 
         while True:
@@ -175,26 +233,31 @@ class DataLink:
         transport.close()
 
 
-class DataLinker(ModuleTDaemon):
+class DataLinker(ModuleDaemon):
 
     def __init__(self) -> None:
-        # Init as a Thread ModuleDaemon
-        ModuleTDaemon.__init__(self, M_NAME)
+        # Init as a ModuleDaemon, notifies from DataLinks
+        # are dealt in the event loop that DataLinker start in.
+        ModuleDaemon.__init__(self, M_NAME)
 
         self._links = []  # type: List[DataLink]
-        self._msgQueue = multiprocessing.Queue(256) \
-            # type: multiprocessing.Queue[DataLinkNotify]
+        self._notifyPipe = NotifyPipe()
         self._notify_cb = {}  # type: Dict[tag, Notifier]
-        self._isNeedStop = False
+        self._loop = None  # type: Optional[asyncio.AbstractEventLoop]
 
     def addDataLink(self, host: str, port: int, proto: str,
-                    processor: Callable, args: Any) -> None:
+                    processor: Callable, args: Any, procs: int = 1) -> None:
+        """
+        Add a DataLink served by procs processes, notifies
+        from all of them are dealt by this DataLinker.
+        """
 
         # No replicate.
         if self.isLinkExists(host, port):
             return None
 
-        dl = DataLink(host, port, proto, processor, args, self._msgQueue)
+        dl = DataLink(host, port, proto, processor, args,
+                      self._notifyPipe, procs)
         self._links.append(dl)
 
     def addNotify(self, tag: str, cb: Callable[[Any, Any], None], arg: Any) -> None:
@@ -208,27 +271,22 @@ class DataLinker(ModuleTDaemon):
         match = [dl for dl in self._links if host == dl.host and port == dl.port]
         return len(match) > 0
 
-    def start(self) -> None:
-        threading.Thread.start(self)
-
-    def is_alive(self) -> bool:
-        return threading.Thread.is_alive(self)
-
-    def run(self) -> None:
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
 
         # Start all DataLinks
         for dl in self._links:
             dl.start()
 
-        # Deal with messages from DataLinks.
+        # Deal with notifies from DataLinks.
+        self._loop.add_reader(self._notifyPipe.fileno(), self._dispatch)
+        self.alive = True
+
         while True:
-            try:
-                tag, msg = self._msgQueue.get(timeout=3)
-            except multiprocessing.queues.Empty:
-                if self._isNeedStop is True:
-                    break
-                continue
+            await asyncio.sleep(3600)
 
+    def _dispatch(self) -> None:
+        for tag, msg in self._notifyPipe.get_all():
             if tag not in self._notify_cb:
                 continue
 
@@ -237,12 +295,17 @@ class DataLinker(ModuleTDaemon):
             except Exception:
                 traceback.print_exc()
 
+    def stop(self) -> None:
+        if self._loop is not None:
+            self._loop.remove_reader(self._notifyPipe.fileno())
+            self._loop = None
+
         # Stop all DataLinks
         for dl in self._links:
             dl.stop()
 
-    def stop(self) -> None:
-        self._isNeedStop = True
+        self.alive = False
+        ModuleDaemon.stop(self)
 
     async def begin(self) -> None:
         return
@@ -0,0 +1,351 @@
+# MIT License
+#
+# Copyright (c) 2020 Gcom
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# delta.py
+#
+# Rolling checksum delta of a file against a base file that
+# only receiver have, in the way of rsync.
+#
+# Receiver send signature of the base, weak and strong checksum
+# of each block of it. Sender roll the weak checksum over the file
+# byte by byte, block that match a block of the base is sent as a
+# copy of that block and others are sent as literal.
+#
+# Format of signature:
+#   blockSize | (weak, strong) * blocks
+#
+# Format of delta:
+#   blockSize | ('C', index, count | 'L', length, bytes) * ops
+
+import os
+import zlib
+import math
+import struct
+import hashlib
+
+from typing import BinaryIO, Dict, Tuple, Optional, List
+from manager.basic.letter import stream_hash
+
+
+BLOCK_MIN = 2 ** 11
+BLOCK_MAX = 2 ** 17
+
+# Bytes read from the file each time while computing delta.
+READ_SIZE = 2 ** 22
+# Literal is flushed after this many bytes.
+LITERAL_MAX = 2 ** 20
+# Bytes of the file to process before giving up a delta
+# that is not small enough.
+GIVE_UP_AFTER = 2 ** 24
+# Windows of the file that are checked against the base before
+# delta is computed, files smaller than SAMPLE_MIN are not sampled.
+SAMPLES = 32
+SAMPLE_MIN = 2 ** 22
+
+ADLER_MOD = 65521
+
+HEAD = struct.Struct("!I")
+SIG_BLOCK = struct.Struct("!I16s")
+COPY = struct.Struct("!II")
+LITERAL = struct.Struct("!I")
+
+OP_COPY = b"C"
+OP_LITERAL = b"L"
+
+
+class DELTA_CORRUPTED(Exception):
+
+    def __str__(self) -> str:
+        return "Delta is corrupted"
+
+
+def block_size(size: int) -> int:
+    """
+    Block size of a file of size, bigger files use bigger
+    blocks to bound size of signature.
+    """
+    return min(BLOCK_MAX, max(BLOCK_MIN, int(math.sqrt(size))))
+
+
+def strong(block: memoryview) -> bytes:
+    return hashlib.blake2b(block, digest_size=16).digest()
+
+
+def signature(path: str, blockSize: int) -> bytes:
+    """
+    Signature of blocks of a base file, tail of the file that
+    shorter than a block is not included.
+    """
+    parts = [HEAD.pack(blockSize)]
+
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(blockSize)
+            if len(block) < blockSize:
+                break
+            parts.append(SIG_BLOCK.pack(zlib.adler32(block),
+                                        strong(memoryview(block))))
+
+    return b"".join(parts)
+
+
+def roll(weak: int, out_: int, in_: int, blockSize: int) -> int:
+    """
+    Weak checksum of the window moved one byte forward.
+    """
+    a = ((weak & 0xffff) - out_ + in_) % ADLER_MOD
+    b = ((weak >> 16) - blockSize * out_ + a - 1) % ADLER_MOD
+    return (b << 16) | a
+
+
+def parse_signature(sig: bytes) -> Tuple[int, Dict[int, Dict[bytes, int]]]:
+    (blockSize,) = HEAD.unpack_from(sig)
+    blocks = {}  # type: Dict[int, Dict[bytes, int]]
+
+    for index, (weak, strong_) in enumerate(
+            SIG_BLOCK.iter_unpack(sig[HEAD.size:])):
+        blocks.setdefault(weak, {}).setdefault(strong_, index)
+
+    return blockSize, blocks
+
+
+def sample(f: BinaryIO, size: int, blockSize: int,
+           blocks: Dict[int, Dict[bytes, int]]) -> int:
+    """
+    Number of SAMPLES windows spread over the file that contain
+    a block of the base at any offset. A window is two blocks
+    long so a block of the base within it is found wherever
+    it is aligned.
+    """
+    hits = 0
+
+    for i in range(SAMPLES):
+        f.seek(i * (size // SAMPLES))
+        buf = f.read(2 * blockSize)
+        if len(buf) < blockSize:
+            continue
+
+        view = memoryview(buf)
+        weak = zlib.adler32(view[:blockSize])
+
+        for pos in range(len(buf) - blockSize + 1):
+            candidates = blocks.get(weak)
+            if candidates is not None and \
+               strong(view[pos:pos+blockSize]) in candidates:
+                hits += 1
+                break
+
+            if pos + blockSize < len(buf):
+                weak = roll(weak, buf[pos], buf[pos+blockSize], blockSize)
+
+        view.release()
+
+    f.seek(0)
+
+    return hits
+
+
+class _DeltaWriter:
+
+    def __init__(self, out: BinaryIO, blockSize: int) -> None:
+        self._out = out
+        self._copy = None  # type: Optional[List[int]]
+        self.written = HEAD.size
+        self.literal = 0
+
+        out.write(HEAD.pack(blockSize))
+
+    def copy(self, index: int) -> None:
+        copy = self._copy
+        if copy is not None and copy[0] + copy[1] == index:
+            copy[1] += 1
+            return
+
+        self._flush()
+        self._copy = [index, 1]
+
+    def literal_(self, data: memoryview) -> None:
+        if len(data) == 0:
+            return
+
+        self._flush()
+        self._out.write(OP_LITERAL + LITERAL.pack(len(data)))
+        self._out.write(data)
+        self.written += 1 + LITERAL.size + len(data)
+        self.literal += len(data)
+
+    def close(self) -> None:
+        self._flush()
+
+    def _flush(self) -> None:
+        if self._copy is None:
+            return
+
+        self._out.write(OP_COPY + COPY.pack(*self._copy))
+        self.written += 1 + COPY.size
+        self._copy = None
+
+
+def delta(path: str, sig: bytes, out: BinaryIO,
+          ratio: Optional[float] = None) -> Optional[int]:
+    """
+    Write delta of the file against the base described by sig
+    into out, size of delta is returned.
+
+    Bytes that not match the base are scanned byte by byte, so
+    if delta exceed ratio of the file it's given up as soon as
+    possible and None is returned, it's better to transfer
+    the file in that case. Delta of a big file is given up
+    without scanning if few samples of it match the base.
+    """
+    blockSize, blocks = parse_signature(sig)
+    writer = _DeltaWriter(out, blockSize)
+
+    def exceed(processed: int) -> bool:
+        return ratio is not None and \
+            writer.written > ratio * max(processed, GIVE_UP_AFTER)
+
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+
+        if ratio is not None and size >= SAMPLE_MIN and \
+           sample(f, size, blockSize, blocks) < SAMPLES * (1 - ratio) / 2:
+            return None
+
+        buf = f.read(READ_SIZE)
+        eof = len(buf) < READ_SIZE
+        view = memoryview(buf)
+
+        # Window is buf[pos:pos+blockSize], literal not
+        # sent yet is buf[lit:pos].
+        pos = lit = 0
+        # Bytes of the file before buf.
+        consumed = 0
+        weak = None  # type: Optional[int]
+
+        while True:
+            if len(buf) - pos < blockSize:
+                if eof:
+                    break
+
+                writer.literal_(view[lit:pos])
+                more = f.read(READ_SIZE)
+                eof = len(more) < READ_SIZE
+                view.release()
+                buf = buf[pos:] + more
+                view = memoryview(buf)
+                consumed += pos
+                pos = lit = 0
+                continue
+
+            if weak is None:
+                weak = zlib.adler32(view[pos:pos+blockSize])
+
+            candidates = blocks.get(weak)
+            if candidates is not None:
+                index = candidates.get(strong(view[pos:pos+blockSize]))
+                if index is not None:
+                    writer.literal_(view[lit:pos])
+                    writer.copy(index)
+                    pos = lit = pos + blockSize
+                    weak = None
+                    continue
+
+            # Roll the window one byte forward, roll() is inlined
+            # since it's the hot path.
+            if pos + blockSize < len(buf):
+                out_, in_ = buf[pos], buf[pos+blockSize]
+                a = ((weak & 0xffff) - out_ + in_) % ADLER_MOD
+                b = ((weak >> 16) - blockSize * out_ + a - 1) % ADLER_MOD
+                weak = (b << 16) | a
+            else:
+                weak = None
+            pos += 1
+
+            if pos - lit >= LITERAL_MAX:
+                writer.literal_(view[lit:pos])
+                lit = pos
+
+                if exceed(consumed + pos):
+                    return None
+
+        writer.literal_(view[lit:])
+        view.release()
+
+    writer.close()
+
+    if ratio is not None and writer.written > ratio * (consumed + len(buf)):
+        return None
+
+    return writer.written
+
+
+def patch(base: str, delta: BinaryIO, out: BinaryIO) -> str:
+    """
+    Rebuild the file from base and delta into out,
+    checksum of the file is returned.
+    """
+    h = stream_hash()
+
+    def write(data: bytes) -> None:
+        out.write(data)
+        h.update(data)
+
+    head = delta.read(HEAD.size)
+    if len(head) != HEAD.size:
+        raise DELTA_CORRUPTED()
+    (blockSize,) = HEAD.unpack(head)
+
+    with open(base, "rb") as b:
+        while True:
+            op = delta.read(1)
+            if op == b"":
+                break
+
+            if op == OP_COPY:
+                index, count = COPY.unpack(_read(delta, COPY.size))
+                b.seek(index * blockSize)
+                remain = count * blockSize
+
+                while remain > 0:
+                    data = b.read(min(remain, LITERAL_MAX))
+                    if not data:
+                        raise DELTA_CORRUPTED()
+                    write(data)
+                    remain -= len(data)
+
+            elif op == OP_LITERAL:
+                (length,) = LITERAL.unpack(_read(delta, LITERAL.size))
+                write(_read(delta, length))
+
+            else:
+                raise DELTA_CORRUPTED()
+
+    return h.hexdigest()
+
+
+def _read(f: BinaryIO, n: int) -> bytes:
+    data = f.read(n)
+    if len(data) != n:
+        raise DELTA_CORRUPTED()
+    return data
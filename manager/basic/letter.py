@@ -25,9 +25,12 @@
 # How to communicate with worker ?
 
 import json
+import struct
+import zlib
+import hashlib
 import asyncio
 import socket
-import time
+import select
 
 import traceback
 from typing import Optional, Dict, \
@@ -76,6 +79,17 @@ def logRegisterLetterValidity(letter:  'Letter') -> bool:
     return isHValid
 
 
+class LETTER_TOO_LARGE(Exception):
+
+    def __init__(self, type_: str, length: int) -> None:
+        self._type = type_
+        self._length = length
+
+    def __str__(self) -> str:
+        return "Letter " + self._type + " of " + str(self._length) + \
+            " bytes is too large for the codec of the link"
+
+
 class Letter:
 
     # Format of NewTask letter
@@ -177,14 +191,112 @@ class Letter:
 
     Notify = "Notify"
 
+    """
+    Format of BinaryStreamLetter
+    Type    : 'bstream'
+    Header  : {"tid":..., "fileName":..., "parent":...}
+    Content : {"size":..., "checksum":..., "resume":...,
+               "begin":..., "fileSize":..., "query":...,
+               "delta":..., "base":...}
+
+    The letter is followed by 'size' bytes of the file
+    without framing. A letter with 'begin' and 'fileSize'
+    carry a range of the file that begin at 'begin',
+    'checksum' is checksum of the whole file.
+
+    A letter with 'query' is not followed by the file, it
+    ask receiver whether it already have the file. With
+    'delta' receiver that not have the file may reply
+    signature of a base file to send delta against.
+
+    A letter with 'base' is followed by delta of the file
+    against the base, 'checksum' is checksum of the file.
+    """
+    BinaryStream = "bstream"
+
+    """
+    Format of BinaryStreamAckLetter
+    Type    : 'bstreamAck'
+    Header  : {"tid":...}
+    Content : {"offset":..., "state":..., "base":...}
+
+    Ack with 'base' is followed by 'offset' bytes of
+    signature of the base file.
+
+    A range that is 'refused' is not accepted by the receiver,
+    sender should transfer the whole file instead.
+    """
+    BinaryStreamAck = "bstreamAck"
+
     BINARY_HEADER_LEN = 260
     BINARY_MIN_HEADER_LEN = 6
     LETTER_TYPE_LEN = 2
 
+    # First 2 bytes of a JSON letter is it's length, a JSON letter
+    # is never shorter than a few bytes so small values are used as
+    # tags of frame types.
+    FRAME_BINARY = 1
+    FRAME_COMPACT = 2
+    FRAME_JSON_EXT = 3
+    FRAME_ZLIB = 4
+
+    # Format of compact letter
+    # | Type (2Bytes) 00002 :: Int | Length (4Bytes) :: Int | Payload |
+    COMPACT_HEADER_LEN = 6
+
+    # Format of extended length JSON letter
+    # | Type (2Bytes) 00003 :: Int | Length (4Bytes) :: Int | JSON |
+    JSON_EXT_HEADER_LEN = 6
+    JSON_MAX_LEN = 0xFFFF
+
+    # Format of compressed letter
+    # | Type (2Bytes) 00004 :: Int | Length (4Bytes) :: Int | zlib(Frame) |
+    # Frame is a whole frame of another format.
+    ZLIB_HEADER_LEN = 6
+
+    # Codecs of letter, codec used on a link is
+    # negotiated via PropLetter while the link is established.
+    CODEC_JSON = "json"
+    CODEC_JSON_EXT = "json-ext"
+    CODEC_COMPACT = "compact"
+
+    # Compression of letters, negotiated via PropLetter
+    # as codecs. Frames shorter than COMPRESS_THRES are
+    # sent without compression.
+    COMPRESS_NONE = ""
+    COMPRESS_ZLIB = "zlib"
+    COMPRESS_THRES = 512
+
     MAX_LEN = 512
 
+    # Content of letters larger than this are decoded
+    # while it's first accessed.
+    LAZY_CONTENT_THRES = 1024
+
+    # Once the first bytes of a frame arrived the rest of it
+    # is expected to arrive shortly, a frame that stall longer
+    # than this leave the stream out of sync.
+    FRAME_REST_TIMEOUT = 10
+
+    # Time to wait for receiver of a resumable
+    # transfer to reply a BinaryStreamAckLetter.
+    STREAM_ACK_TIMEOUT = 60
+
+    # Size of each read and write of a file body
+    # that follow a BinaryStreamLetter.
+    STREAM_CHUNK_SIZE = 2 ** 18
+
+    # Time to wait for the next chunk of a file body, a stream
+    # that stalled longer than this is treated as broken.
+    STREAM_READ_TIMEOUT = 60
+
     format = '{"type": "%s", "header": %s, "content": %s}'
 
+    __slots__ = ("type_", "header", "_content", "_content_decoder")
+    FORMAT_TYPE_BEGIN = '{"type": "'
+    FORMAT_HEADER_BEGIN = '", "header": '
+    FORMAT_CONTENT_BEGIN = ', "content": '
+
     def __init__(self, type_:  str,
                  header:  Dict[str, str],
                  content:  Dict[str, Any]) -> None:
@@ -195,11 +307,27 @@ class Letter:
         self.header = header
 
         # content field is a dictionary
-        self.content = content
+        self._content = content
+
+        # Decoder of content that not yet decoded.
+        self._content_decoder = None  # type: Optional[Callable[[], Dict]]
 
         #if not self.validity():
         #    print(self.type_ + str(self.header) + str(self.content))
 
+    @property
+    def content(self) -> Dict[str, Any]:
+        if self._content_decoder is not None:
+            self._content = self._content_decoder()
+            self._content_decoder = None
+
+        return self._content
+
+    @content.setter
+    def content(self, content: Dict[str, Any]) -> None:
+        self._content = content
+        self._content_decoder = None
+
     # Generate a json string
     def toString(self) -> str:
         # length of content after length
@@ -217,12 +345,46 @@ class Letter:
         jsonStr = self.toString()
         return json.loads(jsonStr)
 
-    def toBytesWithLength(self) -> bytes:
+    def toBytesWithLength(self, codec: str = CODEC_JSON,
+                          compress: str = COMPRESS_NONE) -> bytes:
+        if codec == Letter.CODEC_COMPACT:
+            frame = self.toBytesCompact()
+        else:
+            frame = self.toBytesJSON(codec)
+
+        if compress == Letter.COMPRESS_ZLIB and \
+           len(frame) >= Letter.COMPRESS_THRES:
+            return compress_frame(self.type_, frame)
+
+        return frame
+
+    def toBytesJSON(self, codec: str = CODEC_JSON) -> bytes:
         str = self.toString()
         bStr = str.encode()
 
+        if len(bStr) > Letter.JSON_MAX_LEN:
+            # Letters that length not fit into 2 bytes are
+            # framed with 4 bytes length if the link support.
+            if codec != Letter.CODEC_JSON_EXT:
+                raise LETTER_TOO_LARGE(self.type_, len(bStr))
+
+            return COMPACT_FRAME_HEADER.pack(
+                Letter.FRAME_JSON_EXT, len(bStr)) + bStr
+
         return len(bStr).to_bytes(2, "big") + bStr
 
+    def toBytesCompact(self) -> bytes:
+        parts = []  # type: List[bytes]
+
+        compact_encode(self.type_, parts)
+        compact_encode(self.header, parts)
+        compact_encode(self.content, parts)
+
+        payload = b"".join(parts)
+
+        return COMPACT_FRAME_HEADER.pack(
+            Letter.FRAME_COMPACT, len(payload)) + payload
+
     @staticmethod
     def json2Letter(s:  str) -> 'Letter':
         dict_ = None
@@ -266,37 +428,186 @@ class Letter:
         if len(s) < 2:
             return 2 - len(s)
         else:
-            if int.from_bytes(s[:2], "big") == 1:
+            frame = int.from_bytes(s[:2], "big")
+
+            if frame == Letter.FRAME_BINARY:
                 if len(s) < Letter.BINARY_HEADER_LEN:
                     return Letter.BINARY_HEADER_LEN - len(s)
 
                 length = int.from_bytes(s[2:6], "big")
                 return length - (len(s) - Letter.BINARY_HEADER_LEN)
+            elif frame == Letter.FRAME_COMPACT or \
+                    frame == Letter.FRAME_JSON_EXT or \
+                    frame == Letter.FRAME_ZLIB:
+                if len(s) < Letter.COMPACT_HEADER_LEN:
+                    return Letter.COMPACT_HEADER_LEN - len(s)
+
+                length = int.from_bytes(s[2:6], "big")
+                return length - (len(s) - Letter.COMPACT_HEADER_LEN)
             else:
                 length = int.from_bytes(s[:2], "big")
                 return length - (len(s) - 2)
 
+    @staticmethod
+    def frameHeaderLen(prefix: Union[bytes, bytearray]) -> int:
+        """
+        Length of header of the frame begin with prefix,
+        prefix is the first 2 bytes of the frame.
+        """
+        frame = int.from_bytes(prefix[:2], "big")
+
+        if frame == Letter.FRAME_BINARY:
+            return Letter.BINARY_HEADER_LEN
+        elif frame == Letter.FRAME_COMPACT:
+            return Letter.COMPACT_HEADER_LEN
+        elif frame == Letter.FRAME_JSON_EXT:
+            return Letter.JSON_EXT_HEADER_LEN
+        elif frame == Letter.FRAME_ZLIB:
+            return Letter.ZLIB_HEADER_LEN
+        else:
+            return 2
+
+    @staticmethod
+    def frameBodyLen(header: Union[bytes, bytearray]) -> int:
+        """
+        Length of body of the frame with header.
+        """
+        frame = int.from_bytes(header[:2], "big")
+
+        if frame == Letter.FRAME_BINARY or frame == Letter.FRAME_COMPACT \
+           or frame == Letter.FRAME_JSON_EXT or frame == Letter.FRAME_ZLIB:
+            return int.from_bytes(header[2:6], "big")
+        else:
+            return frame
+
+    @staticmethod
+    def parseFrame(header: Union[bytes, bytearray],
+                   body: Union[bytes, bytearray]) -> Optional['Letter']:
+        """
+        Parse a frame received as header and body, body is
+        used without copy it into a whole frame.
+        """
+        frame = int.from_bytes(header[:2], "big")
+
+        if frame == Letter.FRAME_BINARY:
+            return BinaryLetter.parseFrame(header, body)
+        elif frame == Letter.FRAME_COMPACT:
+            return Letter._parse_compact(body, 0)
+        elif frame == Letter.FRAME_ZLIB:
+            return Letter.parse(zlib.decompress(body))
+        else:
+            return Letter._parse_json(body, 0)
+
     @staticmethod
     def parse(s: bytes) -> Optional['Letter']:
         # To check that is BinaryFile type or another
-        if int.from_bytes(s[: 2], "big") == 1:
+        if int.from_bytes(s[: 2], "big") == Letter.FRAME_BINARY:
             return BinaryLetter.parse(s)
         else:
             return Letter._parse(s)
 
     @staticmethod
     def _parse(s: bytes) -> Optional['Letter']:
+        """
+        Decode a frame once and build the typed letter from
+        decoded parts.
+        """
+        frame = int.from_bytes(s[:2], "big")
+
+        if frame == Letter.FRAME_COMPACT:
+            return Letter._parse_compact(s)
+        elif frame == Letter.FRAME_ZLIB:
+            return Letter.parse(
+                zlib.decompress(s[Letter.ZLIB_HEADER_LEN:]))
+        elif frame == Letter.FRAME_JSON_EXT:
+            return Letter._parse_json(s, Letter.JSON_EXT_HEADER_LEN)
+        else:
+            return Letter._parse_json(s)
+
+    @staticmethod
+    def _parse_compact(s: Union[bytes, bytearray],
+                       begin: int = COMPACT_HEADER_LEN) \
+            -> Optional['Letter']:
+        type_, pos = compact_decode(s, begin)
+        header, pos = compact_decode(s, pos)
+
+        if len(s) - pos < Letter.LAZY_CONTENT_THRES:
+            content, _ = compact_decode(s, pos)
+            return Letter.fromParts(type_, header, content)
+
+        letter = Letter.fromParts(type_, header, None)
+        letter._content_decoder = lambda: compact_decode(s, pos)[0]
+
+        return letter
+
+    @staticmethod
+    def _parse_json(s: Union[bytes, bytearray],
+                    begin: int = 2) -> Optional['Letter']:
         try:
-            letter = s[2:].decode()
+            letter = (s[begin:] if begin > 0 else s).decode()
         except Exception:
             traceback.print_exc()
             raise Exception
 
+        if len(letter) >= Letter.LAZY_CONTENT_THRES:
+            lazy = Letter._parse_json_lazy(letter)
+            if lazy is not None:
+                return lazy
+
         dict_ = json.loads(letter)
 
-        type_ = dict_['type']
+        return Letter.fromParts(
+            dict_['type'], dict_['header'], dict_['content'])
+
+    @staticmethod
+    def _parse_json_lazy(letter: str) -> Optional['Letter']:
+        """
+        Decode type and header of a letter generated by toString(),
+        content is decoded while it's first accessed.
+
+        None is returned if the letter is not in format of toString().
+        """
+        if not letter.startswith(Letter.FORMAT_TYPE_BEGIN):
+            return None
+
+        begin = len(Letter.FORMAT_TYPE_BEGIN)
+        end = letter.find(Letter.FORMAT_HEADER_BEGIN, begin)
+        if end < 0:
+            return None
 
-        return parseMethods[type_].parse(s)
+        type_ = letter[begin:end]
+
+        try:
+            header, end = JSON_DECODER.raw_decode(
+                letter, end + len(Letter.FORMAT_HEADER_BEGIN))
+        except json.JSONDecodeError:
+            return None
+
+        if not letter.startswith(Letter.FORMAT_CONTENT_BEGIN, end) or \
+           not letter.endswith("}"):
+            return None
+
+        begin = end + len(Letter.FORMAT_CONTENT_BEGIN)
+
+        letter_ = Letter.fromParts(type_, header, None)
+        letter_._content_decoder = \
+            lambda: JSON_DECODER.decode(letter[begin:-1])
+
+        return letter_
+
+    @staticmethod
+    def fromParts(type_: str, header: Dict[str, str],
+                  content: Any) -> 'Letter':
+        """
+        Build typed letter from decoded parts without go
+        through constructor of the type.
+        """
+        cls = parseMethods[type_]
+
+        letter = cls.__new__(cls)
+        Letter.__init__(letter, type_, header, content)
+
+        return letter
 
     def validity(self) -> bool:
         type = self.typeOfLetter()
@@ -313,8 +624,295 @@ class Letter:
         return self.header['ident']
 
 
+# Compact codec
+#
+# Payload of a compact letter is three typed fields: type of
+# the letter, header and content. Each typed field is begin
+# with a 1 byte tag:
+#
+# | 's' | Length (4Bytes) | utf-8 string |
+# | 'b' | Length (4Bytes) | bytes |
+# | 'i' | Int (8Bytes) |
+# | 'f' | Float (8Bytes) |
+# | 'l' | Count (4Bytes) | field_1 | ... | field_n |
+# | 'd' | Count (4Bytes) | key_1 | value_1 | ... | key_n | value_n |
+# | 'T' | (True) 'F' | (False) 'N' | (None)
+#
+# Most of headers and contents are mapping from str to str and
+# lists of commands are lists of str, such fields are packed into
+# a single NUL seperated utf-8 block so they are encoded and decoded
+# within a few calls:
+#
+# | 'L' | Count (4Bytes) | Length (4Bytes) | item_1\0...\0item_n |
+# | 'D' | Count (4Bytes) | Length (4Bytes) | key_1\0...\0key_n\0value_1\0...\0value_n |
+COMPACT_FRAME_HEADER = struct.Struct(">HI")
+
+# Header of BinaryLetter
+# | Type (2Bytes) | Length (4Bytes) | FileName (32Bytes) | TaskId (128Bytes)
+# | Parent (64Bytes) | Menu (30Bytes) |
+BINARY_HEADER = struct.Struct(">HI32s128s64s30s")
+COMPACT_TAG_LEN = struct.Struct(">BI")
+COMPACT_TAG_COUNT_LEN = struct.Struct(">BII")
+COMPACT_TAG_INT = struct.Struct(">Bq")
+COMPACT_TAG_FLOAT = struct.Struct(">Bd")
+COMPACT_LEN = struct.Struct(">I")
+COMPACT_COUNT_LEN = struct.Struct(">II")
+COMPACT_INT = struct.Struct(">q")
+COMPACT_FLOAT = struct.Struct(">d")
+
+TAG_STR, TAG_BYTES, TAG_INT, TAG_FLOAT, TAG_LIST, TAG_DICT, \
+    TAG_STR_LIST, TAG_STR_DICT, TAG_TRUE, TAG_FALSE, TAG_NONE = b"sbifldLDTFN"
+
+
+class COMPACT_CODEC_UNSUPPORT_TYPE(Exception):
+
+    def __init__(self, t: type) -> None:
+        self._t = t
+
+    def __str__(self) -> str:
+        return "Type " + self._t.__name__ + " is not support by compact codec"
+
+
+class COMPACT_CODEC_BROKEN_PAYLOAD(Exception):
+    pass
+
+
+def _nul_join(strs: Tuple) -> Optional[str]:
+    """
+    Join strs with NUL, return None if there is a non-str
+    item or an item contain NUL.
+    """
+    try:
+        joined = "\0".join(strs)
+    except TypeError:
+        return None
+
+    if joined.count("\0") != len(strs) - 1:
+        return None
+
+    return joined
+
+
+def compact_encode(v: Any, parts: List[bytes]) -> None:
+    t = type(v)
+
+    if t is str:
+        bs = v.encode()
+        parts.append(COMPACT_TAG_LEN.pack(TAG_STR, len(bs)))
+        parts.append(bs)
+    elif t is dict:
+        joined = _nul_join((*v.keys(), *v.values())) if v else None
+
+        if joined is not None:
+            bs = joined.encode()
+            parts.append(COMPACT_TAG_COUNT_LEN.pack(
+                TAG_STR_DICT, len(v), len(bs)))
+            parts.append(bs)
+            return
+
+        parts.append(COMPACT_TAG_LEN.pack(TAG_DICT, len(v)))
+        for key, value in v.items():
+            compact_encode(key, parts)
+            compact_encode(value, parts)
+    elif t is list or t is tuple:
+        joined = _nul_join(tuple(v)) if v else None
+
+        if joined is not None:
+            bs = joined.encode()
+            parts.append(COMPACT_TAG_COUNT_LEN.pack(
+                TAG_STR_LIST, len(v), len(bs)))
+            parts.append(bs)
+            return
+
+        parts.append(COMPACT_TAG_LEN.pack(TAG_LIST, len(v)))
+        for item in v:
+            compact_encode(item, parts)
+    elif t is bytes or t is bytearray:
+        parts.append(COMPACT_TAG_LEN.pack(TAG_BYTES, len(v)))
+        parts.append(bytes(v))
+    elif t is bool:
+        parts.append(bytes((TAG_TRUE if v else TAG_FALSE,)))
+    elif t is int:
+        parts.append(COMPACT_TAG_INT.pack(TAG_INT, v))
+    elif t is float:
+        parts.append(COMPACT_TAG_FLOAT.pack(TAG_FLOAT, v))
+    elif v is None:
+        parts.append(bytes((TAG_NONE,)))
+    else:
+        raise COMPACT_CODEC_UNSUPPORT_TYPE(t)
+
+
+def compact_decode(s: Union[bytes, bytearray],
+                   pos: int) -> Tuple[Any, int]:
+    """
+    Decode a typed field begin at pos, return the value
+    and the position after the field.
+    """
+    try:
+        tag = s[pos]
+        pos += 1
+
+        if tag == TAG_STR_DICT:
+            count, length = COMPACT_COUNT_LEN.unpack_from(s, pos)
+            pos += 8
+            strs = str(s[pos:pos+length], "utf-8").split("\0")
+            if len(strs) != count * 2:
+                raise COMPACT_CODEC_BROKEN_PAYLOAD()
+            return dict(zip(strs[:count], strs[count:])), pos + length
+        elif tag == TAG_STR:
+            length = COMPACT_LEN.unpack_from(s, pos)[0]
+            pos += 4
+            return str(s[pos:pos+length], "utf-8"), pos + length
+        elif tag == TAG_STR_LIST:
+            count, length = COMPACT_COUNT_LEN.unpack_from(s, pos)
+            pos += 8
+            strs = str(s[pos:pos+length], "utf-8").split("\0")
+            if len(strs) != count:
+                raise COMPACT_CODEC_BROKEN_PAYLOAD()
+            return strs, pos + length
+        elif tag == TAG_DICT:
+            count = COMPACT_LEN.unpack_from(s, pos)[0]
+            pos += 4
+            d = {}
+            for _ in range(count):
+                key, pos = compact_decode(s, pos)
+                d[key], pos = compact_decode(s, pos)
+            return d, pos
+        elif tag == TAG_LIST:
+            count = COMPACT_LEN.unpack_from(s, pos)[0]
+            pos += 4
+            items = []
+            for _ in range(count):
+                item, pos = compact_decode(s, pos)
+                items.append(item)
+            return items, pos
+        elif tag == TAG_BYTES:
+            length = COMPACT_LEN.unpack_from(s, pos)[0]
+            pos += 4
+            return bytes(s[pos:pos+length]), pos + length
+        elif tag == TAG_INT:
+            return COMPACT_INT.unpack_from(s, pos)[0], pos + 8
+        elif tag == TAG_FLOAT:
+            return COMPACT_FLOAT.unpack_from(s, pos)[0], pos + 8
+        elif tag == TAG_TRUE:
+            return True, pos
+        elif tag == TAG_FALSE:
+            return False, pos
+        elif tag == TAG_NONE:
+            return None, pos
+    except (IndexError, struct.error, UnicodeDecodeError):
+        raise COMPACT_CODEC_BROKEN_PAYLOAD()
+
+    raise COMPACT_CODEC_BROKEN_PAYLOAD()
+
+
+JSON_DECODER = json.JSONDecoder()
+
+
+# Codecs supported by this side, in order of preference.
+SUPPORTED_CODECS = [Letter.CODEC_COMPACT, Letter.CODEC_JSON_EXT,
+                    Letter.CODEC_JSON]
+SUPPORTED_COMPRESS = [Letter.COMPRESS_ZLIB]
+
+
+def codec_negotiate(codecs: List[str]) -> str:
+    """
+    Choose a codec from codecs that supported by oppsite side.
+    Peers that do not report their codecs are speak JSON only.
+    """
+    for codec in SUPPORTED_CODECS:
+        if codec in codecs:
+            return codec
+
+    return Letter.CODEC_JSON
+
+
+def compress_negotiate(methods: List[str]) -> str:
+    """
+    Choose a compression from methods that offered by oppsite
+    side, letters are not compressed if nothing is offered.
+    """
+    for method in SUPPORTED_COMPRESS:
+        if method in methods:
+            return method
+
+    return Letter.COMPRESS_NONE
+
+
+class CompressStats:
+    """
+    Bytes of letters before and after compression
+    of each type of letter.
+    """
+
+    def __init__(self) -> None:
+        self._stats = {}  # type: Dict[str, List[int]]
+
+    def record(self, type_: str, raw: int, compressed: int) -> None:
+        if type_ not in self._stats:
+            self._stats[type_] = [0, 0, 0]
+
+        stat = self._stats[type_]
+        stat[0] += 1
+        stat[1] += raw
+        stat[2] += compressed
+
+    def ratio(self, type_: str) -> float:
+        """
+        Compressed bytes / raw bytes of letters of type_,
+        1.0 if no letter of type_ is compressed.
+        """
+        if type_ not in self._stats:
+            return 1.0
+
+        _, raw, compressed = self._stats[type_]
+        return compressed / raw
+
+    def toDict(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            type_: {"count": count, "raw": raw, "compressed": compressed,
+                    "ratio": compressed / raw}
+            for type_, (count, raw, compressed) in self._stats.items()
+        }
+
+    def reset(self) -> None:
+        self._stats = {}
+
+
+COMPRESS_STATS = CompressStats()
+
+
+def compress_frame(type_: str, frame: bytes) -> bytes:
+    """
+    Compress a frame into a zlib frame, frame is returned
+    as it is if it's not get smaller.
+    """
+    compressed = zlib.compress(frame)
+    COMPRESS_STATS.record(type_, len(frame), len(compressed))
+
+    if len(compressed) + Letter.ZLIB_HEADER_LEN >= len(frame):
+        return frame
+
+    return COMPACT_FRAME_HEADER.pack(
+        Letter.FRAME_ZLIB, len(compressed)) + compressed
+
+
 def bytesDivide(s: bytes) -> Tuple:
-    letter = s[2: ].decode()
+    if int.from_bytes(s[:2], "big") == Letter.FRAME_ZLIB:
+        s = zlib.decompress(s[Letter.ZLIB_HEADER_LEN:])
+
+    if int.from_bytes(s[:2], "big") == Letter.FRAME_COMPACT:
+        pos = Letter.COMPACT_HEADER_LEN
+        type_, pos = compact_decode(s, pos)
+        header, pos = compact_decode(s, pos)
+        content, pos = compact_decode(s, pos)
+
+        return (type_, header, content)
+
+    if int.from_bytes(s[:2], "big") == Letter.FRAME_JSON_EXT:
+        letter = s[Letter.JSON_EXT_HEADER_LEN:].decode()
+    else:
+        letter = s[2: ].decode()
     dict_ = json.loads(letter)
 
     type_ = dict_['type']
@@ -326,6 +924,8 @@ def bytesDivide(s: bytes) -> Tuple:
 
 class NewLetter(Letter):
 
+    __slots__ = ()
+
     def __init__(self, tid: str, sn: str,
                  vsn: str, datetime: str,
                  extra: Dict,
@@ -382,6 +982,8 @@ class NewLetter(Letter):
 
 class CancelLetter(Letter):
 
+    __slots__ = ()
+
     TYPE_SINGLE = "Single"
     TYPE_POST = "Post"
 
@@ -414,6 +1016,8 @@ CmdSubType = int
 
 class CommandLetter(Letter):
 
+    __slots__ = ()
+
     def __init__(self, type:  str, content:  Dict[str, str], target:  str = "",
                  extra: str = "") -> None:
         Letter.__init__(self, Letter.Command,
@@ -445,6 +1049,8 @@ class CommandLetter(Letter):
 
 class CmdResponseLetter(Letter):
 
+    __slots__ = ()
+
     STATE_SUCCESS = "s"
     STATE_FAILED = "f"
 
@@ -492,6 +1098,8 @@ class CmdResponseLetter(Letter):
 
 class PostTaskLetter(Letter):
 
+    __slots__ = ()
+
     def __init__(self, ident: str, ver: str,
                  cmds: List[str], output: str,
                  frags: List) -> None:
@@ -537,6 +1145,8 @@ class PostTaskLetter(Letter):
 
 class ResponseLetter(Letter):
 
+    __slots__ = ()
+
     def __init__(self, ident:  str, tid:  str, state:  str,
                  parent: str = "") -> None:
         Letter.__init__(
@@ -578,6 +1188,8 @@ class ResponseLetter(Letter):
 
 class NotifyLetter(Letter):
 
+    __slots__ = ()
+
     def __init__(self, ident: str, type: str, content: Dict) -> None:
         Letter.__init__(self, Letter.Notify,
                         {"ident": ident, "type": type}, content)
@@ -603,12 +1215,18 @@ class NotifyLetter(Letter):
 
 class PropLetter(Letter):
 
-    def __init__(self, ident: str, max: str, proc: str, role: str) -> None:
+    __slots__ = ()
+
+    def __init__(self, ident: str, max: str, proc: str, role: str,
+                 codecs: Optional[List[str]] = None,
+                 compress: Optional[List[str]] = None) -> None:
         Letter.__init__(
             self,
             Letter.PropertyNotify,
             {"ident":  ident},
-            {"MAX":  max, "PROC":  proc, "role": role}
+            {"MAX":  max, "PROC":  proc, "role": role,
+             "codecs": [] if codecs is None else codecs,
+             "compress": [] if compress is None else compress}
         )
 
     @staticmethod
@@ -622,7 +1240,10 @@ class PropLetter(Letter):
             ident=header['ident'],
             max=content['MAX'],
             proc=content['PROC'],
-            role=content['role']
+            role=content['role'],
+            # PropLetter from older workers has no codecs.
+            codecs=content.get('codecs', []),
+            compress=content.get('compress', [])
         )
 
     def getIdent(self) -> str:
@@ -637,9 +1258,19 @@ class PropLetter(Letter):
     def getRole(self) -> int:
         return self.getContent('role')
 
+    def getCodecs(self) -> List[str]:
+        codecs = self.getContent('codecs')
+        return codecs if isinstance(codecs, list) else []
+
+    def getCompress(self) -> List[str]:
+        compress = self.getContent('compress')
+        return compress if isinstance(compress, list) else []
+
 
 class BinaryLetter(Letter):
 
+    __slots__ = ()
+
     TYPE_DATA = 1
     TYPE_BROKEN = 2
 
@@ -689,16 +1320,43 @@ class BinaryLetter(Letter):
 
     @staticmethod
     def parse(s:  bytes) -> Optional['BinaryLetter']:
-        fileName = s[6:38].decode().replace(" ", "")
-        tid = s[38:166].decode().replace(" ", "")
-        parent = s[166:230].decode().replace(" ", "")
-        menu = s[230:260].decode().replace(" ", "")
-        content = s[260:]
+        return BinaryLetter.parseFrame(
+            s[:Letter.BINARY_HEADER_LEN], s[Letter.BINARY_HEADER_LEN:])
+
+    @staticmethod
+    def parseFrame(header: Union[bytes, bytearray],
+                   body: Union[bytes, bytearray]) \
+            -> Optional['BinaryLetter']:
+        _, _, fileName, tid, parent, menu = BINARY_HEADER.unpack_from(header)
 
-        return BinaryLetter(tid, content, menu, fileName, parent = parent)
+        # Fields are checked while they are packed.
+        letter = BinaryLetter.__new__(BinaryLetter)
+        Letter.__init__(
+            letter,
+            Letter.BinaryFile,
+            {"tid": BinaryLetter.unpad(tid),
+             "fileName": BinaryLetter.unpad(fileName),
+             "parent": BinaryLetter.unpad(parent),
+             "menu": BinaryLetter.unpad(menu)},
+            {"bytes": body}
+        )
 
-    def toBytesWithLength(self) -> bytes:
+        return letter
 
+    @staticmethod
+    def unpad(field: bytes) -> str:
+        # Fields are padded on the left, spaces within
+        # a field are dropped as well.
+        field = field.lstrip(b" ")
+        if b" " in field:
+            field = field.replace(b" ", b"")
+
+        return field.decode()
+
+    def toBytesWithLength(self, codec: str = Letter.CODEC_JSON,
+                          compress: str = Letter.COMPRESS_NONE) -> bytes:
+        # BinaryLetter has only one format and binary contents
+        # are not compressed.
         bStr = self.binaryPack()
 
         if bStr is None:
@@ -707,47 +1365,39 @@ class BinaryLetter(Letter):
         return bStr
 
     def binaryPack(self) -> Optional[bytes]:
-
-        tid = self.getHeader('tid')
-        fileName = self.getHeader('fileName')
         content = self.getContent("bytes")
-        parent = self.getHeader('parent')
-        menu = self.getHeader('menu')
 
         if type(content) is str:
             return None
 
-        def extend_bytes(n: int, bs: bytes):
-            return b' ' * n + bs
-
-        type_field = (1).to_bytes(BinaryLetter.TYPE_FIELD_LEN, "big")
-        len_field = len(content).to_bytes(BinaryLetter.LENGTH_FIELD_LEN, "big")
-
-        tid_field = extend_bytes(
-            BinaryLetter.TASK_ID_FIELD_LEN - len(tid),
-            tid.encode())
-
-        parent_field = extend_bytes(
-            BinaryLetter.PARENT_FIELD_LEN -
-            len(parent), parent.encode())
-
-        name_field = extend_bytes(
-            BinaryLetter.FILE_NAME_FIELD_LEN -
-            len(fileName), fileName.encode())
-
-        menu_field = extend_bytes(
-            BinaryLetter.MENU_FIELD_LEN - len(menu),
-            menu.encode())
-
         # Safe here content must not str and must a bytes
         # | Type (2Bytes) 00001 :: Int | Length (4Bytes) :: Int
-        # | Ext (32 Bytes) | TaskId (64Bytes) :: String
+        # | Ext (32 Bytes) | TaskId (128Bytes) :: String
         # | Parent(64 Bytes) :: String | Menu (30 Bytes) :: String
         # | Content :: Bytes |
-        packet = type_field + len_field + name_field + tid_field + \
-            parent_field + menu_field + content
-
-        return packet
+        header = bytearray(Letter.BINARY_HEADER_LEN)
+        self.packHeaderInto(header, len(content))
+
+        return b"".join((header, content))
+
+    def packHeaderInto(self, buffer: bytearray, length: int,
+                       offset: int = 0) -> None:
+        """
+        Pack header of the letter with content of length
+        bytes into buffer at offset.
+        """
+        # Fields are aligned to right and padded with spaces.
+        BINARY_HEADER.pack_into(
+            buffer, offset,
+            Letter.FRAME_BINARY, length,
+            self.getHeader('fileName').encode().rjust(
+                BinaryLetter.FILE_NAME_FIELD_LEN),
+            self.getHeader('tid').encode().rjust(
+                BinaryLetter.TASK_ID_FIELD_LEN),
+            self.getHeader('parent').encode().rjust(
+                BinaryLetter.PARENT_FIELD_LEN),
+            self.getHeader('menu').encode().rjust(
+                BinaryLetter.MENU_FIELD_LEN))
 
     def getTid(self) -> str:
         return self.getHeader('tid')
@@ -770,6 +1420,8 @@ class BinaryLetter(Letter):
 
 class LogLetter(Letter):
 
+    __slots__ = ()
+
     def __init__(self, ident:  str, logId:  str, logMsg:  str) -> None:
         Letter.__init__(
             self,
@@ -803,6 +1455,8 @@ class LogLetter(Letter):
 
 class LogRegLetter(Letter):
 
+    __slots__ = ()
+
     def __init__(self, ident:  str, logId:  str) -> None:
         Letter.__init__(
             self,
@@ -836,6 +1490,8 @@ class ReqLetter(Letter):
     request something.
     """
 
+    __slots__ = ()
+
     def __init__(self, ident: str, type: str, reqMsg: str) -> None:
         Letter.__init__(self, Letter.Req,
                         {"ident": ident, "type": type},
@@ -872,6 +1528,8 @@ class HeartbeatLetter(Letter):
     between master and worker.
     """
 
+    __slots__ = ()
+
     def __init__(self, ident: str, seq: int) -> None:
         Letter.__init__(self, Letter.Heartbeat,
                         {"ident": ident, "seq": str(seq)}, {})
@@ -898,6 +1556,325 @@ class HeartbeatLetter(Letter):
         return HeartbeatLetter(header['ident'], header['seq'])
 
 
+class STREAM_CHECKSUM_MISMATCH(Exception):
+
+    def __init__(self, tid: str) -> None:
+        self._tid = tid
+
+    def __str__(self) -> str:
+        return "Checksum of stream " + self._tid + " is mismatch."
+
+
+class STREAM_REFUSED(Exception):
+
+    def __init__(self, tid: str) -> None:
+        self._tid = tid
+
+    def __str__(self) -> str:
+        return "Range of stream " + self._tid + " is refused."
+
+
+def stream_hash() -> Any:
+    return hashlib.sha256()
+
+
+def file_checksum(path: str) -> Tuple[int, str]:
+    """
+    Size and checksum of a file in the way BinaryStreamLetter
+    describe the file.
+    """
+    size = 0
+    h = stream_hash()
+
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(Letter.STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            h.update(chunk)
+
+    return size, h.hexdigest()
+
+
+class BinaryStreamLetter(Letter):
+    """
+    Header of a file transfered via a stream, content
+    of the file follow the letter on the stream so the
+    file is not divided into BinaryLetters.
+
+    A resumable transfer wait for a BinaryStreamAckLetter
+    that tell the offset to continue from before sending
+    content and another one that confirm the file after
+    content is sent.
+    """
+
+    __slots__ = ("_reader", "_writer", "_remain")
+
+    def __init__(self, tid: str, fileName: str, parent: str,
+                 size: int, checksum: str, resume: bool = False,
+                 begin: int = 0, fileSize: Optional[int] = None,
+                 query: bool = False, delta: bool = False,
+                 base: Optional[str] = None) -> None:
+        content = {"size": size, "checksum": checksum,
+                   "resume": "true" if resume else "false"}
+
+        if fileSize is not None:
+            content["begin"] = begin
+            content["fileSize"] = fileSize
+
+        if query:
+            content["query"] = "true"
+            content["delta"] = "true" if delta else "false"
+
+        if base is not None:
+            content["base"] = base
+
+        Letter.__init__(self, Letter.BinaryStream,
+                        {"tid": tid, "fileName": fileName,
+                         "parent": parent}, content)
+
+    def getTid(self) -> str:
+        return self.getHeader('tid')
+
+    def getFileName(self) -> str:
+        return self.getHeader('fileName')
+
+    def getParent(self) -> str:
+        return self.getHeader('parent')
+
+    def getSize(self) -> int:
+        return int(self.getContent('size'))
+
+    def getChecksum(self) -> str:
+        return self.getContent('checksum')
+
+    def isResumable(self) -> bool:
+        return self.getContent('resume') == "true"
+
+    def isRange(self) -> bool:
+        return "fileSize" in self.content
+
+    def getBegin(self) -> int:
+        return int(self.content.get('begin', 0))
+
+    def getFileSize(self) -> int:
+        return int(self.content.get('fileSize', self.getSize()))
+
+    def isQuery(self) -> bool:
+        return self.content.get('query', "false") == "true"
+
+    def acceptDelta(self) -> bool:
+        return self.content.get('delta', "false") == "true"
+
+    def getBase(self) -> Optional[str]:
+        return self.content.get('base', None)
+
+    def isDelta(self) -> bool:
+        return 'base' in self.content
+
+    @staticmethod
+    def query(tid: str, fileName: str, parent: str, size: int,
+              checksum: str, delta: bool = False) -> 'BinaryStreamLetter':
+        """
+        Letter that ask whether receiver have the file
+        of size and checksum.
+        """
+        return BinaryStreamLetter(tid, fileName, parent, size,
+                                  checksum, query=True, delta=delta)
+
+    @staticmethod
+    def ranges(tid: str, fileName: str, parent: str, size: int,
+               checksum: str, num: int) -> List['BinaryStreamLetter']:
+        """
+        Letters of num ranges of a file.
+        """
+        length = -(-size // num)
+
+        return [BinaryStreamLetter(tid, fileName, parent,
+                                   min(length, size - begin), checksum,
+                                   resume=True, begin=begin,
+                                   fileSize=size)
+                for begin in range(0, size, length)]
+
+    def bindStream(self, reader: asyncio.StreamReader,
+                   writer: Optional[asyncio.StreamWriter] = None) -> None:
+        """
+        Bind the stream that the file come from, writer is
+        required by resumable transfers.
+        """
+        self._reader = reader
+        self._writer = writer
+        self._remain = 0 if self.isQuery() else self.getSize()
+
+    def remain(self) -> int:
+        return getattr(self, "_remain", 0)
+
+    async def resumeAt(self, offset: int) -> None:
+        """
+        Tell sender to send content from offset.
+        """
+        if not self.isResumable():
+            assert(offset == 0)
+            return
+
+        self._remain = self.getSize() - offset
+        await self._ack(offset, BinaryStreamAckLetter.STATE_RESUME)
+
+    async def confirm(self, ok: bool) -> None:
+        """
+        Tell sender whether the file is received intact.
+        """
+        if not self.isResumable():
+            return
+
+        await self._ack(
+            self.getSize(),
+            BinaryStreamAckLetter.STATE_DONE if ok else
+            BinaryStreamAckLetter.STATE_FAILED)
+
+    async def refuse(self) -> None:
+        """
+        Tell sender of a range that the range is not accepted,
+        content of the range is not sent.
+        """
+        self._remain = 0
+        await self._ack(0, BinaryStreamAckLetter.STATE_REFUSED)
+
+    async def answer(self, have: bool) -> None:
+        """
+        Tell sender of a query whether the file is here,
+        sender skip the transfer if it is.
+        """
+        await self._ack(
+            self.getSize(),
+            BinaryStreamAckLetter.STATE_HAVE if have else
+            BinaryStreamAckLetter.STATE_MISSING)
+
+    async def answerDelta(self, base: str, sig: bytes) -> None:
+        """
+        Tell sender of a query to send delta of the file
+        against base, signature of base follow the reply.
+        """
+        assert(self._writer is not None)
+        await sending(self._writer, BinaryStreamAckLetter(
+            self.getTid(), len(sig), BinaryStreamAckLetter.STATE_DELTA,
+            base))
+        self._writer.write(sig)
+        await self._writer.drain()
+
+    async def _ack(self, offset: int, state: str) -> None:
+        assert(self._writer is not None)
+        await sending(self._writer, BinaryStreamAckLetter(
+            self.getTid(), offset, state))
+
+    async def storeInto(self, store: Callable[[bytes], Any]) -> None:
+        """
+        Pass content of the file to store chunk by chunk,
+        STREAM_CHECKSUM_MISMATCH is raised if the file is
+        not the one described by the letter.
+        """
+        h = stream_hash()
+
+        async for chunk in self.chunks():
+            h.update(chunk)
+            store(chunk)
+
+        if h.hexdigest() != self.getChecksum():
+            raise STREAM_CHECKSUM_MISMATCH(self.getTid())
+
+    async def skip(self) -> None:
+        async for _ in self.chunks():
+            pass
+
+    async def chunks(self) -> Any:
+        reader = self._reader
+
+        while self._remain > 0:
+            # read() return what is buffered so chunks are
+            # passed as they arrived without copying.
+            try:
+                chunk = await asyncio.wait_for(
+                    reader.read(min(self._remain, Letter.STREAM_CHUNK_SIZE)),
+                    timeout=Letter.STREAM_READ_TIMEOUT)
+            except asyncio.exceptions.TimeoutError:
+                # Half-open connection, sender resume the
+                # transfer via another connection.
+                raise ConnectionError("Stream stalled")
+
+            if not chunk:
+                raise ConnectionError("Stream truncated")
+
+            self._remain -= len(chunk)
+            yield chunk
+
+    @staticmethod
+    def parse(s: bytes) -> Optional['BinaryStreamLetter']:
+        (type_, header, content) = bytesDivide(s)
+
+        if type_ != Letter.BinaryStream:
+            return None
+
+        return BinaryStreamLetter(
+            header['tid'], header['fileName'], header['parent'],
+            content['size'], content['checksum'],
+            content.get('resume') == "true",
+            content.get('begin', 0), content.get('fileSize', None),
+            content.get('query') == "true", content.get('delta') == "true",
+            content.get('base', None))
+
+
+class BinaryStreamAckLetter(Letter):
+    """
+    Reply of receiver of a resumable BinaryStreamLetter.
+    """
+
+    __slots__ = ()
+
+    STATE_RESUME = "resume"
+    STATE_DONE = "done"
+    STATE_FAILED = "failed"
+    STATE_REFUSED = "refused"
+
+    # Replies of a query.
+    STATE_HAVE = "have"
+    STATE_MISSING = "missing"
+    STATE_DELTA = "delta"
+
+    def __init__(self, tid: str, offset: int, state: str,
+                 base: Optional[str] = None) -> None:
+        content = {"offset": offset, "state": state}
+
+        if base is not None:
+            content["base"] = base
+
+        Letter.__init__(self, Letter.BinaryStreamAck,
+                        {"tid": tid}, content)
+
+    def getTid(self) -> str:
+        return self.getHeader('tid')
+
+    def getOffset(self) -> int:
+        return int(self.getContent('offset'))
+
+    def getState(self) -> str:
+        return self.getContent('state')
+
+    def getBase(self) -> Optional[str]:
+        return self.content.get('base', None)
+
+    @staticmethod
+    def parse(s: bytes) -> Optional['BinaryStreamAckLetter']:
+        (type_, header, content) = bytesDivide(s)
+
+        if type_ != Letter.BinaryStreamAck:
+            return None
+
+        return BinaryStreamAckLetter(
+            header['tid'], content['offset'], content['state'],
+            content.get('base', None))
+
+
 validityMethods = {
     Letter.NewTask:         newTaskLetterValidity,
     Letter.Response:        responseLetterValidity,
@@ -913,6 +1890,8 @@ validityMethods = {
     Letter.Req:             lambda letter: True,
     Letter.Heartbeat:       lambda letter: True,
     Letter.Notify:          lambda letter: True,
+    Letter.BinaryStream:    lambda letter: True,
+    Letter.BinaryStreamAck: lambda letter: True,
 }  # type:   Dict[str, Callable]
 
 parseMethods = {
@@ -928,33 +1907,58 @@ parseMethods = {
     Letter.TaskCancel:       CancelLetter,
     Letter.Req:              ReqLetter,
     Letter.Heartbeat:        HeartbeatLetter,
-    Letter.Notify:           NotifyLetter
+    Letter.Notify:           NotifyLetter,
+    Letter.BinaryStream:     BinaryStreamLetter,
+    Letter.BinaryStreamAck:  BinaryStreamAckLetter
 }  # type: Any
 
 
 # Function to receive a letter from a socket
 async def receving(reader: asyncio.StreamReader,
                    timeout=None) -> Optional[Letter]:
-    content, remain = b'', 2
+    """
+    Receive a letter from reader.
 
-    while remain > 0:
-        chunk = await asyncio.wait_for(
-            reader.read(remain), timeout=timeout
-        )
+    Frames are read by readexactly() which consume nothing
+    until all requested bytes are buffered, so a timeout while
+    waiting for a letter lose nothing and several frames that
+    arrived by one socket read are served from reader's buffer
+    without copying them into an intermediate buffer.
+    """
+    try:
+        prefix = await asyncio.wait_for(
+            reader.readexactly(2), timeout=timeout)
 
-        if chunk == b'':
-            raise ConnectionError
+        rest_timeout = None if timeout is None else \
+            max(timeout, Letter.FRAME_REST_TIMEOUT)
 
-        content += chunk
-        remain = Letter.letterBytesRemain(content)
+        try:
+            header = prefix
+            header_len = Letter.frameHeaderLen(prefix)
+            if header_len > 2:
+                header += await asyncio.wait_for(
+                    reader.readexactly(header_len - 2),
+                    timeout=rest_timeout)
+
+            body = await asyncio.wait_for(
+                reader.readexactly(Letter.frameBodyLen(header)),
+                timeout=rest_timeout)
+        except asyncio.exceptions.TimeoutError:
+            # Part of a frame is consumed, the stream is out of sync.
+            raise ConnectionError("Letter frame truncated")
+
+    except asyncio.IncompleteReadError:
+        raise ConnectionError
 
-    return Letter.parse(content)
+    return Letter.parseFrame(header, body)
 
 
 async def sending(writer: asyncio.StreamWriter,
                   letter: Letter,
-                  lock: asyncio.Lock = None) -> None:
-    writer.write(letter.toBytesWithLength())
+                  lock: Optional[asyncio.Lock] = None,
+                  codec: str = Letter.CODEC_JSON,
+                  compress: str = Letter.COMPRESS_NONE) -> None:
+    writer.write(letter.toBytesWithLength(codec, compress))
 
     if writer.is_closing():
         raise ConnectionError
@@ -968,36 +1972,158 @@ async def sending(writer: asyncio.StreamWriter,
     else:
         await writer.drain()
 
+
+async def sending_stream(writer: asyncio.StreamWriter, path: str,
+                         tid: str, parent: str, fileName: str,
+                         reader: Optional[asyncio.StreamReader] = None) \
+        -> None:
+    """
+    Send a file as a BinaryStreamLetter followed by
+    content of the file.
+
+    Content of the file is sent by loop.sendfile() which use
+    os.sendfile() on plain sockets so the file is not copied
+    through userspace, checksum is computed in the default
+    executor to keep the loop responsive.
+
+    If reader is provided the transfer is resumable, content
+    is sent from the offset receiver confirmed and
+    STREAM_CHECKSUM_MISMATCH is raised if receiver reject the file.
+    """
+    loop = asyncio.get_running_loop()
+    size, checksum = await loop.run_in_executor(None, file_checksum, path)
+
+    await sending_file(writer, BinaryStreamLetter(
+        tid, fileName, parent, size, checksum,
+        resume=reader is not None), path, reader)
+
+
+async def sending_file(writer: asyncio.StreamWriter,
+                       letter: BinaryStreamLetter, path: str,
+                       reader: Optional[asyncio.StreamReader] = None) \
+        -> None:
+    """
+    Send the letter followed by content of the file or
+    range of the file it describe.
+
+    STREAM_REFUSED is raised if receiver not accept the range.
+    """
+    loop = asyncio.get_running_loop()
+    tid, size = letter.getTid(), letter.getSize()
+
+    await sending(writer, letter)
+
+    offset = 0
+    if reader is not None:
+        ack = await _stream_ack(reader, tid)
+        if ack.getState() == BinaryStreamAckLetter.STATE_REFUSED:
+            raise STREAM_REFUSED(tid)
+        offset = ack.getOffset()
+
+    sent = 0
+    # loop.sendfile() refuse to send zero bytes.
+    if size - offset > 0:
+        with open(path, "rb") as f:
+            sent = await loop.sendfile(
+                writer.transport, f, letter.getBegin() + offset,
+                size - offset)
+
+    if sent != size - offset:
+        raise ConnectionError("File shrinked while sending")
+
+    if reader is not None:
+        ack = await _stream_ack(reader, tid)
+        if ack.getState() != BinaryStreamAckLetter.STATE_DONE:
+            raise STREAM_CHECKSUM_MISMATCH(tid)
+
+
+async def querying_file(writer: asyncio.StreamWriter,
+                        reader: asyncio.StreamReader,
+                        letter: BinaryStreamLetter) -> bool:
+    """
+    Ask receiver whether it have the file described by
+    the letter, receiver that have the file keep a reference
+    to it so transfer of the file can be skipped.
+    """
+    query = BinaryStreamLetter.query(
+        letter.getTid(), letter.getFileName(), letter.getParent(),
+        letter.getFileSize(), letter.getChecksum())
+    await sending(writer, query)
+
+    ack = await _stream_ack(reader, letter.getTid())
+    return ack.getState() == BinaryStreamAckLetter.STATE_HAVE
+
+
+async def querying_delta(writer: asyncio.StreamWriter,
+                         reader: asyncio.StreamReader,
+                         letter: BinaryStreamLetter) \
+        -> Tuple[bool, Optional[str], Optional[bytes]]:
+    """
+    Query as querying_file() do, receiver that not have the
+    file may reply base and signature of the base to send
+    delta against.
+    """
+    query = BinaryStreamLetter.query(
+        letter.getTid(), letter.getFileName(), letter.getParent(),
+        letter.getFileSize(), letter.getChecksum(), delta=True)
+    await sending(writer, query)
+
+    ack = await _stream_ack(reader, letter.getTid())
+    if ack.getState() != BinaryStreamAckLetter.STATE_DELTA:
+        return ack.getState() == BinaryStreamAckLetter.STATE_HAVE, \
+            None, None
+
+    sig = await asyncio.wait_for(reader.readexactly(ack.getOffset()),
+                                 timeout=Letter.STREAM_ACK_TIMEOUT)
+
+    return False, ack.getBase(), sig
+
+
+async def _stream_ack(reader: asyncio.StreamReader,
+                      tid: str) -> BinaryStreamAckLetter:
+    ack = await receving(reader, timeout=Letter.STREAM_ACK_TIMEOUT)
+
+    if not isinstance(ack, BinaryStreamAckLetter) or ack.getTid() != tid:
+        raise ConnectionError("Unexpected reply of stream " + tid)
+
+    return ack
+
+
+def _recv_exactly(sock: socket.socket, n: int) -> bytearray:
+    buffer = bytearray(n)
+    view = memoryview(buffer)
+    pos = 0
+
+    while pos < n:
+        received = sock.recv_into(view[pos:], n - pos)
+        if received == 0:
+            raise ConnectionError
+        pos += received
+
+    return buffer
+
+
 # Function to receive a letter from a socket
 def receving_sock(sock: socket.socket) -> Optional[Letter]:
-    content = b''
-    remain = 2
-
     # Get first 2 bytes to know is a BinaryFile letter or
     # another letter
-    while remain > 0:
-        chunk = sock.recv(remain)
-        if chunk == b'':
-            raise Exception
-        remain -= len(chunk)
-        content += chunk
+    header = _recv_exactly(sock, 2)
 
-    remain = Letter.letterBytesRemain(content)
+    header_len = Letter.frameHeaderLen(header)
+    if header_len > 2:
+        header += _recv_exactly(sock, header_len - 2)
 
-    while remain > 0:
-        chunk = sock.recv(remain)
-        if chunk == b'':
-            raise Exception
-
-        content += chunk
-
-        remain = Letter.letterBytesRemain(content)
+    # Body is received into a preallocated buffer
+    # instead of concatenate chunks.
+    body = _recv_exactly(sock, Letter.frameBodyLen(header))
 
-    return Letter.parse(content)
+    return Letter.parseFrame(header, body)
 
 
-def sending_sock(sock: socket.socket, l: Letter) -> None:
-    jBytes = l.toBytesWithLength()
+def sending_sock(sock: socket.socket, l: Letter,
+                 codec: str = Letter.CODEC_JSON,
+                 compress: str = Letter.COMPRESS_NONE) -> None:
+    jBytes = l.toBytesWithLength(codec, compress)
     totalSent = 0
     length = len(jBytes)
 
@@ -1005,7 +2131,8 @@ def sending_sock(sock: socket.socket, l: Letter) -> None:
         try:
             sent = sock.send(jBytes[totalSent:])
         except BlockingIOError:
-            time.sleep(0.1)
+            # Wait until socket is writable.
+            select.select([], [sock], [])
             continue
         except Exception:
             import traceback
@@ -1076,6 +2203,31 @@ class LetterTestCases(unittest.TestCase):
         self.assertEqual("123456", binary_parsed.getParent())
         self.assertEqual("rar", binary_parsed.getFileName())
 
+    def test_BinaryLetter_HeaderLayout(self) -> None:
+        # Setup
+        binary = BinaryLetter(
+            "tid_1", b"123456",
+            menu="menu", fileName="rar", parent="vsn 1")
+
+        # Exercise
+        binBytes = cast(bytes, binary.binaryPack())
+
+        # Verify
+        # Fields are aligned to right and padded with spaces.
+        self.assertEqual(Letter.BINARY_HEADER_LEN + 6, len(binBytes))
+        self.assertEqual(b"\x00\x01\x00\x00\x00\x06", binBytes[:6])
+        self.assertEqual(b"rar".rjust(32), binBytes[6:38])
+        self.assertEqual(b"tid_1".rjust(128), binBytes[38:166])
+        self.assertEqual(b"vsn 1".rjust(64), binBytes[166:230])
+        self.assertEqual(b"menu".rjust(30), binBytes[230:260])
+
+        # Spaces within fields are dropped as before.
+        parsed = cast(BinaryLetter, Letter.parse(binBytes))
+        self.assertEqual("vsn1", parsed.getParent())
+
+        with self.assertRaises(AttributeError):
+            parsed.extra = ""  # type: ignore
+
     def test_CommandLetter_Parse(self) -> None:
         # Setup
         commandLetter = CommandLetter("cmd_type", {"1":"1"}, "T", "extra_information")
@@ -1121,3 +2273,230 @@ class LetterTestCases(unittest.TestCase):
         self.assertIsNotNone(heartbeatLetter_parsed)
         self.assertEqual("HB", heartbeatLetter_parsed.getIdent())
         self.assertEqual(1, heartbeatLetter_parsed.getSeq())
+
+    def test_Letter_CompactCodec(self) -> None:
+        # Setup
+        letters = [
+            NewLetter("tid_1", "sn_1", "vsn_1", datetime="now",
+                      extra={"cmds": ["echo 1", "echo 2"], "resultPath": "a"},
+                      parent="123456", needPost="true"),
+            ResponseLetter("ident", "tid_1", Letter.RESPONSE_STATE_IN_PROC),
+            PostTaskLetter("ident", "vsn", ["cat a b > c"], "c", ["F1", "F2"]),
+            HeartbeatLetter("HB", 3),
+            PropLetter("w", "2", "0", "NORMAL", codecs=SUPPORTED_CODECS),
+            # Strings contain NUL and values of various types.
+            NotifyLetter("w", "t", {"a": "x\0y", "b": ["1", 2, None],
+                                    "c": {}, "d": [], "e": True, "f": 1.5})
+        ]
+
+        for letter in letters:
+            # Exercise
+            bs = letter.toBytesWithLength(Letter.CODEC_COMPACT)
+            parsed = cast(Letter, Letter.parse(bs))
+
+            # Verify
+            self.assertEqual(0, Letter.letterBytesRemain(bs))
+            self.assertEqual(type(letter), type(parsed))
+            self.assertEqual(letter.header, parsed.header)
+            self.assertEqual(letter.content, parsed.content)
+
+    def test_Letter_CodecNegotiate(self) -> None:
+        # Workers which not report it's codecs speak JSON only.
+        self.assertEqual(Letter.CODEC_JSON, codec_negotiate([]))
+        self.assertEqual(Letter.CODEC_COMPACT,
+                         codec_negotiate(["json", "compact"]))
+        self.assertEqual(Letter.CODEC_JSON_EXT,
+                         codec_negotiate(["json", "json-ext"]))
+
+        # Verify that PropLetter of older workers is able to be parsed.
+        legacy = b'{"type": "notify", "header": {"ident": "w"}, ' + \
+            b'"content": {"MAX": "1", "PROC": "0", "role": "NORMAL"}}'
+        prop = cast(PropLetter, Letter.parse(
+            len(legacy).to_bytes(2, "big") + legacy))
+        self.assertEqual([], prop.getCodecs())
+
+    def test_Letter_LazyContent(self) -> None:
+        # Setup
+        msg = "make: Entering directory GBN/src" * 64
+        log = LogLetter("ident", "logId", msg)
+
+        for codec in [Letter.CODEC_JSON, Letter.CODEC_COMPACT]:
+            # Exercise
+            parsed = cast(LogLetter, Letter.parse(
+                log.toBytesWithLength(codec)))
+
+            # Verify
+            self.assertIsInstance(parsed, LogLetter)
+            self.assertEqual("logId", parsed.getLogId())
+            self.assertIsNotNone(parsed._content_decoder)
+            self.assertEqual(msg, parsed.getLogMsg())
+            self.assertIsNone(parsed._content_decoder)
+
+    def test_Letter_StreamReceving(self) -> None:
+        # Setup
+        letters = [
+            HeartbeatLetter("ident", 1),
+            LogLetter("ident", "logId", "make: Entering directory"),
+            BinaryLetter("tid", b"0123456789" * 1024, fileName="file"),
+        ]
+        stream = b"".join(
+            l.toBytesWithLength(Letter.CODEC_COMPACT) for l in letters)
+
+        async def doTest() -> None:
+            reader = asyncio.StreamReader()
+
+            # Exercise
+            # Timeout while a frame not begin lose nothing.
+            reader.feed_data(stream[:1])
+            with self.assertRaises(asyncio.exceptions.TimeoutError):
+                await receving(reader, timeout=0.1)
+
+            # Several frames buffered by one read.
+            reader.feed_data(stream[1:])
+            received = [await receving(reader, timeout=1) for _ in letters]
+
+            # Verify
+            self.assertIsInstance(received[0], HeartbeatLetter)
+            self.assertEqual(1, cast(HeartbeatLetter, received[0]).getSeq())
+            self.assertEqual("make: Entering directory",
+                             cast(LogLetter, received[1]).getLogMsg())
+            self.assertEqual(b"0123456789" * 1024,
+                             cast(BinaryLetter, received[2]).getContent("bytes"))
+
+            reader.feed_eof()
+            with self.assertRaises(ConnectionError):
+                await receving(reader)
+
+        asyncio.run(doTest())
+
+    def test_BinaryStreamLetter_Stream(self) -> None:
+        # Setup
+        content = b"0123456789" * 100000
+        checksum = hashlib.sha256(content).hexdigest()
+        header = BinaryStreamLetter("tid", "file", "v1", len(content), checksum)
+        follow = HeartbeatLetter("ident", 1)
+
+        async def doTest() -> None:
+            reader = asyncio.StreamReader()
+            reader.feed_data(header.toBytesWithLength())
+            reader.feed_data(content)
+            reader.feed_data(follow.toBytesWithLength())
+
+            # Exercise
+            letter = cast(BinaryStreamLetter, await receving(reader))
+            letter.bindStream(reader)
+
+            stored = []  # type: List[bytes]
+            await letter.storeInto(stored.append)
+
+            # Verify
+            self.assertEqual("tid", letter.getTid())
+            self.assertEqual("file", letter.getFileName())
+            self.assertEqual("v1", letter.getParent())
+            self.assertEqual(content, b"".join(stored))
+            self.assertEqual(0, letter.remain())
+
+            # Stream is still in sync after the file.
+            self.assertIsInstance(await receving(reader), HeartbeatLetter)
+
+            # Corrupted file
+            reader.feed_data(header.toBytesWithLength())
+            reader.feed_data(content[:-1] + b"x")
+
+            letter = cast(BinaryStreamLetter, await receving(reader))
+            letter.bindStream(reader)
+
+            with self.assertRaises(STREAM_CHECKSUM_MISMATCH):
+                await letter.storeInto(lambda chunk: None)
+
+        asyncio.run(doTest())
+
+    def test_Letter_SockReceving(self) -> None:
+        # Setup
+        s, r = socket.socketpair()
+        letter = BinaryLetter("tid", b"0123456789" * 1024, fileName="file")
+
+        try:
+            # Exercise
+            sending_sock(s, letter)
+            sending_sock(s, HeartbeatLetter("ident", 2))
+            binary = cast(BinaryLetter, receving_sock(r))
+            heartbeat = cast(HeartbeatLetter, receving_sock(r))
+
+            # Verify
+            self.assertEqual("tid", binary.getHeader("tid"))
+            self.assertEqual("file", binary.getHeader("fileName"))
+            self.assertEqual(b"0123456789" * 1024, binary.getContent("bytes"))
+            self.assertEqual(2, heartbeat.getSeq())
+        finally:
+            s.close()
+            r.close()
+
+    def test_Letter_ExtendedLength(self) -> None:
+        # Setup
+        frags = ["1_GL5610_" + str(i) for i in range(10000)]
+        post = PostTaskLetter("1_Post", "vsn_1", ["cat a b > c"], "./c", frags)
+
+        # Exercise and Verify
+        with self.assertRaises(LETTER_TOO_LARGE):
+            post.toBytesWithLength(Letter.CODEC_JSON)
+
+        for codec in [Letter.CODEC_JSON_EXT, Letter.CODEC_COMPACT]:
+            bs = post.toBytesWithLength(codec)
+            self.assertGreater(len(bs), Letter.JSON_MAX_LEN)
+            self.assertEqual(0, Letter.letterBytesRemain(bs))
+
+            parsed = cast(PostTaskLetter, Letter.parse(bs))
+            self.assertEqual(frags, parsed.frags())
+
+            async def receive(bs: bytes) -> Optional[Letter]:
+                reader = asyncio.StreamReader()
+                reader.feed_data(bs)
+                return await receving(reader)
+
+            received = asyncio.run(receive(bs))
+            self.assertEqual(frags, cast(PostTaskLetter, received).frags())
+
+        # Small letters are still framed with 2 bytes length.
+        heartbeat = HeartbeatLetter("ident", 1)
+        self.assertEqual(heartbeat.toBytesWithLength(Letter.CODEC_JSON),
+                         heartbeat.toBytesWithLength(Letter.CODEC_JSON_EXT))
+
+    def test_Letter_Compress(self) -> None:
+        # Setup
+        COMPRESS_STATS.reset()
+        msg = "make: Entering directory GBN/src" * 64
+        log = LogLetter("ident", "logId", msg)
+        heartbeat = HeartbeatLetter("ident", 1)
+
+        for codec in [Letter.CODEC_JSON, Letter.CODEC_COMPACT]:
+            # Exercise
+            bs = log.toBytesWithLength(codec, Letter.COMPRESS_ZLIB)
+
+            # Verify
+            self.assertEqual(Letter.FRAME_ZLIB, int.from_bytes(bs[:2], "big"))
+            self.assertLess(len(bs), len(log.toBytesWithLength(codec)))
+            self.assertEqual(0, Letter.letterBytesRemain(bs))
+            self.assertEqual(msg, cast(LogLetter, Letter.parse(bs)).getLogMsg())
+            self.assertEqual(msg, cast(LogLetter, LogLetter.parse(bs)).getLogMsg())
+
+            async def receive(bs: bytes) -> Optional[Letter]:
+                reader = asyncio.StreamReader()
+                reader.feed_data(bs)
+                return await receving(reader)
+
+            received = asyncio.run(receive(bs))
+            self.assertEqual(msg, cast(LogLetter, received).getLogMsg())
+
+            # Small letters are not compressed.
+            self.assertEqual(
+                heartbeat.toBytesWithLength(codec),
+                heartbeat.toBytesWithLength(codec, Letter.COMPRESS_ZLIB))
+
+        self.assertLess(COMPRESS_STATS.ratio(Letter.Log), 0.1)
+        self.assertEqual(2, COMPRESS_STATS.toDict()[Letter.Log]["count"])
+        self.assertEqual(1.0, COMPRESS_STATS.ratio(Letter.Heartbeat))
+
+        self.assertEqual(Letter.COMPRESS_ZLIB,
+                         compress_negotiate(SUPPORTED_COMPRESS))
+        self.assertEqual(Letter.COMPRESS_NONE, compress_negotiate([]))
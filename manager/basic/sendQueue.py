@@ -0,0 +1,269 @@
+# MIT License
+#
+# Copyright (c) 2020 Gcom
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# sendQueue.py
+#
+# Letters send via a link are queued and letters that
+# pending while the link is busy are written together,
+# heartbeats and controls first, then task states, then logs.
+
+import asyncio
+import traceback
+import typing as T
+
+from collections import deque
+from manager.basic.letter import Letter
+
+
+class SEND_QUEUE_CLOSED(ConnectionError):
+
+    def __str__(self) -> str:
+        return "Send queue is closed"
+
+
+class SendQueue:
+    """
+    Per-link queue of letters to send.
+
+    Letters are encoded by the caller of send(). While the queue
+    is idle a letter is written directly, otherwise it's queued
+    into the lane of it's priority and written by the flusher of
+    the queue which write pending letters of a lane by one
+    writelines(). drain() is awaited only while bytes written since
+    last drain reach DRAIN_BYTES or the last drain is DRAIN_INTERVAL
+    seconds ago, so a burst of letters cost one syscall and one
+    await instead of one per letter.
+
+    Letters of PRIO_BULK lane are written only while the write
+    buffer of the link is empty and at most BULK_BATCH_BYTES (or
+    one frame) a time, so a heartbeat wait behind at most one
+    in-flight bulk write.
+    """
+
+    DRAIN_BYTES = 2 ** 14
+    DRAIN_INTERVAL = 0.5
+
+    # Max bytes written by one writelines().
+    BATCH_BYTES = 2 ** 16
+    BULK_BATCH_BYTES = 2 ** 12
+
+    # Priorities
+    PRIO_CONTROL = 0
+    PRIO_STATE = 1
+    PRIO_BULK = 2
+
+    PRIORITIES = {
+        Letter.Heartbeat:       PRIO_CONTROL,
+        Letter.Command:         PRIO_CONTROL,
+        Letter.CmdResponse:     PRIO_CONTROL,
+        Letter.PropertyNotify:  PRIO_CONTROL,
+        Letter.TaskCancel:      PRIO_CONTROL,
+        Letter.Notify:          PRIO_CONTROL,
+        Letter.NewTask:         PRIO_STATE,
+        Letter.Response:        PRIO_STATE,
+        Letter.Post:            PRIO_STATE,
+        Letter.NewMenu:         PRIO_STATE,
+        Letter.Req:             PRIO_STATE,
+        Letter.Log:             PRIO_BULK,
+        Letter.LogRegister:     PRIO_BULK,
+        Letter.BinaryFile:      PRIO_BULK,
+    }  # type: T.Dict[str, int]
+
+    def __init__(self, writer: asyncio.StreamWriter) -> None:
+        self._writer = writer
+        self._lanes = [
+            deque() for _ in range(SendQueue.PRIO_BULK + 1)
+        ]  # type: T.List[T.Deque[T.Tuple[bytes, asyncio.Future]]]
+        self._flusher = None  # type: T.Optional[asyncio.Task]
+        self._closed = False
+
+        self._undrained = 0
+        self._last_drain = 0.0
+
+    def writer(self) -> asyncio.StreamWriter:
+        return self._writer
+
+    def numOfPending(self) -> int:
+        return sum(len(lane) for lane in self._lanes)
+
+    @staticmethod
+    def priority(letter: Letter) -> int:
+        return SendQueue.PRIORITIES.get(letter.type_, SendQueue.PRIO_STATE)
+
+    async def send(self, letter: Letter,
+                   codec: str = Letter.CODEC_JSON,
+                   compress: str = Letter.COMPRESS_NONE) -> None:
+        """
+        Send the letter, return after it's written into
+        the link.
+        """
+        if self._closed:
+            raise SEND_QUEUE_CLOSED()
+
+        if self._writer.is_closing():
+            raise ConnectionError
+
+        loop = asyncio.get_running_loop()
+        frame = letter.toBytesWithLength(codec, compress)
+        prio = SendQueue.priority(letter)
+
+        # Nothing in queue and no drain is required, write
+        # it directly.
+        if self._flusher is None and \
+           not self._drain_required(len(frame), loop.time()) and \
+           (prio != SendQueue.PRIO_BULK or self._buffered() == 0):
+            self._writer.write(frame)
+            self._undrained += len(frame)
+            return
+
+        fut = loop.create_future()
+        self._lanes[prio].append((frame, fut))
+
+        # Flusher exit while nothing to send so idle
+        # links hold no task.
+        if self._flusher is None:
+            self._flusher = loop.create_task(self._flush_loop())
+
+        await fut
+
+    def close(self) -> None:
+        self._closed = True
+
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+
+        self._fail_pending(SEND_QUEUE_CLOSED())
+
+    def _fail_pending(self, exc: Exception) -> None:
+        for lane in self._lanes:
+            while lane:
+                _, fut = lane.popleft()
+                if not fut.done():
+                    fut.set_exception(exc)
+
+    def _buffered(self) -> int:
+        return self._writer.transport.get_write_buffer_size()
+
+    def _drain_required(self, size: int, now: float) -> bool:
+        return self._undrained + size >= SendQueue.DRAIN_BYTES or \
+            now - self._last_drain >= SendQueue.DRAIN_INTERVAL
+
+    def _batch(self) -> T.Tuple[T.List[bytes], T.List[asyncio.Future]]:
+        frames = []  # type: T.List[bytes]
+        futs = []  # type: T.List[asyncio.Future]
+        size = 0
+
+        for prio, lane in enumerate(self._lanes):
+            if prio == SendQueue.PRIO_BULK:
+                # Bulk letters are not batched with letters
+                # of another lanes.
+                if frames:
+                    break
+                limit = SendQueue.BULK_BATCH_BYTES
+            else:
+                limit = SendQueue.BATCH_BYTES
+
+            while lane and size < limit:
+                frame, fut = lane.popleft()
+                frames.append(frame)
+                futs.append(fut)
+                size += len(frame)
+
+            if size >= limit:
+                break
+
+        return frames, futs
+
+    async def _wait_empty(self) -> None:
+        """
+        Wait until the write buffer of the link is empty.
+        """
+        # Writer is paused while anything is buffered and
+        # resumed only after the buffer is empty, so drain()
+        # return after all buffered bytes are sent.
+        transport = self._writer.transport
+        low, high = transport.get_write_buffer_limits()
+
+        transport.set_write_buffer_limits(high=0)
+        try:
+            await self._writer.drain()
+        finally:
+            transport.set_write_buffer_limits(high=high, low=low)
+
+        self._undrained = 0
+        self._last_drain = asyncio.get_running_loop().time()
+
+    async def _flush_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        bulk = self._lanes[SendQueue.PRIO_BULK]
+
+        while self.numOfPending() > 0:
+            futs = []  # type: T.List[asyncio.Future]
+
+            try:
+                if self._writer.is_closing():
+                    raise ConnectionError
+
+                # Only bulk letters are pending, write them after
+                # all buffered bytes are sent so letters that queued
+                # later with higher priority wait at most one
+                # bulk write.
+                if len(bulk) == self.numOfPending() and \
+                   self._buffered() > 0:
+                    await self._wait_empty()
+                    continue
+
+                frames, futs = self._batch()
+
+                self._writer.writelines(frames)
+                self._undrained += sum(len(f) for f in frames)
+
+                if self._drain_required(0, loop.time()):
+                    await self._writer.drain()
+                    self._undrained = 0
+                    self._last_drain = loop.time()
+
+            except asyncio.CancelledError:
+                for fut in futs:
+                    if not fut.done():
+                        fut.set_exception(SEND_QUEUE_CLOSED())
+                raise
+            except Exception as e:
+                if not isinstance(e, ConnectionError):
+                    traceback.print_exc()
+
+                for fut in futs:
+                    if not fut.done():
+                        fut.set_exception(e)
+
+                # Link is broken, letters that remain in
+                # queue are never able to be sent.
+                if isinstance(e, ConnectionError):
+                    self._fail_pending(e)
+                continue
+
+            for fut in futs:
+                if not fut.done():
+                    fut.set_result(None)
+
+        self._flusher = None
@@ -23,14 +23,16 @@
 # Storage
 
 import os
+import asyncio
 import platform
 import shutil
 
 from typing import Optional, Dict, BinaryIO, \
-    Any, List, cast
+    Any, List, Callable, cast
 
 from .mmanager import Module
 from manager.basic.type import State, Ok, Error
+from manager.basic.letter import stream_hash, file_checksum
 
 if platform.system() == 'Windows':
     seperator = "\\"
@@ -46,23 +48,42 @@ class STORAGE_IDENT_NOT_FOUND(Exception):
 
 class StoChooser:
 
-    def __init__(self, path:  str) -> None:
+    def __init__(self, path:  str,
+                 onClose: Optional[Callable[[str], None]] = None) -> None:
 
         self._path = path
 
+        # Hash of content is computed while content is stored, it's
+        # the same as checksum of BinaryStreamLetter.
+        # onClose is called with it after the file is closed.
+        self._onClose = onClose
+        self._hash = stream_hash()  # type: Optional[Any]
+
         try:
+            # The file may share it's content with other files or
+            # still be opened by a stale writer, unlink it so the
+            # content is not overwritten.
+            if os.path.exists(path):
+                os.unlink(path)
             self._fd = open(path, "wb")
         except FileNotFoundError:
             raise STORAGE_IDENT_NOT_FOUND
 
     def fd(self) -> BinaryIO:
+        # Content written through fd is not hashed,
+        # the file is hashed after closed.
+        self._hash = None
         return self._fd
 
     def setFd(self, fd) -> State:
         self._fd = fd
+        self._hash = None
 
         return Ok
 
+    def fileno(self) -> int:
+        return self.fd().fileno()
+
     def path(self) -> str:
         return self._path
 
@@ -73,20 +94,63 @@ class StoChooser:
         fd = self._fd
         fd.write(content)
 
+        if self._hash is not None:
+            self._hash.update(content)
+
+    def write(self, content: bytes) -> int:
+        self.store(content)
+        return len(content)
+
+    def flush(self) -> None:
+        self._fd.flush()
+
     def retrive(self, count: int) -> bytes:
         fd = self._fd
         content = fd.read(count)
         return content
 
-    def close(self) -> State:
+    def close(self, digest: Optional[str] = None) -> State:
+        """
+        digest is hash of content of the file if it's
+        known by the writer, the file is not hashed again.
+        """
         fd = self._fd
         fd.close()
 
+        onClose, self._onClose = self._onClose, None
+        if onClose is None:
+            return Ok
+
+        if digest is None and self._hash is not None:
+            digest = self._hash.hexdigest()
+
+        if digest is not None:
+            onClose(digest)
+            return Ok
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            onClose(file_checksum(self._path)[1])
+            return Ok
+
+        # Content is unknown, hash the file out of the loop.
+        loop.run_in_executor(None, file_checksum, self._path) \
+            .add_done_callback(lambda f: onClose(f.result()[1]))
+
         return Ok
 
+    def discard(self) -> None:
+        """
+        Close the file without storing it's content.
+        """
+        self._onClose = None
+        self._fd.close()
+
     def rewind(self) -> None:
         fd = self._fd
         fd.seek(0, 0)
+        self._hash = None
 
 
 class File:
@@ -118,6 +182,9 @@ class Box:
 
         self._where = where
         self._files = {}  # type:  Dict[str, File]
+        # Hash of content of files, content is stored
+        # as blob of Storage.
+        self._refs = {}  # type: Dict[str, str]
 
         self._path = where.sotragePath() + seperator + name
 
@@ -140,6 +207,10 @@ class Box:
 
             self._files[fileName] = file
 
+            digest = self._where.blobOf(filePath)
+            if digest is not None:
+                self._refs[fileName] = digest
+
         return Ok
 
     def files(self) -> List[File]:
@@ -153,7 +224,25 @@ class Box:
     def openFile(self, fileName: str) -> Optional[StoChooser]:
         if fileName not in self._files:
             return None
-        return self._files[fileName].open()
+        return self._chooser(fileName)
+
+    def _chooser(self, fileName: str) -> StoChooser:
+        return StoChooser(
+            self.path() + seperator + fileName,
+            lambda digest: self._where.commit(self, fileName, digest))
+
+    def hashOf(self, fileName: str) -> Optional[str]:
+        return self._refs.get(fileName, None)
+
+    def setRef(self, fileName: str, digest: str) -> Optional[str]:
+        """
+        Reference file to the blob of digest,
+        digest of the old blob is returned.
+        """
+        old = self._refs.get(fileName, None)
+        self._refs[fileName] = digest
+
+        return old
 
     def exists(self, fileName: str) -> bool:
         return fileName in self._files
@@ -178,6 +267,9 @@ class Box:
 
         del self._files[fileName]
 
+        if fileName in self._refs:
+            self._where.unref(self._refs.pop(fileName))
+
     def path(self) -> str:
         return self._where.sotragePath() + seperator + self._ident
 
@@ -190,7 +282,7 @@ class Box:
 
         self.add(name, file)
 
-        return StoChooser(filePath)
+        return self._chooser(name)
 
     def copyFrom(self, filePath: str, fileName: str) -> State:
         # Copy a file specified by the filePath to this box.
@@ -223,6 +315,18 @@ class Box:
 
 
 class Storage(Module):
+    """
+    Files of Storage are addressed by hash of their content,
+    content is stored once as a blob under BLOB_DIR and files
+    of boxes are hard links to the blob. Blob is removed after
+    no file reference to it.
+
+    Blobs on disk are the only state of blobs, DataLink
+    processes share them, reference count of a blob is the
+    number of links to it.
+    """
+
+    BLOB_DIR = ".blobs"
 
     def __init__(self, path: str, inst: Any) -> None:
 
@@ -232,8 +336,12 @@ class Storage(Module):
         self._boxes = {}  # type:  Dict[str, Box]
         self._num = 0
 
+        # Inode of blobs, only used while recovering.
+        self._inodes = {}  # type: Dict[int, str]
+
         # Need to check that is the path valid
         self._path = path
+        self._blobPath = path + seperator + self.BLOB_DIR
 
         # Add target directory's file into Storage
         if os.path.exists(path):
@@ -241,6 +349,9 @@ class Storage(Module):
         else:
             os.makedirs(path)
 
+        if not os.path.exists(self._blobPath):
+            os.makedirs(self._blobPath)
+
     async def begin(self) -> None:
         return None
 
@@ -250,14 +361,161 @@ class Storage(Module):
     def _recover(self) -> None:
         global seperator
 
+        if os.path.exists(self._blobPath):
+            for digest in os.listdir(self._blobPath):
+                blob = self._blobPath + seperator + digest
+                if digest.endswith(".tmp"):
+                    os.remove(blob)
+                    continue
+                self._inodes[os.stat(blob).st_ino] = digest
+
         boxes = os.listdir(self._path)
-        boxes = list(filter(lambda f:  os.path.isdir(self._path+seperator+f),
-                            boxes))
+        boxes = list(filter(lambda f:  os.path.isdir(self._path+seperator+f)
+                            and f != self.BLOB_DIR, boxes))
 
         for boxName in boxes:
             box = Box(boxName, self)
             self._boxes[boxName] = box
 
+        # Blobs that no file reference to
+        for digest in self._inodes.values():
+            self.unref(digest)
+
+        self._inodes = {}
+
+    def blobOf(self, path: str) -> Optional[str]:
+        """
+        Digest of the blob that a file link to while recovering.
+        """
+        return self._inodes.get(os.stat(path).st_ino, None)
+
+    def _blob(self, digest: str) -> str:
+        return self._blobPath + seperator + digest
+
+    def _tmp(self, digest: str) -> str:
+        # Temporary link of a blob, named by pid so
+        # processes not race on it.
+        return self._blob(digest) + "." + str(os.getpid()) + ".tmp"
+
+    def _linkTo(self, digest: str, path: str) -> bool:
+        """
+        Replace the file at path by a link to blob of the
+        digest, False is returned if there is no such blob.
+        """
+        blob, tmp = self._blob(digest), self._tmp(digest)
+
+        try:
+            if os.path.exists(path) and os.path.samefile(path, blob):
+                return True
+            os.link(blob, tmp)
+        except FileNotFoundError:
+            return False
+
+        os.replace(tmp, path)
+
+        return True
+
+    def commit(self, box: Box, fileName: str, digest: str) -> None:
+        """
+        Deduplicate content of a file that just stored, the file
+        is linked to blob of the digest if there is such blob
+        otherwise content of the file become the blob.
+        """
+        path = box.path() + seperator + fileName
+        blob = self._blob(digest)
+
+        while True:
+            try:
+                os.link(path, blob)
+                break
+            except FileExistsError:
+                # Blob is created by another file of the same
+                # content, maybe by another process.
+                if self._linkTo(digest, path):
+                    break
+                # The blob is removed meanwhile.
+
+        old = box.setRef(fileName, digest)
+        if old is not None and old != digest:
+            self.unref(old)
+
+    def unref(self, digest: str) -> None:
+        """
+        Remove blob of the digest if no file link to it.
+        """
+        try:
+            if self.refcount(digest) == 0:
+                os.remove(self._blob(digest))
+        except FileNotFoundError:
+            pass
+
+    def link(self, digest: str, boxName: str, fileName: str) \
+            -> Optional[str]:
+        """
+        Reference a file of a box to blob of the digest
+        without transfer of content, path of the file is
+        returned or None if there is no such blob.
+        """
+        if boxName == "" or fileName == "" or not self.hasBlob(digest):
+            return None
+
+        if boxName not in self._boxes:
+            self._createBox(boxName)
+
+        theBox = self._getBox(boxName)
+        assert(theBox is not None)
+
+        path = theBox.path() + seperator + fileName
+
+        if theBox.hashOf(fileName) == digest and os.path.exists(path):
+            return path
+
+        # Content of the file is replaced after the link is
+        # created so the file is intact if the blob is gone.
+        if not self._linkTo(digest, path):
+            return None
+
+        theBox.add(fileName, File(fileName, path))
+
+        old = theBox.setRef(fileName, digest)
+        if old is not None and old != digest:
+            self.unref(old)
+
+        return path
+
+    def hasBlob(self, digest: str, size: Optional[int] = None) -> bool:
+        try:
+            blobSize = os.path.getsize(self._blob(digest))
+        except FileNotFoundError:
+            return False
+
+        return size is None or blobSize == size
+
+    def blobPath(self, digest: str) -> Optional[str]:
+        if not os.path.exists(self._blob(digest)):
+            return None
+        return self._blob(digest)
+
+    def refcount(self, digest: str) -> int:
+        """
+        Number of files that link to blob of the digest.
+        """
+        try:
+            return os.stat(self._blob(digest)).st_nlink - 1
+        except FileNotFoundError:
+            return 0
+
+    def numOfBlobs(self) -> int:
+        return len([digest for digest in os.listdir(self._blobPath)
+                    if not digest.endswith(".tmp")])
+
+    def hashOf(self, boxName: str, fileName: str) -> Optional[str]:
+        theBox = self._getBox(boxName)
+        if theBox is None:
+            return None
+
+        return theBox.hashOf(fileName)
+
     def recover(self) -> None:
         self._recover()
 
@@ -281,7 +539,7 @@ class Storage(Module):
 
         f = theBox.getFile(fileName)
         if f is not None:
-            return f.open()
+            return theBox.openFile(fileName)
 
         # The file is not exist.
         return theBox.newFile(fileName)
@@ -464,3 +722,133 @@ class StorageTestCases(unittest.TestCase):
         self.assertTrue(not os.path.exists("./Storage/B2/File2"))
         self.assertTrue(os.path.exists("./Storage/B1/File2"))
         self.assertTrue(os.path.exists("./Storage/B2/File1"))
+
+    def test_Storage_Dedup(self) -> None:
+        # Setup
+        contents = b"Contents of TestFile"
+
+        # Exercise
+        for boxName in ["B1", "B2"]:
+            chooser = cast(StoChooser, self.storage.create(boxName, "File"))
+            chooser.store(contents)
+            chooser.close()
+
+        # Verify
+        digest = cast(str, self.storage.hashOf("B1", "File"))
+        self.assertEqual(digest, self.storage.hashOf("B2", "File"))
+        self.assertEqual(2, self.storage.refcount(digest))
+        self.assertEqual(1, self.storage.numOfBlobs())
+        self.assertTrue(os.path.samefile("./Storage/B1/File",
+                                         "./Storage/B2/File"))
+
+        self.storage.delete("B1", "File")
+        self.assertEqual(1, self.storage.refcount(digest))
+
+        self.storage.delete("B2", "File")
+        self.assertFalse(self.storage.hasBlob(digest))
+        self.assertEqual([], os.listdir("./Storage/.blobs"))
+
+    def test_Storage_Overwrite(self) -> None:
+        # Setup
+        for boxName in ["B1", "B2"]:
+            chooser = cast(StoChooser, self.storage.create(boxName, "File"))
+            chooser.store(b"Old")
+            chooser.close()
+        old = cast(str, self.storage.hashOf("B1", "File"))
+
+        # Exercise
+        chooser = cast(StoChooser, self.storage.open("B1", "File"))
+        chooser.store(b"New")
+        chooser.close()
+
+        # Verify
+        with open("./Storage/B2/File", "rb") as f:
+            self.assertEqual(b"Old", f.read())
+        with open("./Storage/B1/File", "rb") as f:
+            self.assertEqual(b"New", f.read())
+        self.assertEqual(1, self.storage.refcount(old))
+        self.assertEqual(2, self.storage.numOfBlobs())
+
+    def test_Storage_LinkAndRecover(self) -> None:
+        # Setup
+        chooser = cast(StoChooser, self.storage.create("B1", "File"))
+        chooser.fd().write(b"Contents")
+        chooser.close()
+        digest = cast(str, self.storage.hashOf("B1", "File"))
+
+        # Exercise
+        path = self.storage.link(digest, "B2", "Copy")
+        self.assertIsNone(self.storage.link("NotExists", "B2", "File"))
+
+        # Verify
+        self.assertEqual("./Storage/B2/Copy", path)
+        self.assertTrue(self.storage.hasBlob(digest, len(b"Contents")))
+        self.assertFalse(self.storage.hasBlob(digest, 1))
+        self.assertEqual(2, self.storage.refcount(digest))
+
+        recovered = Storage("./Storage", None)
+        self.assertEqual(2, recovered.refcount(digest))
+        self.assertEqual(digest, recovered.hashOf("B2", "Copy"))
+        self.assertEqual(2, recovered.numOfFiles())
+
+    def test_Storage_SharedBlobs(self) -> None:
+        # Setup
+        # Storage of another process that not know blobs
+        # created by this process.
+        other = Storage("./Storage", None)
+
+        # Exercise
+        for sto, boxName in [(self.storage, "B1"), (other, "B2")]:
+            chooser = cast(StoChooser, sto.create(boxName, "File"))
+            chooser.store(b"Contents")
+            chooser.close()
+
+        # Verify
+        digest = cast(str, self.storage.hashOf("B1", "File"))
+        self.assertEqual(digest, other.hashOf("B2", "File"))
+        self.assertTrue(os.path.samefile("./Storage/B1/File",
+                                         "./Storage/B2/File"))
+        self.assertEqual(2, other.refcount(digest))
+
+        self.storage.delete("B1", "File")
+        self.assertTrue(other.hasBlob(digest))
+        self.assertEqual(1, self.storage.refcount(digest))
+
+        other.delete("B2", "File")
+        self.assertFalse(self.storage.hasBlob(digest))
+
+
+class StorageAsyncTestCases(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self) -> None:
+        self.storage = Storage("./Storage", None)
+
+    async def asyncTearDown(self) -> None:
+        shutil.rmtree("./Storage")
+
+    async def test_Storage_HashOutOfLoop(self) -> None:
+        # Setup
+        chooser = cast(StoChooser, self.storage.create("B1", "File"))
+        chooser.fd().write(b"Contents")
+
+        # Exercise
+        chooser.close()
+
+        # Verify
+        # The file is hashed in executor.
+        self.assertIsNone(self.storage.hashOf("B1", "File"))
+        await asyncio.sleep(0.1)
+        self.assertEqual(file_checksum("./Storage/B1/File")[1],
+                         self.storage.hashOf("B1", "File"))
+
+    async def test_Storage_Discard(self) -> None:
+        # Setup
+        chooser = cast(StoChooser, self.storage.create("B1", "File"))
+        chooser.store(b"Partial")
+
+        # Exercise
+        chooser.discard()
+
+        # Verify
+        self.assertIsNone(self.storage.hashOf("B1", "File"))
+        self.assertEqual(0, self.storage.numOfBlobs())
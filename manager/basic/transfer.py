@@ -0,0 +1,390 @@
+# MIT License
+#
+# Copyright (c) 2020 Gcom
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# transfer.py
+#
+# Receiver side of files transfered via BinaryStreamLetter.
+
+import os
+import time
+import asyncio
+from typing import Dict, BinaryIO, Callable, List, Optional, Any, Tuple
+from manager.basic.letter import BinaryStreamLetter, \
+    STREAM_CHECKSUM_MISMATCH, stream_hash, file_checksum
+from manager.basic.storage import StoChooser
+
+
+class TRANSFER_TAKEN_OVER(ConnectionError):
+
+    def __init__(self, tid: str) -> None:
+        self._tid = tid
+
+    def __str__(self) -> str:
+        return "Transfer " + self._tid + " is taken over by another stream."
+
+
+def close_file(fd: BinaryIO, digest: Optional[str]) -> None:
+    """
+    Close a file that received intact, file of Storage is
+    hashed after closed so digest of it is passed if known.
+    """
+    if isinstance(fd, StoChooser):
+        fd.close(digest)
+    else:
+        fd.close()
+
+
+def discard_file(fd: BinaryIO, path: str) -> None:
+    """
+    Close and remove a file that not received intact, path
+    is not removed if it's another file now.
+    """
+    ino = os.fstat(fd.fileno()).st_ino
+
+    if isinstance(fd, StoChooser):
+        fd.discard()
+    else:
+        fd.close()
+
+    try:
+        if os.stat(path).st_ino == ino:
+            os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class RangedFile:
+    """
+    A file that transfered as ranges by parallel streams,
+    ranges are written into the file by positioned writes.
+    """
+
+    def __init__(self, letter: BinaryStreamLetter,
+                 fd: BinaryIO, path: str) -> None:
+        self.tid = letter.getTid()
+        self.size = letter.getFileSize()
+        self.checksum = letter.getChecksum()
+        self.path = path
+        self.lastActive = time.monotonic()
+
+        self._fd = fd
+        self._done = {}  # type: Dict[int, int]
+        # Checksum of content after verified.
+        self._digest = None  # type: Optional[str]
+
+    def matches(self, letter: BinaryStreamLetter) -> bool:
+        return self.size == letter.getFileSize() and \
+            self.checksum == letter.getChecksum()
+
+    def fd(self) -> BinaryIO:
+        return self._fd
+
+    def write(self, chunk: bytes, pos: int) -> None:
+        os.pwrite(self._fd.fileno(), chunk, pos)
+        self.lastActive = time.monotonic()
+
+    def rangeDone(self, begin: int, length: int) -> None:
+        self._done[begin] = length
+
+    def isFinished(self) -> bool:
+        return sum(self._done.values()) == self.size
+
+    async def verify(self) -> bool:
+        """
+        Checksum of the file after all ranges are written.
+        """
+        self._fd.flush()
+
+        _, checksum = await asyncio.get_running_loop().run_in_executor(
+            None, file_checksum, self.path)
+        self._digest = checksum
+
+        return checksum == self.checksum
+
+    def close(self) -> None:
+        close_file(self._fd, self._digest)
+
+    def discard(self) -> None:
+        discard_file(self._fd, self.path)
+
+
+class TransferSession:
+    """
+    State of a file in transfer, a session outlive the
+    connection that transfer the file so a transfer
+    interrupted is resumed from offset of the session.
+
+    Session of a range of a RangedFile write into the file
+    at begin of the range.
+    """
+
+    def __init__(self, letter: BinaryStreamLetter,
+                 fd: BinaryIO, path: str,
+                 file: Optional[RangedFile] = None) -> None:
+        self.tid = letter.getTid()
+        self.size = letter.getSize()
+        self.checksum = letter.getChecksum()
+        self.begin = letter.getBegin()
+        self.path = path
+
+        # Bytes of the file that is written.
+        self.offset = 0
+        # Bytes received by all streams of the session.
+        self.received = 0
+        self.lastActive = time.monotonic()
+
+        # Letter of the stream that writing the session,
+        # only one stream write to a session.
+        self.owner = None  # type: Optional[BinaryStreamLetter]
+
+        self._fd = fd
+        self.file = file
+        self._hash = stream_hash()
+
+        # Content is hashed by the session, a file of Storage
+        # is written directly so it's not hashed again.
+        self._out = fd.fd() if isinstance(fd, StoChooser) else fd
+
+    def matches(self, letter: BinaryStreamLetter) -> bool:
+        """
+        Is the letter transfer the same file as the session.
+        """
+        return self.size == letter.getSize() and \
+            self.checksum == letter.getChecksum()
+
+    def write(self, chunk: bytes) -> None:
+        if self.file is None:
+            self._out.write(chunk)
+            self._hash.update(chunk)
+        else:
+            self.file.write(chunk, self.begin + self.offset)
+
+        self.offset += len(chunk)
+        self.received += len(chunk)
+        self.lastActive = time.monotonic()
+
+    def isFinished(self) -> bool:
+        return self.offset == self.size
+
+    def isIdle(self, now: float, timeout: float) -> bool:
+        return self.owner is None and now - self.lastActive > timeout
+
+    def verify(self) -> bool:
+        return self._hash.hexdigest() == self.checksum
+
+    def close(self) -> None:
+        self.owner = None
+
+        # File of a range is closed after all ranges.
+        if self.file is None:
+            close_file(self._fd, self._hash.hexdigest())
+
+    def discard(self) -> None:
+        self.owner = None
+
+        if self.file is None:
+            discard_file(self._fd, self.path)
+
+
+class TransferTable:
+    """
+    Sessions of files in transfer keyed by tid, so
+    files of tasks of a job are transfered in parallel.
+
+    At most maxActive streams are received at the same time,
+    others wait for a slot. Sessions that no stream write
+    for idleTimeout seconds are dropped.
+    """
+
+    MAX_ACTIVE = 16
+    IDLE_TIMEOUT = 600
+
+    def __init__(self, maxActive: int = MAX_ACTIVE,
+                 idleTimeout: float = IDLE_TIMEOUT) -> None:
+        self._sessions = {}  # type: Dict[str, TransferSession]
+        self._files = {}  # type: Dict[str, RangedFile]
+        self._maxActive = maxActive
+        self._idleTimeout = idleTimeout
+        self._slots = None  # type: Optional[asyncio.Semaphore]
+
+    @staticmethod
+    def key(letter: BinaryStreamLetter) -> str:
+        if letter.isRange():
+            return letter.getTid() + "@" + str(letter.getBegin())
+        return letter.getTid()
+
+    def get(self, key: str) -> Optional[TransferSession]:
+        return self._sessions.get(key, None)
+
+    def sessions(self) -> List[TransferSession]:
+        return list(self._sessions.values())
+
+    def numOfSessions(self) -> int:
+        return len(self._sessions)
+
+    def numOfActive(self) -> int:
+        return len([s for s in self._sessions.values()
+                    if s.owner is not None])
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {key: {"size": s.size, "offset": s.offset,
+                      "received": s.received}
+                for key, s in self._sessions.items()}
+
+    def evict(self) -> None:
+        now = time.monotonic()
+
+        for key, session in list(self._sessions.items()):
+            if session.isIdle(now, self._idleTimeout):
+                self._remove(key, session, False)
+
+        for tid, file in list(self._files.items()):
+            if now - file.lastActive > self._idleTimeout and \
+               not any(s.tid == tid for s in self._sessions.values()):
+                del self._files[tid]
+                file.discard()
+
+    def _remove(self, key: str, session: TransferSession,
+                intact: bool) -> None:
+        """
+        Remove the session, file of the session is discarded
+        if it's not intact.
+        """
+        if self._sessions.get(key) is session:
+            del self._sessions[key]
+
+        if intact:
+            session.close()
+        else:
+            session.discard()
+
+    async def receive(self, letter: BinaryStreamLetter,
+                      open_: Callable[[], Tuple[BinaryIO, str]],
+                      resumable: bool = True) \
+            -> Optional[TransferSession]:
+        """
+        Receive the file that follow the letter into session of
+        the transfer, file of the transfer is opened by open_()
+        if there is no session of the file.
+
+        Session is kept if the stream is broken so sender is able
+        to resume the transfer, STREAM_CHECKSUM_MISMATCH is raised
+        if the file is not intact. If resumable is False every
+        transfer start over and session of a broken stream is
+        discarded.
+
+        Session of the file is returned after the whole file
+        is received, None is returned after a range of the file
+        is received and other ranges are still in transfer.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self._maxActive)
+
+        async with self._slots:
+            return await self._receive(letter, open_, resumable)
+
+    def _session(self, letter: BinaryStreamLetter,
+                 open_: Callable[[], Tuple[BinaryIO, str]],
+                 resumable: bool) -> TransferSession:
+        tid, key = letter.getTid(), self.key(letter)
+
+        session = self._sessions.get(key)
+        if session is not None and \
+           (not session.matches(letter) or not resumable or
+            not letter.isResumable()):
+            # Another file with same tid or sender is unable
+            # to resume, start over.
+            self._remove(key, session, False)
+            session = None
+
+        if session is not None:
+            return session
+
+        if not letter.isRange():
+            session = TransferSession(letter, *open_())
+        else:
+            file = self._files.get(tid)
+            if file is None or not file.matches(letter):
+                if file is not None:
+                    file.discard()
+                file = self._files[tid] = RangedFile(letter, *open_())
+
+            session = TransferSession(letter, file.fd(), file.path, file)
+
+        self._sessions[key] = session
+
+        return session
+
+    async def _receive(self, letter: BinaryStreamLetter,
+                       open_: Callable[[], Tuple[BinaryIO, str]],
+                       resumable: bool) -> Optional[TransferSession]:
+        self.evict()
+
+        tid, key = letter.getTid(), self.key(letter)
+        session = self._session(letter, open_, resumable)
+
+        # Stream that is writing the session is stale
+        # if sender resume the transfer, take it over.
+        session.owner = letter
+
+        await letter.resumeAt(session.offset)
+
+        try:
+            async for chunk in letter.chunks():
+                if session.owner is not letter:
+                    raise TRANSFER_TAKEN_OVER(tid)
+                session.write(chunk)
+        except BaseException:
+            if not resumable and self._sessions.get(key) is session:
+                self._remove(key, session, False)
+            raise
+        finally:
+            if session.owner is letter:
+                session.owner = None
+                session.lastActive = time.monotonic()
+
+        file = session.file
+        if file is None:
+            ok = session.verify()
+            self._remove(key, session, ok)
+        else:
+            self._remove(key, session, True)
+            file.rangeDone(session.begin, session.size)
+
+            if not file.isFinished():
+                await letter.confirm(True)
+                return None
+
+            if self._files.get(tid) is file:
+                del self._files[tid]
+            ok = await file.verify()
+            if ok:
+                file.close()
+            else:
+                file.discard()
+
+        await letter.confirm(ok)
+
+        if not ok:
+            raise STREAM_CHECKSUM_MISMATCH(tid)
+
+        return session
@@ -28,13 +28,25 @@ import manager.master.configs as cfg
 
 from manager.basic.info import Info
 from manager.master.dispatcher import Dispatcher, WaitArea, \
-    WaitAreaSpec, theListener, viaOverhead
+    WaitAreaSpec, FairSchedule, theListener, viaOverhead
+from manager.master.job import Job
 from manager.master.workerRoom import WorkerRoom
 from manager.master.taskTracker import TaskTracker
 from manager.master.TestCases.misc.workerStub import WorkerStub
 from manager.master.worker import Worker
 from manager.master.task import Task, SingleTask, PostTask
-from manager.master.build import Build, BuildSet
+from manager.master.build import Build, BuildSet, Merge
+from manager.basic.endpoint import Endpoint
+
+
+class PeerStub(Endpoint):
+
+    def __init__(self) -> None:
+        Endpoint.__init__(self)
+        self.notifies = []  # type: typing.List[typing.Any]
+
+    async def handle(self, data: typing.Any) -> None:
+        self.notifies.append(data)
 
 
 class sInst:
@@ -60,6 +72,13 @@ class MsgPri2:
         self.msg = msg
 
 
+class JobMsg:
+
+    def __init__(self, msg: str, job: Job) -> None:
+        self.msg = msg
+        self.origin = job
+
+
 async def msgCheck(self, t) -> None:
     for i in range(10):
         msg = await self.sut.dequeue(timeout=1)
@@ -133,6 +152,98 @@ class WaitAreaTestCases(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(None, msg)
 
 
+class FairScheduleTestCases(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.sut = FairSchedule(aging=600)
+
+    def push(self, job: Job, num: int) -> None:
+        for i in range(num):
+            self.sut.push(JobMsg(job.jobid + str(i), job))
+
+    def pop(self, num: int) -> typing.List[str]:
+        return [self.sut.pop().origin.jobid for i in range(num)]
+
+    def test_FairSchedule_SmallJobNotStarve(self) -> None:
+        # Setup
+        nightly = Job("Nightly", "BS", {})
+        single = Job("Single", "B", {})
+
+        # Exercise
+        self.push(nightly, 100)
+        self.pop(10)
+        self.push(single, 2)
+
+        # Verify
+        self.assertEqual(2, self.pop(4).count("Single"))
+        self.assertEqual(88, len(self.sut))
+
+    def test_FairSchedule_JobWeight(self) -> None:
+        # Setup
+        heavy = Job("Heavy", "BS", {"weight": "3"})
+        light = Job("Light", "BS", {"weight": "1"})
+
+        # Exercise
+        self.push(heavy, 40)
+        self.push(light, 40)
+
+        # Verify
+        self.assertEqual(15, self.pop(20).count("Heavy"))
+
+    def test_FairSchedule_RequesterShare(self) -> None:
+        # Setup
+        jobs = [Job("X" + str(i), "BS", {"requester": "X"})
+                for i in range(3)]
+        y = Job("Y", "BS", {"requester": "Y"})
+
+        # Exercise
+        for job in jobs:
+            self.push(job, 10)
+        self.push(y, 10)
+
+        # Verify
+        self.assertEqual(10, self.pop(20).count("Y"))
+
+    def test_FairSchedule_Aging(self) -> None:
+        # Setup
+        self.sut = FairSchedule(aging=0)
+        a, b = Job("A", "BS", {}), Job("B", "BS", {})
+
+        # Exercise
+        self.push(a, 3)
+        self.push(b, 3)
+
+        # Verify
+        self.assertEqual(["A", "A", "A", "B", "B", "B"], self.pop(6))
+
+    def test_FairSchedule_PeekIsNext(self) -> None:
+        # Setup
+        a, b = Job("A", "BS", {}), Job("B", "BS", {})
+        self.push(a, 5)
+        self.push(b, 5)
+
+        # Exercise and Verify
+        while len(self.sut) > 0:
+            peek = self.sut.peek()
+            self.assertIs(peek, self.sut.pop())
+        self.assertIsNone(self.sut.peek())
+
+    def test_FairSchedule_IterInOrder(self) -> None:
+        # Setup
+        heavy = Job("Heavy", "BS", {"weight": "3"})
+        light = Job("Light", "BS", {"requester": "L"})
+        self.push(heavy, 6)
+        self.pop(1)
+        self.push(light, 4)
+
+        # Exercise
+        tasks = list(self.sut)
+
+        # Verify
+        self.assertEqual(9, len(self.sut))
+        self.assertEqual([t.origin.jobid for t in tasks], self.pop(9))
+
+
 class DispatcherUnitTest(unittest.IsolatedAsyncioTestCase):
 
     async def asyncSetUp(self) -> None:
@@ -248,3 +359,189 @@ class DispatcherUnitTest(unittest.IsolatedAsyncioTestCase):
         worker_another = self.sut._taskTracker.whichWorker(t.id())  # type: ignore
         self.assertTrue(worker_another is not None)
         self.assertTrue(worker_another, worker)
+
+    def singleTasks(self, num: int) -> typing.List[SingleTask]:
+        return [SingleTask("S" + str(i), "SN", "REV",
+                           Build("B", {"cmd": "...", "output": "..."}))
+                for i in range(num)]
+
+    async def test_Dispatcher_DrainOnCapacity(self) -> None:
+        """
+        Tasks in wait are dispatched as soon as workers
+        finished their tasks.
+        """
+        # Setup
+        self.sut.set_peer(PeerStub())
+        self.sut.start()
+        normals = [self.n, self.n1, self.n2, self.n3]
+
+        for t in self.singleTasks(8):
+            self.sut.dispatch(t)
+        await asyncio.sleep(0.1)
+        self.assertEqual(4, self.sut._waitArea.numOfTasks())
+
+        # Exercise
+        for w in normals:
+            await self.sut.job_notify_handle(
+                (w.inProcTasks()[0].id(), Task.STATE_FINISHED))
+        await asyncio.sleep(0.01)
+
+        # Verify
+        self.assertEqual(0, self.sut._waitArea.numOfTasks())
+        self.assertEqual([1, 1, 1, 1],
+                         [w.numOfTaskProc() for w in normals])
+        self.assertEqual([2, 2, 2, 2], [w.singleCount for w in normals])
+
+    async def test_Dispatcher_LearnDuration(self) -> None:
+        """
+        Duration of a task is learned while it's finished.
+        """
+        # Setup
+        self.sut.set_peer(PeerStub())
+        self.sut.start()
+        t = self.singleTasks(1)[0]
+
+        # Exercise
+        self.sut.dispatch(t)
+        await asyncio.sleep(0.1)
+        worker = self.tt.whichWorker(t.id())
+        assert(worker is not None)
+
+        await self.sut.job_notify_handle((t.id(), Task.STATE_FINISHED))
+
+        # Verify
+        self.assertEqual(worker.ident, t.procWorker)
+        self.assertIsNotNone(t.procTime)
+        self.assertIsNotNone(
+            self.sut.durationModel().estimate("", "S0", worker.ident))
+
+    async def test_Dispatcher_SlowWorkerNotBlock(self) -> None:
+        """
+        Sending a task to a slow worker not block tasks
+        that dispatch to other workers.
+        """
+        # Setup
+        for w in [self.n1, self.n2, self.n3]:
+            w.setState(Worker.STATE_OFFLINE)
+
+        do = self.n.do
+
+        async def slow_do(task: Task) -> None:
+            await asyncio.sleep(1)
+            await do(task)
+        self.n.do = slow_do  # type: ignore
+
+        self.sut.start()
+        s0, s1 = self.singleTasks(2)
+
+        # Exercise
+        self.sut.dispatch(s0)
+        await asyncio.sleep(0.01)
+        self.assertEqual(1, self.n.numOfReserved())
+
+        # Capacity of the slow worker is reserved
+        # so s1 is in wait.
+        self.sut.dispatch(s1)
+        await asyncio.sleep(0.01)
+        self.assertEqual(1, self.sut._waitArea.numOfTasks())
+
+        self.n1.setState(Worker.STATE_ONLINE)
+        await self.sut.worker_notify_handle(self.n1)
+        await asyncio.sleep(0.01)
+
+        # Verify
+        self.assertEqual(1, self.n1.singleCount)
+        self.assertEqual(0, self.n.singleCount)
+
+        await asyncio.sleep(1)
+        self.assertEqual(1, self.n.singleCount)
+        self.assertEqual(0, self.n.numOfReserved())
+
+    async def test_Dispatcher_SendFailedRelease(self) -> None:
+        """
+        Reservation of a worker is released while
+        failed to send task to it and the task is
+        dispatched again after RETRY_DELAY.
+        """
+        # Setup
+        for w in [self.n, self.n1, self.n2, self.n3]:
+            w.setState(Worker.STATE_OFFLINE)
+
+        do = self.n.do
+        calls = 0
+
+        async def broken_do(task: Task) -> None:
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise ConnectionError()
+            await do(task)
+        self.n.do = broken_do  # type: ignore
+
+        self.sut.RETRY_DELAY = 0.1  # type: ignore
+        self.sut.start()
+        self.sut.dispatch(self.singleTasks(1)[0])
+        await asyncio.sleep(0.01)
+
+        # Exercise
+        # Task in wait is failed to send to the worker.
+        self.n.setState(Worker.STATE_ONLINE)
+        await self.sut.worker_notify_handle(self.n)
+        await asyncio.sleep(0.01)
+
+        # Verify
+        # Task is not retried immediately.
+        self.assertEqual(1, calls)
+        self.assertEqual(0, self.n.numOfReserved())
+
+        await asyncio.sleep(0.2)
+        self.assertEqual(2, calls)
+        self.assertEqual(0, self.n.numOfReserved())
+        self.assertEqual(0, self.sut._waitArea.numOfTasks())
+        self.assertEqual(1, self.n.singleCount)
+
+    async def test_Dispatcher_TaskInWaits(self) -> None:
+        # Setup
+        for w in [self.n, self.n1, self.n2, self.n3]:
+            w.setState(Worker.STATE_OFFLINE)
+        self.sut.start()
+
+        # Exercise
+        for t in self.singleTasks(3):
+            self.sut.dispatch(t)
+        await asyncio.sleep(0.01)
+
+        # Verify
+        self.assertEqual(["S0", "S1", "S2"],
+                         [t.id() for t in self.sut.getTaskInWaits()])
+        self.assertEqual(3, self.sut._waitArea.numOfTasks())
+
+    async def test_Dispatcher_DispatchOnWorkerConnect(self) -> None:
+        """
+        Tasks in wait are dispatched to a worker
+        that connected.
+        """
+        # Setup
+        normals = [self.n, self.n1, self.n2, self.n3]
+        for w in normals:
+            w.setState(Worker.STATE_OFFLINE)
+        self.sut.start()
+
+        for t in self.singleTasks(2):
+            self.sut.dispatch(t)
+        self.sut.dispatch(PostTask("P", "V", [], typing.cast(Merge, None)))
+        await asyncio.sleep(0.1)
+
+        # PostTask is not blocked by SingleTasks
+        self.assertEqual(1, self.m.postCount)
+        self.assertEqual(2, self.sut._waitArea.numOfTasks())
+
+        # Exercise
+        self.n.setState(Worker.STATE_ONLINE)
+        self.n.max = 2
+        await self.sut.worker_notify_handle(self.n)
+        await asyncio.sleep(0.01)
+
+        # Verify
+        self.assertEqual(0, self.sut._waitArea.numOfTasks())
+        self.assertEqual(2, self.n.singleCount)
@@ -0,0 +1,134 @@
+# MIT License
+#
+# Copyright (c) 2020 Gcom
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import unittest
+import typing as T
+
+from manager.master.durationModel import DurationModel
+from manager.master.job import Job
+from manager.master.task import Task, SingleTask, PostTask
+from manager.master.build import Build, Merge
+
+
+class DurationModelTestCases(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.sut = DurationModel()
+        self.job = Job("Job", "BS", {})
+
+    def single(self, ident: str) -> SingleTask:
+        t = SingleTask("1_" + ident, "SN", "REV",
+                       Build(ident, {"cmd": "...", "output": "..."}))
+        t.origin = self.job
+        return t
+
+    def post(self) -> PostTask:
+        t = PostTask("1_Job", "V", [], T.cast(Merge, None))
+        t.origin = self.job
+        return t
+
+    def test_DurationModel_Estimate(self) -> None:
+        # Exercise
+        for s in [10, 20, 30]:
+            self.sut.observe("BS", "B1", "W1", s)
+        self.sut.observe("BS", "B1", "W2", 100)
+
+        # Verify
+        w1 = self.sut.estimate("BS", "B1", "W1")
+        assert(w1 is not None and w1.mean is not None)
+        self.assertAlmostEqual(10 + 0.3 * 10 + 0.3 * 17, w1.mean)
+        self.assertEqual(3, w1.count)
+
+        # Worker without history of the build
+        # fallback to all of workers.
+        w3 = self.sut.estimate("BS", "B1", "W3")
+        assert(w3 is not None)
+        self.assertEqual(4, w3.count)
+        self.assertIsNone(self.sut.estimate("BS", "B2"))
+
+    def test_DurationModel_LearnFromTask(self) -> None:
+        # Setup
+        t = self.single("B1")
+
+        # Exercise
+        self.sut.begin(t, "W1")
+        seconds = self.sut.finish(t)
+
+        # Verify
+        assert(seconds is not None)
+        self.assertEqual("W1", t.procWorker)
+        self.assertEqual(seconds, t.procTime)
+        self.assertEqual(seconds, self.sut.predict(self.single("B1")))
+
+        # Aborted task is not learned.
+        self.sut.begin(t, "W1")
+        self.sut.abort(t.id())
+        self.assertIsNone(self.sut.finish(t))
+
+    def test_DurationModel_LongestFirst(self) -> None:
+        # Setup
+        self.sut.observe("BS", "B1", "W1", 10)
+        self.sut.observe("BS", "B2", "W1", 300)
+        self.sut.observe("BS", "B3", "W1", 60)
+        tasks = [self.single(b) for b in ["B1", "B2", "B3", "B4"]]
+
+        # Exercise
+        ordered = self.sut.longestFirst(tasks)
+
+        # Verify
+        self.assertEqual(["1_B4", "1_B2", "1_B3", "1_B1"],
+                         [t.id() for t in ordered])
+
+    def test_DurationModel_TimeToFinish(self) -> None:
+        # Setup
+        self.sut.observe("BS", "B1", "W1", 10)
+        self.sut.observe("BS", "B2", "W1", 300)
+        self.sut.observe("BS", DurationModel.MERGE, "M", 30)
+
+        b1, b2, post = self.single("B1"), self.single("B2"), self.post()
+
+        # Exercise and Verify
+        self.assertEqual(330, self.sut.timeToFinish([b1, b2, post]))
+
+        b2.stateChange(Task.STATE_IN_PROC)
+        b2.stateChange(Task.STATE_FINISHED)
+        self.assertEqual(40, self.sut.timeToFinish([b1, b2, post]))
+
+        # Unknown while a build has no history.
+        self.assertIsNone(
+            self.sut.timeToFinish([b1, self.single("B3"), post]))
+
+    def test_DurationModel_KeyOfCommand(self) -> None:
+        # Setup
+        a, b = self.single("B1"), self.single("B1")
+        b.origin = Job("Job", "B", {})
+
+        # Exercise
+        self.sut.begin(a, "W1")
+        self.sut.finish(a)
+
+        # Verify
+        # Builds of different commands are learned apart.
+        self.assertEqual(("BS", "B1"), DurationModel.keyOf(a))
+        self.assertEqual(("B", "B1"), DurationModel.keyOf(b))
+        self.assertIsNone(self.sut.predict(b))
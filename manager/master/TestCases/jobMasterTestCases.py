@@ -35,6 +35,8 @@ from channels.db import database_sync_to_async
 from manager.master.jobMaster import command_var_replace, \
     command_preprocessing, build_preprocessing
 from manager.master.build import Build
+from manager.master.dispatcher import FairSchedule
+from manager.master.durationModel import DurationModel
 
 
 class DispatcherFake(Endpoint):
@@ -102,6 +104,78 @@ class JobMasterTestCases(unittest.IsolatedAsyncioTestCase):
         job = await sync_to_async(Jobs.objects.filter)(jobid="JobMasterTest1")
         await sync_to_async(job.delete)()  # type: ignore
 
+    async def test_JobMaster_SingleBuildShare(self) -> None:
+        """
+        Tasks of single-build jobs are shared by
+        info of their jobs.
+        """
+        # Setup
+        schedule = FairSchedule(aging=600)
+        jobs = [Job("ShareX" + str(i), "GL5610", {
+            "sn": "123456", "vsn": "123456", "requester": "X"})
+            for i in range(3)]
+        jobs.append(Job("ShareY", "GL5610", {
+            "sn": "123456", "vsn": "123456", "requester": "Y"}))
+
+        # Exercise
+        for job in jobs:
+            self.sut.bind(job)
+            for t in job.tasks():
+                schedule.push(t)
+
+        # Verify
+        first = [schedule.pop().origin.jobid for i in range(2)]
+        self.assertTrue("ShareY" in first)
+
+        # Result of a single-build job is not stored by it's task.
+        for job in jobs:
+            self.assertIsNone(job.tasks()[0].job)
+
+    async def test_JobMaster_SingleBuildDurations(self) -> None:
+        """
+        Duration of a single-build job learned while it's
+        processed is recovered from history by the same key.
+        """
+        # Setup
+        job = Job("DurationTest", "GL5610", {"sn": "123456", "vsn": "123456"})
+        job.set_unique_id(65536)
+        self.sut.bind(job)
+        task = job.tasks()[0]
+
+        learned = DurationModel()
+        learned.begin(task, "W1")
+        learned.finish(task)
+
+        # Exercise
+        await self.sut._record_history(job)
+        recovered = DurationModel()
+        self.sut.setDurationModel(recovered)
+        await self.sut._durations_recovery()
+
+        # Verify
+        key = DurationModel.keyOf(task)
+        self.assertEqual(("GL5610", "GL5610"), key)
+
+        estimate = recovered.estimate(*key, "W1")
+        assert(estimate is not None and estimate.mean is not None)
+        self.assertEqual(learned.estimate(*key, "W1").mean,  # type: ignore
+                         estimate.mean)
+
+        # Teardown
+        taskhistory = await database_sync_to_async(
+            TaskHistory.objects.filter
+        )(jobhistory_id=job.unique_id)
+        await database_sync_to_async(
+            taskhistory.delete
+        )()
+
+        jobhistory = await database_sync_to_async(
+            JobHistory.objects.filter
+        )(unique_id=job.unique_id)
+        await database_sync_to_async(
+            jobhistory.delete
+        )()
+
     async def test_JobMaster_DoJob(self) -> None:
         """
         Assign a job to JobMaster, JobMaster should bind
@@ -49,6 +49,7 @@ class WorkerStub(Worker):
 
         try:
             self.inProcTask.newTask(task)
+            self._changed()
         except Exception as e:
             print(e)
 
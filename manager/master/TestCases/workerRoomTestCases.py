@@ -5,8 +5,12 @@ import asyncio
 
 from manager.master.worker import Worker
 from manager.basic.letter import Letter, PropLetter, receving, \
-    CommandLetter, CmdResponseLetter, sending
+    CommandLetter, CmdResponseLetter, sending, SUPPORTED_CODECS, \
+    SUPPORTED_COMPRESS
 from manager.master.workerRoom import WorkerRoom
+from manager.master.task import SingleTask
+from manager.master.build import Build
+from manager.master.TestCases.misc.workerStub import WorkerStub
 from typing import Any, Optional, Tuple
 from manager.basic.info import Info
 from manager.basic.observer import Subject
@@ -31,6 +35,22 @@ class VirtualWorker(VirtualMachine):
         await sending(w, propLetter)
 
 
+class VirtualWorker_Compact(VirtualMachine):
+
+    async def run(self) -> None:
+        r, w = await asyncio.open_connection(self._host, self._port)
+
+        self.r = r
+        self.w = w
+
+        propLetter = PropLetter(self._ident, "1", "0", "Merger",
+                                codecs=SUPPORTED_CODECS,
+                                compress=SUPPORTED_COMPRESS)
+        await sending(w, propLetter)
+
+        self.buff.append(await receving(r))
+
+
 class WaitMessgComp(Observer):
 
     def __init__(self) -> None:
@@ -76,7 +96,8 @@ class WorkerRoomTestCases(unittest.IsolatedAsyncioTestCase):
 
     async def asyncSetUp(self) -> None:
         self.wr = WorkerRoom("127.0.0.1", 30002, sInst())
-        self.v_wr1 = VirtualWorker("w1", "127.0.0.1", 30002)
+        self.v_wr1 = VirtualWorker(
+            "w1", "127.0.0.1", 30002)  # type: VirtualMachine
         self.v_wr2 = VirtualWorker("w2", "127.0.0.1", 30002)
 
     async def test_WorkerRoom_Connect(self) -> None:
@@ -93,6 +114,31 @@ class WorkerRoomTestCases(unittest.IsolatedAsyncioTestCase):
         self.assertTrue(self.wr.isExists("w1"))
         self.assertTrue(self.wr.isExists("w2"))
 
+    async def test_WorkerRoom_CodecNegotiate(self) -> None:
+        # Setup
+        self.v_wr1 = VirtualWorker_Compact("w1", "127.0.0.1", 30002)
+
+        # Exercise
+        self.wr.start()
+        await asyncio.sleep(0.1)
+
+        self.v_wr1.start()
+        self.v_wr2.start()
+        await asyncio.sleep(1)
+
+        # Verify
+        w1, w2 = self.wr.getWorker("w1"), self.wr.getWorker("w2")
+        assert(w1 is not None and w2 is not None)
+        self.assertEqual(Letter.CODEC_COMPACT, w1.codec())
+        self.assertEqual(Letter.CODEC_JSON, w2.codec())
+        self.assertEqual(Letter.COMPRESS_ZLIB, w1.compress())
+        self.assertEqual(Letter.COMPRESS_NONE, w2.compress())
+
+        accept = self.v_wr1.buff[0]
+        self.assertIsInstance(accept, CommandLetter)
+        self.assertEqual(Letter.CODEC_COMPACT, accept.content_('codec'))
+        self.assertEqual(Letter.COMPRESS_ZLIB, accept.content_('compress'))
+
     async def test_WorkerRoom_ConnectDup(self) -> None:
         # Setup
         self.v_wr2._ident = "w1"
@@ -158,3 +204,50 @@ class WorkerRoomTestCases(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(comp.conn_msg_count, 2)
         self.assertEqual(comp.wait_msg_count, 2)
         self.assertEqual(comp.remove_msg_count, 2)
+
+    async def test_WorkerRoom_LeastLoaded(self) -> None:
+        # Setup
+        w1 = WorkerStub("w1", Worker.ROLE_NORMAL)
+        w2 = WorkerStub("w2", Worker.ROLE_NORMAL)
+        m = WorkerStub("m", Worker.ROLE_MERGER)
+        for w in [w1, w2, m]:
+            w.setState(Worker.STATE_ONLINE)
+            w.setMax(2)
+            self.wr.addWorker(w)
+
+        def task(tid: str) -> SingleTask:
+            return SingleTask(tid, "SN", "REV",
+                              Build("B", {"cmd": "...", "output": "..."}))
+
+        # Exercise and Verify
+        self.assertEqual([m], self.wr.onlineWorkers(Worker.ROLE_MERGER))
+        self.assertIn(self.wr.leastLoaded(Worker.ROLE_NORMAL), [w1, w2])
+
+        await w1.do(task("T1"))
+        self.assertIs(w2, self.wr.leastLoaded(Worker.ROLE_NORMAL))
+
+        await w2.do(task("T2"))
+        await w2.do(task("T3"))
+        self.assertIs(w1, self.wr.leastLoaded(Worker.ROLE_NORMAL))
+
+        # w1 is full.
+        await w1.do(task("T4"))
+        self.assertIsNone(self.wr.leastLoaded(Worker.ROLE_NORMAL))
+
+        # Capacity of w2 is raised so its load is lower.
+        w2.setMax(4)
+        self.assertIs(w2, self.wr.leastLoaded(Worker.ROLE_NORMAL))
+
+        w1.removeTask("T1")
+        w1.removeTask("T4")
+        self.assertIs(w1, self.wr.leastLoaded(Worker.ROLE_NORMAL))
+
+        w1.setState(Worker.STATE_WAITING)
+        self.assertIs(w2, self.wr.leastLoaded(Worker.ROLE_NORMAL))
+
+        self.wr.removeWorker("w2")
+        self.assertIsNone(self.wr.leastLoaded(Worker.ROLE_NORMAL))
+
+        # Changes of a removed worker not affect the index.
+        w2.removeTask("T2")
+        self.assertIsNone(self.wr.leastLoaded(Worker.ROLE_NORMAL))
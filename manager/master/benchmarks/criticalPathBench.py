@@ -0,0 +1,99 @@
+# MIT License
+#
+# Copyright (c) 2020 Gcom
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# criticalPathBench.py
+#
+# Time until the merge of a BuildSet is able to begin while builds
+# are dispatched in definition order or longest first by durations
+# learned from history. Builds and workers are simulated.
+#
+# Usage: python -m manager.master.benchmarks.criticalPathBench \
+#            [workers] [builds] [runs]
+
+import sys
+import heapq
+import random
+import typing as T
+
+from manager.master.durationModel import DurationModel
+from manager.master.job import Job
+from manager.master.task import SingleTask
+from manager.master.build import Build
+
+
+def merge_begin(durations: T.List[float], workers: int) -> float:
+    """
+    Builds are started in order on the first free worker,
+    the merge begin while all builds are finished.
+    """
+    free = [0.0] * workers
+    end = 0.0
+
+    for d in durations:
+        start = heapq.heappop(free)
+        heapq.heappush(free, start + d)
+        end = max(end, start + d)
+
+    return end
+
+
+def main() -> None:
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    builds = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    runs = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    rand = random.Random(0)
+    job = Job("Job", "BS", {})
+    idents = ["B" + str(i) for i in range(builds)]
+    means = {b: rand.lognormvariate(5, 1) for b in idents}
+
+    def run() -> T.Dict[str, float]:
+        return {b: means[b] * rand.uniform(0.8, 1.2) for b in idents}
+
+    # Learn from history.
+    model = DurationModel()
+    for _ in range(runs):
+        for b, d in run().items():
+            model.observe("BS", b, "W", d)
+
+    tasks = []
+    for b in idents:
+        t = SingleTask("1_" + b, "SN", "REV",
+                       Build(b, {"cmd": "...", "output": "..."}))
+        t.origin = job
+        tasks.append(t)
+    ordered = [t.id()[2:] for t in model.longestFirst(tasks)]
+
+    this = run()
+    in_order = merge_begin([this[b] for b in idents], workers)
+    longest = merge_begin([this[b] for b in ordered], workers)
+    bound = max(max(this.values()), sum(this.values()) / workers)
+
+    print("%-16s %14s" % ("order", "merge at(s)"))
+    print("%-16s %14.1f" % ("definition", in_order))
+    print("%-16s %14.1f" % ("longest first", longest))
+    print("%-16s %14.1f" % ("lower bound", bound))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+# MIT License
+#
+# Copyright (c) 2020 Gcom
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# dispatchBench.py
+#
+# Queue to dispatch latency of tasks in wait while all
+# workers finished their tasks at once, sending to one of
+# the workers can be made slow to see whether it stalls others.
+#
+# Usage: python -m manager.master.benchmarks.dispatchBench \
+#            [workers] [slow send(ms)]
+
+import sys
+import time
+import asyncio
+import typing as T
+
+from manager.basic.info import Info
+from manager.basic.endpoint import Endpoint
+from manager.master.dispatcher import Dispatcher, viaOverhead, theListener
+from manager.master.workerRoom import WorkerRoom
+from manager.master.taskTracker import TaskTracker
+from manager.master.worker import Worker
+from manager.master.task import Task, SingleTask, PostTask
+from manager.master.build import Build
+from manager.master.TestCases.misc.workerStub import WorkerStub
+
+
+BUCKETS = [1, 10, 100, 1000, 10000]
+
+
+class Peer(Endpoint):
+
+    async def handle(self, data: T.Any) -> None:
+        return None
+
+
+class RoomInst:
+    def getModule(self, name: T.Any) -> T.Any:
+        return Info("./manager/master/TestCases/misc/config.yaml")
+
+
+def percentile(samples: T.List[float], p: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+
+def histogram(samples: T.List[float]) -> T.List[int]:
+    counts = [0] * (len(BUCKETS) + 1)
+
+    for s in samples:
+        for i, bound in enumerate(BUCKETS):
+            if s < bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+
+    return counts
+
+
+async def bench(num: int, slow: float = 0) -> T.List[float]:
+    """
+    Latencies in milliseconds of num tasks in wait.
+    """
+    wr = WorkerRoom("127.0.0.1", 30001, RoomInst())
+    dispatcher = Dispatcher()
+    dispatcher.setWorkerRoom(wr)
+    dispatcher.setTaskTracker(TaskTracker())
+    dispatcher.add_worker_search_cond(SingleTask, viaOverhead)
+    dispatcher.add_worker_search_cond(PostTask, theListener)
+    dispatcher.set_peer(Peer())
+
+    workers = []
+    for i in range(num):
+        w = WorkerStub("W" + str(i), Worker.ROLE_NORMAL)
+        w.setState(Worker.STATE_ONLINE)
+        w.max = 1
+        wr.addWorker(w)
+        workers.append(w)
+
+    dispatched = {}  # type: T.Dict[str, float]
+    for w in workers:
+        async def do(task: Task, do=w.do, w=w) -> None:
+            if slow > 0 and w is workers[0]:
+                await asyncio.sleep(slow / 1000)
+            dispatched[task.id()] = time.perf_counter()
+            await do(task)
+        w.do = do  # type: ignore
+
+    dispatcher.start()
+
+    tasks = [SingleTask("T" + str(i), "SN", "REV",
+                        Build("B", {"cmd": "...", "output": "..."}))
+             for i in range(num * 2)]
+    for t in tasks:
+        dispatcher.dispatch(t)
+    while any(w.numOfTaskProc() == 0 for w in workers):
+        await asyncio.sleep(0.01)
+
+    # All workers finished their tasks at once.
+    freed = time.perf_counter()
+    for w in workers:
+        await dispatcher.job_notify_handle(
+            (w.inProcTasks()[0].id(), Task.STATE_FINISHED))
+
+    while len(dispatched) < len(tasks):
+        await asyncio.sleep(0.001)
+
+    # Latency of the slow worker itself is not counted.
+    return [(dispatched[t.id()] - freed) * 1000 for t in tasks[num:]
+            if slow == 0 or t not in workers[0].inProcTasks()]
+
+
+def main() -> None:
+    num = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    slow = float(sys.argv[2]) if len(sys.argv) > 2 else 0
+
+    latencies = asyncio.run(bench(num, slow))
+
+    print("%-10s %12s %12s %12s" % ("tasks", "p50(ms)", "p99(ms)", "max(ms)"))
+    print("%-10d %12.3f %12.3f %12.3f" % (
+        len(latencies), percentile(latencies, 0.5),
+        percentile(latencies, 0.99), max(latencies)))
+
+    print()
+    print("%-10s %12s" % ("<ms", "tasks"))
+    for bound, count in zip(BUCKETS + ["inf"], histogram(latencies)):
+        print("%-10s %12d" % (bound, count))
+
+
+if __name__ == '__main__':
+    main()
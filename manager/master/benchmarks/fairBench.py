@@ -0,0 +1,108 @@
+# MIT License
+#
+# Copyright (c) 2020 Gcom
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# fairBench.py
+#
+# Wait time of small jobs behind a huge BuildSet, tasks in wait are
+# ordered by arrival (FIFO) or by FairSchedule. Workers and tasks are
+# simulated in rounds, each round every worker finish one task.
+#
+# Usage: python -m manager.master.benchmarks.fairBench \
+#            [workers] [nightly tasks] [rounds between small jobs]
+
+import sys
+import typing as T
+
+from collections import deque
+
+from manager.master.dispatcher import FairSchedule
+from manager.master.job import Job
+
+
+class Item:
+
+    def __init__(self, job: Job, arrival: int) -> None:
+        self.origin = job
+        self.arrival = arrival
+
+
+class Fifo:
+
+    def __init__(self) -> None:
+        self._q = deque()  # type: T.Deque[Item]
+
+    def __len__(self) -> int:
+        return len(self._q)
+
+    def push(self, item: Item) -> None:
+        self._q.append(item)
+
+    def pop(self) -> Item:
+        return self._q.popleft()
+
+
+def simulate(queue: T.Any, workers: int, nightly: int,
+             interval: int) -> T.Tuple[T.List[int], float]:
+    """
+    Waits in rounds of small jobs and utilization of workers.
+    """
+    big = Job("Nightly", "BS", {"requester": "ci"})
+    for i in range(nightly):
+        queue.push(Item(big, 0))
+
+    waits = []  # type: T.List[int]
+    busy = rounds = 0
+
+    while len(queue) > 0:
+        if rounds % interval == 0:
+            small = Job("Single" + str(rounds), "B", {"requester": "dev"})
+            queue.push(Item(small, rounds))
+
+        for _ in range(min(workers, len(queue))):
+            item = queue.pop()
+            busy += 1
+            if item.origin is not big:
+                waits.append(rounds - item.arrival)
+
+        rounds += 1
+
+    return waits, busy / (rounds * workers)
+
+
+def main() -> None:
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    nightly = int(sys.argv[2]) if len(sys.argv) > 2 else 600
+    interval = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+
+    print("%-10s %12s %12s %12s" % (
+        "queue", "p50(round)", "max(round)", "utilization"))
+
+    for name, queue in [("fifo", Fifo()), ("fair", FairSchedule(600))]:
+        waits, utilization = simulate(queue, workers, nightly, interval)
+        waits.sort()
+        print("%-10s %12d %12d %12.2f" % (
+            name, waits[len(waits) // 2], waits[-1], utilization))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+# MIT License
+#
+# Copyright (c) 2020 Gcom
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# selectBench.py
+#
+# Cost of choosing the least loaded worker, by scan all
+# workers and by the load index of WorkerRoom.
+#
+# Usage: python -m manager.master.benchmarks.selectBench [workers ...]
+
+import sys
+import time
+import typing as T
+
+from collections import deque
+from manager.basic.info import Info
+from manager.master.dispatcher import viaOverhead, acceptableWorkers, \
+    findNormalWorkers
+from manager.master.workerRoom import WorkerRoom
+from manager.master.worker import Worker
+from manager.master.task import SingleTask
+from manager.master.build import Build
+from manager.master.TestCases.misc.workerStub import WorkerStub
+
+
+ROUNDS = 2000
+
+
+class RoomInst:
+    def getModule(self, name: T.Any) -> T.Any:
+        return Info("./manager/master/TestCases/misc/config.yaml")
+
+
+def scan(workers: T.List[Worker]) -> T.List[Worker]:
+    candidates = findNormalWorkers(acceptableWorkers(workers))
+    if candidates == []:
+        return []
+    return [min(candidates, key=lambda w: w.load())]
+
+
+def bench(num: int) -> T.Tuple[float, float]:
+    """
+    Microseconds per selection of scan and index, each selection
+    is followed by a task assigned to the worker and an early
+    task removed so the index is updated as in dispatching.
+    """
+    wr = WorkerRoom("127.0.0.1", 30001, RoomInst())
+
+    for i in range(num):
+        stub = WorkerStub("W" + str(i), Worker.ROLE_NORMAL)
+        stub.setState(Worker.STATE_ONLINE)
+        stub.setMax(4)
+        wr.addWorker(stub)
+
+    build = Build("B", {"cmd": "...", "output": "..."})
+    tasks = [SingleTask("T" + str(i), "SN", "REV", build)
+             for i in range(ROUNDS)]
+
+    results = []
+    for select in [lambda: scan(wr.getWorkers()), lambda: viaOverhead(wr)]:
+        inProc = deque()  # type: T.Deque[T.Tuple[Worker, str]]
+        start = time.perf_counter()
+
+        for t in tasks:
+            # Keep workers half loaded.
+            if len(inProc) == num * 2:
+                done, tid = inProc.popleft()
+                done.removeTask(tid)
+
+            w = select()[0]
+            w.inProcTask.newTask(t)
+            w._changed()
+            inProc.append((w, t.id()))
+
+        for w, tid in inProc:
+            w.removeTask(tid)
+
+        results.append((time.perf_counter() - start) * 10**6 / ROUNDS)
+
+    return results[0], results[1]
+
+
+def main() -> None:
+    nums = [int(n) for n in sys.argv[1:]] or [100, 500, 2000, 10000]
+
+    print("%-10s %12s %12s" % ("workers", "scan(us)", "index(us)"))
+    for num in nums:
+        scan_us, index_us = bench(num)
+        print("%-10d %12.2f %12.2f" % (num, scan_us, index_us))
+
+
+if __name__ == '__main__':
+    main()
@@ -20,12 +20,14 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import time
+import heapq
 import asyncio
+import itertools
 
-from functools import reduce
 from typing import Any, List, Optional, Callable, \
-    Dict, Tuple, cast, Type
-from collections import namedtuple
+    Dict, Tuple, Hashable, Deque, Iterator, cast, Type
+from collections import namedtuple, deque
 from threading import Condition
 from manager.basic.observer import Subject, Observer
 from manager.basic.mmanager import ModuleDaemon
@@ -34,6 +36,7 @@ from manager.basic.type import Error
 from manager.master.task import Task, SingleTask, PostTask
 from manager.master.taskTracker import TaskTracker
 from manager.master.workerRoom import WorkerRoom
+from manager.master.durationModel import DurationModel
 from manager.basic.endpoint import Endpoint
 
 
@@ -42,6 +45,256 @@ M_NAME = "Dispatcher"
 WaitAreaSpec = namedtuple('WaitAreaSpec', ['task_type', 'pri', 'num'])
 
 
+def share_weight(weight: Optional[str]) -> float:
+    try:
+        w = float(cast(str, weight))
+    except (TypeError, ValueError):
+        return 1.0
+
+    return w if w > 0 else 1.0
+
+
+class Stride:
+    """
+    Stride scheduling among flows, a flow is charged by 1/weight
+    while it's served and flow with minimal pass is served first.
+
+    A flow that become active start from the virtual time
+    so credit is not accumulated while it's idle.
+    """
+
+    def __init__(self) -> None:
+        self._vtime = 0.0
+        self._pass = {}  # type: Dict[Hashable, float]
+        self._entries = {}  # type: Dict[Hashable, Tuple[float, int, Any]]
+        self._heap = []  # type: List[Tuple[float, int, Any]]
+        self._seq = itertools.count()
+
+    def _push(self, key: Hashable) -> None:
+        entry = (self._pass[key], next(self._seq), key)
+        self._entries[key] = entry
+        heapq.heappush(self._heap, entry)
+
+    def activate(self, key: Hashable) -> None:
+        self._pass[key] = max(self._pass.get(key, 0.0), self._vtime)
+        self._push(key)
+
+    def first(self) -> Any:
+        heap = self._heap
+
+        while heap:
+            entry = heap[0]
+            if self._entries.get(entry[2]) is entry:
+                return entry[2]
+            heapq.heappop(heap)
+
+        return None
+
+    def charge(self, key: Hashable, weight: float, active: bool) -> None:
+        first = self.first()
+        if first is not None:
+            self._vtime = max(self._vtime, self._pass[first])
+
+        self._pass[key] += 1 / weight
+
+        if active:
+            self._push(key)
+        else:
+            del self._entries[key]
+
+        # Pass of idle flows that behind virtual time is
+        # useless, it's reset while the flow activate.
+        if len(self._pass) > 2 * len(self._entries) + 64:
+            self._pass = {
+                k: p for k, p in self._pass.items()
+                if k in self._entries or p > self._vtime
+            }
+
+    def isActive(self) -> bool:
+        return len(self._entries) > 0
+
+    def copy(self) -> 'Stride':
+        other = Stride.__new__(Stride)
+        other._vtime = self._vtime
+        other._pass = dict(self._pass)
+        other._entries = dict(self._entries)
+        other._heap = list(self._heap)
+        # Sequence only order entries so it's shared.
+        other._seq = self._seq
+
+        return other
+
+
+class FairSchedule:
+    """
+    Tasks are shared among requesters then among jobs of
+    a requester by weights from info of the job that
+    the task is generated from:
+
+        requester: Who request the job, "" by default.
+        requester_weight: Weight of the requester, 1 by default.
+        weight: Weight of the job, 1 by default.
+
+    A task that wait longer than aging seconds is served before
+    others so small jobs have a bounded wait time.
+    """
+
+    def __init__(self, aging: float) -> None:
+        self._aging = aging
+        self._len = 0
+
+        self._requesters = Stride()
+        self._jobs = {}  # type: Dict[str, Stride]
+        self._weights = {}  # type: Dict[Hashable, float]
+
+        # Tasks of a job in arrival order.
+        self._flows = {}  # type: Dict[Tuple[str, Any], Deque[Tuple]]
+        # Tasks of all jobs in arrival order to find the oldest task.
+        self._arrivals = deque()  # type: Deque[Tuple]
+        self._seq = itertools.count()
+
+        self._next = None  # type: Optional[Tuple[str, Any]]
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[Any]:
+        """
+        Tasks in the order they are going to be served.
+        """
+        schedule = self._copy()
+
+        while len(schedule) > 0:
+            yield schedule.pop()
+
+    def _copy(self) -> 'FairSchedule':
+        other = FairSchedule.__new__(FairSchedule)
+        other._aging = self._aging
+        other._len = self._len
+        other._requesters = self._requesters.copy()
+        other._jobs = {r: s.copy() for r, s in self._jobs.items()}
+        other._weights = dict(self._weights)
+        other._flows = {k: deque(f) for k, f in self._flows.items()}
+        other._arrivals = deque(self._arrivals)
+        other._seq = self._seq
+        other._next = self._next
+
+        return other
+
+    def _classify(self, task: Any) -> Tuple[str, Any]:
+        job = getattr(task, "origin", None)
+        if job is None:
+            requester, rw, jw = "", None, None
+        else:
+            requester = job.get_info("requester") or ""
+            rw = job.get_info("requester_weight")
+            jw = job.get_info("weight")
+
+        self._weights[requester] = share_weight(rw)
+        self._weights[(requester, job)] = share_weight(jw)
+
+        return requester, job
+
+    def push(self, task: Any) -> None:
+        key = self._classify(task)
+        requester, job = key
+
+        if key not in self._flows:
+            self._flows[key] = deque()
+
+            if requester not in self._jobs:
+                self._jobs[requester] = Stride()
+                self._requesters.activate(requester)
+            self._jobs[requester].activate(job)
+
+        item = (time.monotonic(), next(self._seq), task)
+        self._flows[key].append(item)
+        self._arrivals.append((item[0], item[1], key))
+        self._len += 1
+        self._next = None
+
+    def _choose(self) -> Tuple[str, Any]:
+        arrivals = self._arrivals
+
+        # Drop tasks that already served.
+        while arrivals:
+            _, seq, key = arrivals[0]
+            flow = self._flows.get(key)
+            if flow is not None and flow[0][1] == seq:
+                break
+            arrivals.popleft()
+
+        if time.monotonic() - arrivals[0][0] >= self._aging:
+            return arrivals[0][2]
+
+        requester = self._requesters.first()
+        return requester, self._jobs[requester].first()
+
+    def peek(self) -> Any:
+        if self._len == 0:
+            return None
+
+        if self._next is None:
+            self._next = self._choose()
+
+        return self._flows[self._next][0][2]
+
+    def pop(self) -> Any:
+        if self._len == 0:
+            raise IndexError("pop from an empty FairSchedule")
+
+        key = self._next or self._choose()
+        requester, job = key
+        self._next = None
+
+        flow = self._flows[key]
+        _, _, task = flow.popleft()
+        self._len -= 1
+
+        if len(flow) == 0:
+            del self._flows[key]
+
+        jobs = self._jobs[requester]
+        jobs.charge(job, self._weights[key], len(flow) > 0)
+        self._requesters.charge(
+            requester, self._weights[requester], jobs.isActive())
+
+        if not jobs.isActive():
+            del self._jobs[requester]
+            del self._weights[requester]
+        if len(flow) == 0:
+            del self._weights[key]
+
+        return task
+
+
+class FairQueue(asyncio.Queue):
+    """
+    A Queue that tasks are dequeued by weighted fair share
+    of their jobs rather than arrival order.
+    """
+
+    # Seconds that a task is able to wait
+    # before served ahead of fair share.
+    AGING = 600
+
+    def __init__(self, maxsize: int = 0, aging: float = AGING) -> None:
+        self._aging = aging
+        asyncio.Queue.__init__(self, maxsize)
+
+    def _init(self, maxsize: int) -> None:
+        self._queue = FairSchedule(self._aging)
+
+    def _put(self, item: Any) -> None:
+        self._queue.push(item)
+
+    def _get(self) -> Any:
+        return self._queue.pop()
+
+    def peek(self) -> Any:
+        return self._queue.peek()
+
+
 class WaitArea:
 
     class Area_unknown_task(Exception):
@@ -53,12 +306,13 @@ class WaitArea:
     class Area_Empty(Exception):
         pass
 
-    def __init__(self, ident: str, specifics:  List[WaitAreaSpec]) -> None:
+    def __init__(self, ident: str, specifics:  List[WaitAreaSpec],
+                 aging: float = FairQueue.AGING) -> None:
         self.ident = ident
 
         self._space = [
-            (t, asyncio.Queue(num), pri) for t, pri, num in specifics
-        ]  # type: List[Tuple[str, asyncio.Queue, int]]
+            (t, FairQueue(num, aging), pri) for t, pri, num in specifics
+        ]  # type: List[Tuple[str, FairQueue, int]]
 
         # Sort Queues by priority
         self._space.sort(key=lambda t: t[2])
@@ -105,7 +359,7 @@ class WaitArea:
 
         return self._dequeue()
 
-    def dequeue_nowait(self) -> Any:
+    def dequeue_nowait(self, task_type: Optional[str] = None) -> Any:
         with self._cond_no_async:
             cond = self._cond_no_async.wait_for(
                 lambda: self._num_of_tasks > 0,
@@ -115,10 +369,12 @@ class WaitArea:
             if cond is False:
                 raise WaitArea.Area_Empty()
 
-        return self._dequeue()
+        return self._dequeue(task_type)
 
-    def _dequeue(self) -> Any:
-        for _, q, _ in self._space:
+    def _dequeue(self, task_type: Optional[str] = None) -> Any:
+        for t, q, _ in self._space:
+            if task_type is not None and t != task_type:
+                continue
 
             try:
                 task = q.get_nowait()
@@ -128,16 +384,35 @@ class WaitArea:
             except asyncio.QueueEmpty:
                 pass
 
-    def peek(self) -> Any:
+        if task_type is not None:
+            raise WaitArea.Area_Empty()
+
+    def peek(self, task_type: Optional[str] = None) -> Any:
+        """
+        Peek the first task of the area or the first
+        task of task_type if it's specified.
+        """
         if self._num_of_tasks == 0:
             return None
 
-        for _, q, _ in self._space:
-            if len(q._queue) > 0:  # type: ignore
-                return q._queue[0]  # type: ignore
+        for t, q, _ in self._space:
+            if task_type is not None and t != task_type:
+                continue
+
+            if not q.empty():
+                return q.peek()
             else:
                 continue
 
+    def types(self) -> List[str]:
+        """
+        Types of task of the area by priority.
+        """
+        return [t for t, _, _ in self._space]
+
+    def numOfTasks(self) -> int:
+        return self._num_of_tasks
+
     def all(self) -> List[Any]:
         all_content = []
 
@@ -154,6 +429,10 @@ class Dispatcher(ModuleDaemon, Subject, Observer, Endpoint):
     ENDPOINT_DISPATCH = 0
     ENDPOINT_CANCEL = 1
 
+    # Seconds a task wait before dispatched again
+    # after it's failed to send to a worker.
+    RETRY_DELAY = 1
+
     def __init__(self) -> None:
         global M_NAME
 
@@ -171,14 +450,16 @@ class Dispatcher(ModuleDaemon, Subject, Observer, Endpoint):
         # A queue contain a collection of tasks
         self._waitArea = WaitArea("Area", [
             WaitAreaSpec("PostTask", 0, 128),
-            WaitAreaSpec("SingleTask", 1, 128)
+            WaitAreaSpec("SingleTask", 1, 1024)
         ])
 
-        # An Event to indicate that there is some task in taskWait queue
+        # An Event to wake up dispatching, it's set while a task
+        # is in wait or capacity of workers is available.
         self.taskEvent = asyncio.Event()
         self.dispatchLock = asyncio.Lock()
         self._taskTracker = None  # type: Optional[TaskTracker]
         self._workers = None  # type: Optional[WorkerRoom]
+        self._durations = DurationModel()
         self._loop = asyncio.get_running_loop()
         self._search_cond = {}  # type: Dict[str, Callable]
 
@@ -194,13 +475,20 @@ class Dispatcher(ModuleDaemon, Subject, Observer, Endpoint):
     def setTaskTracker(self, tt: TaskTracker) -> None:
         self._taskTracker = tt
 
+    def setDurationModel(self, model: DurationModel) -> None:
+        self._durations = model
+
+    def durationModel(self) -> DurationModel:
+        return self._durations
+
     async def _log(self, msg: str) -> None:
         await self.notify(Dispatcher.NOTIFY_LOG, ("dispatcher", msg))
 
     # Dispatch a task to a worker of
     # all by overhead of workers
     #
-    # return True if task is assign successful otherwise return False
+    # return True if task is assign successful or is going to be
+    # retried after failed to send otherwise return False
     async def _dispatch(self, task: Task) -> bool:
         return await self._do_dispatch(task)
 
@@ -210,7 +498,8 @@ class Dispatcher(ModuleDaemon, Subject, Observer, Endpoint):
         if found then assign task to the worker
         and _tasks otherwise append to taskWait
         """
-        worker = self._search_proc_worker(task)
+        async with self.dispatchLock:
+            worker = self._assign(task)
 
         # No workers satisfiy the condition.
         if worker is None:
@@ -218,9 +507,32 @@ class Dispatcher(ModuleDaemon, Subject, Observer, Endpoint):
                             " dispatch failed: No available worker")
             return False
 
+        if not await self._send(task, worker):
+            self._loop.create_task(self._retry(task))
+
+        return True
+
+    def _assign(self, task: Task) -> Optional[Worker]:
+        """
+        Choose a worker for the task and reserve capacity
+        of the worker, the reservation is released by _send().
+        """
+        worker = self._search_proc_worker(task)
+        if worker is not None:
+            worker.reserve()
+
+        return worker
+
+    async def _send(self, task: Task, worker: Worker) -> bool:
+        """
+        Send the task to the worker it assigned to, sends are
+        done out of dispatchLock so a slow worker not block
+        tasks that assigned to others.
+        """
         try:
             await worker.do(task)
             cast(TaskTracker, self._taskTracker).onWorker(task.id(), worker)
+            self._durations.begin(task, worker.ident)
             await self._log(
                 "Task " + task.id() + " dispatch to Worker("
                 + worker.ident + ")"
@@ -230,6 +542,8 @@ class Dispatcher(ModuleDaemon, Subject, Observer, Endpoint):
                 "Task " + task.id() + " dispatch failed: Worker is\
                 unable to do the task.")
             return False
+        finally:
+            worker.release()
 
         return True
 
@@ -239,8 +553,7 @@ class Dispatcher(ModuleDaemon, Subject, Observer, Endpoint):
             return None
 
         cond = self._search_cond[idx]
-        workers = cast(WorkerRoom, self._workers)\
-            .getWorkerWithCond_nosync(cond)
+        workers = cond(cast(WorkerRoom, self._workers))
         if workers == []:
             return None
         else:
@@ -264,13 +577,20 @@ class Dispatcher(ModuleDaemon, Subject, Observer, Endpoint):
         """
         await self._log("Dispatch task " + task.id())
 
-        async with self.dispatchLock:
-            if await self._dispatch(task) is False:
-                # fixme: Queue may full while inserting
-                await self._waitArea.enqueue(task)
-                self.taskEvent.set()
+        # Tasks of the same type in wait means that workers are busy,
+        # the task wait with them so it's dispatched by fair share.
+        if self._waitArea.peek(type(task).__name__) is None:
+            success = await self._dispatch(task)
+        else:
+            success = False
+
+        if not success:
+            # Wait area may be full, wait for space outside of
+            # dispatchLock so tasks in wait are able to dispatch.
+            await self._waitArea.enqueue(task)
+            self.wakeup()
 
-            return True
+        return True
 
     def dispatch(self, task: Task) -> None:
         # Task is already in process increase task's refs.
@@ -301,11 +621,11 @@ class Dispatcher(ModuleDaemon, Subject, Observer, Endpoint):
             cast(TaskTracker, self._taskTracker).untrack(task.id())
             return False
 
-        async with self.dispatchLock:
-            success = await self._do_dispatch(task)
-            if not success:
-                await self._waitArea.enqueue(task)
-                self.taskEvent.set()
+        success = await self._do_dispatch(task)
+
+        if not success:
+            await self._waitArea.enqueue(task)
+            self.wakeup()
 
         return True
 
@@ -316,48 +636,82 @@ class Dispatcher(ModuleDaemon, Subject, Observer, Endpoint):
 
         self._loop.create_task(self._dispatching())
 
-    def _peek_trimUntrackTask(self, area: WaitArea) -> Any:
+    def _peek_trimUntrackTask(self, area: WaitArea,
+                              task_type: Optional[str] = None) -> Any:
         while True:
-            task_peek = area.peek()
+            task_peek = area.peek(task_type)
             if task_peek is None:
                 return None
             else:
                 ident = task_peek.id()
                 if not cast(TaskTracker, self._taskTracker).isInTrack(ident):
                     # Drop untracked task
-                    area.dequeue_nowait()
+                    area.dequeue_nowait(type(task_peek).__name__)
                     continue
                 else:
                     return task_peek
 
+    def wakeup(self) -> None:
+        """
+        Wake up dispatching to dispatch tasks in wait.
+        """
+        self.taskEvent.set()
+
     # Dispatcher thread that is respond to assign task
     # in queue which name is taskWait
     async def _dispatching(self) -> None:
 
         while True:
-            await asyncio.sleep(1)
+            # Wake up while a task is in wait or capacity
+            # of workers is available.
+            await self.taskEvent.wait()
+            self.taskEvent.clear()
 
-            if self.taskEvent.is_set():
-                task_peek = self._peek_trimUntrackTask(self._waitArea)
-                if task_peek is None:
-                    self.taskEvent.clear()
-                    continue
+            await self._drain()
+
+    async def _drain(self) -> None:
+        """
+        Dispatch tasks in wait until there is no capacity for them,
+        tasks of a type that no worker able to accept not block
+        tasks of other types.
 
-                # To check that is a worker available.
-                cond = condChooser[type(task_peek).__name__]
-                if cast(WorkerRoom, self._workers).\
-                   getWorkerWithCond(cond) == []:
+        Tasks are assigned under dispatchLock then sent to
+        workers concurrently, dispatching not wait for the sends
+        so a slow worker not delay next drain.
+        """
+        batch = []  # type: List[Tuple[Task, Worker]]
 
-                    continue
+        async with self.dispatchLock:
+            for task_type in self._waitArea.types():
+                while True:
+                    task_peek = self._peek_trimUntrackTask(
+                        self._waitArea, task_type)
+                    if task_peek is None:
+                        break
 
-                # Dispatch task to worker
-                async with self.dispatchLock:
-                    current = self._waitArea.dequeue_nowait()
-                    success = await self._dispatch(current)
-                    if not success:
-                        await self._waitArea.enqueue(current)
-            else:
-                continue
+                    worker = self._assign(task_peek)
+                    if worker is None:
+                        break
+
+                    self._waitArea.dequeue_nowait(task_type)
+                    batch.append((task_peek, worker))
+
+        for task, worker in batch:
+            self._loop.create_task(self._send_or_wait(task, worker))
+
+    async def _send_or_wait(self, task: Task, worker: Worker) -> None:
+        if not await self._send(task, worker):
+            await self._retry(task)
+
+    async def _retry(self, task: Task) -> None:
+        """
+        Failed task back to wait after RETRY_DELAY, the worker
+        that failed to accept it is likely to be chosen again
+        so it's not retried immediately.
+        """
+        await asyncio.sleep(self.RETRY_DELAY)
+        await self._waitArea.enqueue(task)
+        self.wakeup()
 
     async def cancel(self, taskId: str) -> None:
         """
@@ -377,6 +731,7 @@ class Dispatcher(ModuleDaemon, Subject, Observer, Endpoint):
 
         task.stateChange(Task.STATE_FAILURE)
         cast(TaskTracker, self._taskTracker).untrack(task.id())
+        self._durations.abort(task.id())
         await self._log("Cancel task " + task.id())
 
     # Cancel all tasks processing on a worker
@@ -479,6 +834,17 @@ class Dispatcher(ModuleDaemon, Subject, Observer, Endpoint):
                     Task.STATE_STR_MAPPING[Task.STATE_FAILURE]
                 ))
 
+    async def worker_notify_handle(self, worker: Worker) -> None:
+        """
+        An handler of notifies from WorkerRoom, tasks in wait
+        are dispatched to a worker that connected and tasks of
+        a worker that lost are redispatched.
+        """
+        if worker.isOnline():
+            self.wakeup()
+        else:
+            await self.workerLost_redispatch(worker)
+
     async def job_notify_handle(self, data: Any) -> None:
         """
         An handler to notify task state to JobMaster while
@@ -494,9 +860,18 @@ class Dispatcher(ModuleDaemon, Subject, Observer, Endpoint):
             assert(worker is not None)
             worker.removeTask(taskid)
 
+            task = self._taskTracker.getTask(taskid)
+            if state == Task.STATE_FINISHED and task is not None:
+                self._durations.finish(task)
+            else:
+                self._durations.abort(taskid)
+
             # Untrack the task
             self._taskTracker.untrack(taskid)
 
+            # Capacity of the worker is available.
+            self.wakeup()
+
         await self.peer_notify((taskid, Task.STATE_STR_MAPPING[state]))
 
     async def handle(self, data: Any) -> None:
@@ -513,23 +888,13 @@ class Dispatcher(ModuleDaemon, Subject, Observer, Endpoint):
 # Misc
 # Method to get an online worker which
 # with lowest overhead of all online workerd
-def viaOverhead(workers: List[Worker]) -> List[Worker]:
-    # Filter out workers which is not in online status or not able to accept
-    onlineWorkers = acceptableWorkers(workers)
-
-    if onlineWorkers == []:
+def viaOverhead(workers: WorkerRoom) -> List[Worker]:
+    # WorkerRoom keep acceptable workers indexed
+    # by load so no need to scan all of workers.
+    theWorker = workers.leastLoaded(Worker.ROLE_NORMAL)
+    if theWorker is None:
         return []
 
-    # Find out the worker with lowest overhead on a
-    # collection of online acceptable workers
-    normal_workers = findNormalWorkers(onlineWorkers)
-    if normal_workers == []:
-        return []
-
-    def f(acc, w):
-        return acc if acc.numOfTaskProc() <= w.numOfTaskProc() else w
-    theWorker = reduce(f, normal_workers)
-
     return [theWorker]
 
 
@@ -543,11 +908,8 @@ def acceptableWorkers(workers: List[Worker]) -> List[Worker]:
     return list(filter(lambda w: f_online_acceptable(w), workers))
 
 
-def theListener(workers: List[Worker]) -> List[Worker]:
-    return [
-        w for w in workers
-        if w.isOnline() and w._role == Worker.ROLE_MERGER
-    ]
+def theListener(workers: WorkerRoom) -> List[Worker]:
+    return workers.onlineWorkers(Worker.ROLE_MERGER)
 
 
 condChooser = {
@@ -0,0 +1,195 @@
+# MIT License
+#
+# Copyright (c) 2020 Gcom
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# durationModel.py
+#
+# Durations of tasks predicted from history of their builds,
+# estimates are kept per (cmd_id, build ident, worker) and
+# per (cmd_id, build ident) for tasks not yet on a worker.
+
+import time
+
+from typing import Optional, Dict, List, Tuple, Sequence
+
+from manager.master.task import Task, PostTask
+
+
+DurationKey = Tuple[str, str, Optional[str]]
+
+
+class Estimate:
+    """
+    EWMA of durations of a build.
+    """
+
+    ALPHA = 0.3
+
+    def __init__(self) -> None:
+        self.mean = None  # type: Optional[float]
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        if self.mean is None:
+            self.mean = seconds
+        else:
+            self.mean += self.ALPHA * (seconds - self.mean)
+
+        self.count += 1
+
+
+class DurationModel:
+    """
+    Learn durations of tasks from their state transitions,
+    begin() while a task is sent to a worker and finish()
+    while the task is finished.
+    """
+
+    # Ident of merge step of all jobs.
+    MERGE = "<merge>"
+
+    def __init__(self) -> None:
+        self._estimates = {}  # type: Dict[DurationKey, Estimate]
+
+        # Tasks that in processing:
+        #   task id -> (begin time, worker ident)
+        self._running = {}  # type: Dict[str, Tuple[float, str]]
+
+    @staticmethod
+    def keyOf(task: Task) -> Tuple[str, str]:
+        """
+        (cmd_id, build ident) of a task, cmd_id is command of the
+        job that the task is generated from and the prefix of task
+        id is ident of the job so it's trimmed.
+        """
+        cmd_id = task.origin.cmd_id if task.origin is not None else ""
+
+        if isinstance(task, PostTask):
+            return cmd_id, DurationModel.MERGE
+
+        tid = task.id()
+        return cmd_id, tid[tid.find("_")+1:]
+
+    def observe(self, cmd_id: str, ident: str,
+                worker: str, seconds: float) -> None:
+        keys = [(cmd_id, ident, worker),
+                (cmd_id, ident, None)]  # type: List[DurationKey]
+
+        for key in keys:
+            if key not in self._estimates:
+                self._estimates[key] = Estimate()
+            self._estimates[key].observe(seconds)
+
+    def estimate(self, cmd_id: str, ident: str,
+                 worker: Optional[str] = None) -> Optional[Estimate]:
+        """
+        Estimate of the build on the worker, estimate of the
+        build on all workers if the worker has no history of it.
+        """
+        key = (cmd_id, ident, worker)  # type: DurationKey
+        if key not in self._estimates:
+            key = (cmd_id, ident, None)
+
+        return self._estimates.get(key, None)
+
+    def predict(self, task: Task) -> Optional[float]:
+        running = self._running.get(task.id(), None)
+        worker = running[1] if running is not None else None
+
+        estimate = self.estimate(*self.keyOf(task), worker)
+        if estimate is None:
+            return None
+
+        return estimate.mean
+
+    def begin(self, task: Task, worker: str) -> None:
+        self._running[task.id()] = (time.monotonic(), worker)
+
+    def finish(self, task: Task) -> Optional[float]:
+        """
+        Learn from a finished task, the worker and seconds
+        it taken are recorded into the task.
+        """
+        running = self._running.pop(task.id(), None)
+        if running is None:
+            return None
+
+        begin, worker = running
+        seconds = time.monotonic() - begin
+
+        task.procWorker, task.procTime = worker, seconds
+        self.observe(*self.keyOf(task), worker, seconds)
+
+        return seconds
+
+    def abort(self, tid: str) -> None:
+        self._running.pop(tid, None)
+
+    def remaining(self, task: Task) -> Optional[float]:
+        """
+        Seconds to finish the task, None if the build
+        has no history.
+        """
+        if task.isFinished():
+            return 0
+
+        predict = self.predict(task)
+        if predict is None:
+            return None
+
+        running = self._running.get(task.id(), None)
+        if running is None:
+            return predict
+
+        return max(0, predict - (time.monotonic() - running[0]))
+
+    def timeToFinish(self, tasks: List[Task]) -> Optional[float]:
+        """
+        Seconds to finish tasks of a job, builds of the job are
+        processed in parallel then merged. Waiting for workers
+        is not counted.
+        """
+        builds, merge = 0.0, 0.0
+
+        for t in tasks:
+            remaining = self.remaining(t)
+            if remaining is None:
+                return None
+
+            if isinstance(t, PostTask):
+                merge = remaining
+            else:
+                builds = max(builds, remaining)
+
+        return builds + merge
+
+    def longestFirst(self, tasks: Sequence[Task]) -> List[Task]:
+        """
+        Order tasks by predicted duration, the longest is the
+        first, tasks without history are in front of them cause
+        they may be the longest.
+        """
+        def key(t: Task) -> float:
+            predict = self.predict(t)
+            return -(predict if predict is not None else float("inf"))
+
+        return sorted(tasks, key=key)
@@ -29,13 +29,14 @@ import concurrent.futures
 import os
 import zipfile
 import shutil
+import tempfile
 import manager.master.configs as cfg
 from VerManager.settings import DATA_URL
 from manager.master.docGen import log_gen
 from manager.master.exceptions import DOC_GEN_FAILED_TO_GENERATE
 
 from typing import List, Dict, Optional, cast, Callable, Tuple, \
-    Any
+    Any, BinaryIO
 from collections import namedtuple
 
 from manager.master.eventListener \
@@ -43,7 +44,8 @@ from manager.master.eventListener \
 
 from manager.basic.type import Error
 from manager.basic.letter import Letter, \
-    ResponseLetter, BinaryLetter, NotifyLetter
+    ResponseLetter, BinaryLetter, NotifyLetter, BinaryStreamLetter, \
+    STREAM_CHECKSUM_MISMATCH
 
 from manager.master.task import Task, SingleTask, PostTask
 from manager.master.dispatcher import Dispatcher
@@ -59,6 +61,8 @@ from manager.basic.storage import M_NAME as STORAGE_M_NAME
 from manager.basic.util import pathSeperator
 from manager.basic.notify import Notify, WSCNotify
 from manager.basic.dataLink import DataLink, DataLinkNotify
+from manager.basic.transfer import TransferTable
+from manager.basic.delta import signature, block_size, patch
 
 ActionInfo = namedtuple('ActionInfo', 'isMatch execute args')
 path = str
@@ -69,6 +73,14 @@ class EVENT_HANDLER_TOOLS:
     ProcessPool = concurrent.futures.ProcessPoolExecutor()
     chooserSet = {}  # type: Dict[str, StoChooser]
     transfer_finished = {}  # type: Dict[str, path]
+    transferSessions = TransferTable()
+
+    # Digest of the last artifact of each build, delta of next
+    # artifact of the build is transfered against it.
+    artifacts = {}  # type: Dict[str, str]
+    # Signatures of the bases recently used.
+    signatures = {}  # type: Dict[Tuple[str, int], bytes]
+    SIGNATURE_CACHE_SIZE = 8
 
     PREPARE_ACTIONS = []  # type: List[ActionInfo]
     IN_PROC_ACTIONS = []  # type: List[ActionInfo]
@@ -236,12 +248,11 @@ async def temporaryBuild_handling(
 
     logger = env.modules.getModule('Logger')
 
-    chooserSet = EVENT_HANDLER_TOOLS.chooserSet
+    trans_fin = EVENT_HANDLER_TOOLS.transfer_finished
     seperator = pathSeperator()
     taskId = task.id()
 
-    chooser = chooserSet[taskId]
-    filePath = chooser.path()
+    filePath = trans_fin[taskId]
     fileName = filePath.split(seperator)[-1]
 
     try:
@@ -300,27 +311,31 @@ async def binaryHandler(dl: DataLink, letter: BinaryLetter,
                         env: Entry.EntryEnv) -> None:
     chooserSet = EVENT_HANDLER_TOOLS.chooserSet
 
+    if isinstance(letter, BinaryStreamLetter):
+        return await binaryStreamHandler(dl, letter, env)
+
     if not isinstance(letter, BinaryLetter):
         return None
 
     tid = letter.getHeader('tid')
     unique_id = tid.split("_")[0]
 
-    # A new file is transfered.
-    if unique_id not in chooserSet:
+    # A new file is transfered, choosers are keyed by tid
+    # so files of tasks of a job are not interleaved.
+    if tid not in chooserSet:
         fileName = letter.getFileName()
 
         sto = env.modules.getModule(STORAGE_M_NAME)
         chooser = sto.create(unique_id, fileName)
-        chooserSet[unique_id] = chooser
+        chooserSet[tid] = chooser
 
-    chooser = chooserSet[unique_id]
+    chooser = chooserSet[tid]
     content = letter.getContent('bytes')
 
     if content == b"":
         # A file is transfer finished.
         chooser.close()
-        del chooserSet[unique_id]
+        del chooserSet[tid]
 
         # Notify To DataLinker a file is transfered finished.
         dl.notify(DataLinkNotify("BINARY", (tid, chooser.path())))
@@ -328,6 +343,156 @@ async def binaryHandler(dl: DataLink, letter: BinaryLetter,
         chooser.store(content)
 
 
+async def binaryStreamHandler(dl: DataLink, letter: BinaryStreamLetter,
+                              env: Entry.EntryEnv) -> None:
+    """
+    Write content of a file that follow the letter into Storage,
+    an interrupted transfer is resumed by the next letter of it.
+    """
+    tid = letter.getTid()
+    unique_id = tid.split("_")[0]
+
+    if letter.isQuery():
+        return await binaryQueryHandler(dl, letter, env)
+    if letter.isDelta():
+        return await binaryDeltaHandler(dl, letter, env)
+    if letter.isRange() and dl.isReusePort():
+        # Ranges of a file may arrive at different processes
+        # which not share sessions of transfers.
+        return await letter.refuse()
+
+    def open_() -> Tuple[BinaryIO, str]:
+        # File is written through chooser so it's content
+        # is deduplicated by Storage after closed.
+        sto = env.modules.getModule(STORAGE_M_NAME)
+        chooser = sto.create(unique_id, letter.getFileName())
+        return cast(BinaryIO, chooser), chooser.path()
+
+    # Sessions of transfers are not shared by processes,
+    # a resumed transfer may arrive at another process.
+    session = await EVENT_HANDLER_TOOLS.transferSessions.receive(
+        letter, open_, not dl.isReusePort())
+    if session is None:
+        # Other ranges of the file are in transfer.
+        return
+
+    artifact_record(env, tid, letter.getFileName())
+
+    # Notify To DataLinker a file is transfered finished.
+    dl.notify(DataLinkNotify("BINARY", (tid, session.path)))
+
+
+def build_ident(tid: str) -> str:
+    # Tid of a task is it's build ident prefixed
+    # by unique id of the job.
+    return tid[tid.find("_")+1:]
+
+
+def artifact_record(env: Entry.EntryEnv, tid: str, fileName: str) -> None:
+    sto = env.modules.getModule(STORAGE_M_NAME)
+
+    digest = sto.hashOf(tid.split("_")[0], fileName)
+    if digest is not None:
+        EVENT_HANDLER_TOOLS.artifacts[build_ident(tid)] = digest
+
+
+async def artifact_signature(base: str, path: str, size: int) -> bytes:
+    signatures = EVENT_HANDLER_TOOLS.signatures
+    key = (base, block_size(size))
+
+    if key not in signatures:
+        sig = await asyncio.get_running_loop().run_in_executor(
+            None, signature, path, key[1])
+
+        if len(signatures) >= EVENT_HANDLER_TOOLS.SIGNATURE_CACHE_SIZE:
+            del signatures[next(iter(signatures))]
+        signatures[key] = sig
+
+    return signatures[key]
+
+
+async def binaryQueryHandler(dl: DataLink, letter: BinaryStreamLetter,
+                             env: Entry.EntryEnv) -> None:
+    """
+    File that Storage already have is referenced
+    instead of transfered again.
+    """
+    tid = letter.getTid()
+    unique_id = tid.split("_")[0]
+
+    sto = env.modules.getModule(STORAGE_M_NAME)
+
+    path = None
+    if sto.hasBlob(letter.getChecksum(), letter.getSize()):
+        path = sto.link(letter.getChecksum(), unique_id,
+                        letter.getFileName())
+
+    if path is None and letter.acceptDelta():
+        # Sender is able to send delta against last
+        # artifact of the build.
+        base = EVENT_HANDLER_TOOLS.artifacts.get(build_ident(tid), None)
+        basePath = None if base is None else sto.blobPath(base)
+
+        if basePath is not None:
+            sig = await artifact_signature(
+                cast(str, base), basePath, letter.getSize())
+            await letter.answerDelta(cast(str, base), sig)
+            return
+
+    await letter.answer(path is not None)
+
+    if path is not None:
+        artifact_record(env, tid, letter.getFileName())
+        dl.notify(DataLinkNotify("BINARY", (tid, path)))
+
+
+async def binaryDeltaHandler(dl: DataLink, letter: BinaryStreamLetter,
+                             env: Entry.EntryEnv) -> None:
+    """
+    Rebuild a file from base in Storage and delta that
+    follow the letter, sender transfer the whole file if
+    the file is not rebuilt.
+    """
+    tid = letter.getTid()
+    unique_id = tid.split("_")[0]
+    fileName = letter.getFileName()
+
+    sto = env.modules.getModule(STORAGE_M_NAME)
+    ok = False
+
+    # Delta is small, it's not resumed.
+    await letter.resumeAt(0)
+
+    with tempfile.TemporaryFile() as spool:
+        async for chunk in letter.chunks():
+            spool.write(chunk)
+        spool.seek(0)
+
+        base = sto.blobPath(cast(str, letter.getBase()))
+        if base is not None:
+            chooser = sto.create(unique_id, fileName)
+            try:
+                checksum = await asyncio.get_running_loop() \
+                    .run_in_executor(None, patch, base, spool, chooser)
+                ok = checksum == letter.getChecksum()
+            except Exception:
+                traceback.print_exc()
+            finally:
+                chooser.close()
+
+            if not ok:
+                sto.delete(unique_id, fileName)
+
+    await letter.confirm(ok)
+
+    if not ok:
+        raise STREAM_CHECKSUM_MISMATCH(tid)
+
+    artifact_record(env, tid, fileName)
+    dl.notify(DataLinkNotify("BINARY", (tid, sto.getFile(
+        unique_id, fileName).path())))
+
+
 def binaryNotify(msg: Tuple[str, str], arg: Any) -> None:
     tid, path = msg[0], msg[1]
     transfered = EVENT_HANDLER_TOOLS.transfer_finished
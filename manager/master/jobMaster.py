@@ -37,11 +37,12 @@ from manager.basic.endpoint import Endpoint
 from channels.layers import get_channel_layer
 from channels.db import database_sync_to_async
 from manager.master.job import VerResult
+from manager.master.durationModel import DurationModel
 from manager.basic.mmanager import Module
 
 from client.messages import JobInfoMessage, JobStateChangeMessage, \
     JobFinMessage, JobFailMessage, JobBatchMessage, JobHistoryMessage, \
-    JobAllResultsMessage, JobNewResultMessage
+    JobAllResultsMessage, JobNewResultMessage, JobPredictionMessage
 
 from manager.master.msgCell import MsgSource
 from client.messages import Message
@@ -118,9 +119,24 @@ def job_to_jobInfoMsg(job: Job) -> JobInfoMessage:
     return JobInfoMessage(str(job.unique_id), job.jobid, task)
 
 
+def job_to_predictionMsg(job: Job,
+                         model: DurationModel) -> JobPredictionMessage:
+    def seconds(s: Optional[float]) -> float:
+        return -1 if s is None else round(s, 1)
+
+    tasks = {
+        cast(str, task_prefix_trim(t.id())): seconds(model.remaining(t))
+        for t in job.tasks()
+    }
+    ttf = seconds(model.timeToFinish(job.tasks()))
+
+    return JobPredictionMessage(str(job.unique_id), job.jobid, ttf, tasks)
+
+
 class JobMasterMsgSrc(MsgSource):
 
     jobs = None  # type: Optional[Dict[str, Job]]
+    durations = None  # type: Optional[DurationModel]
 
     async def gen_msg(self, args: List[str] = None) -> Optional[Message]:
 
@@ -144,6 +160,18 @@ class JobMasterMsgSrc(MsgSource):
 
         return JobBatchMessage(msgs)
 
+    async def query_prediction(self, args: List[str]) -> Optional[Message]:
+        """
+        Predicted seconds to finish jobs in processing.
+        """
+        if self.durations is None:
+            return None
+
+        return JobBatchMessage([
+            job_to_predictionMsg(job, self.durations)
+            for job in self.jobs.values()  # type: ignore
+        ])
+
     async def query_history(self, *args) -> Optional[Message]:
         jobs = []  # type: List[Job]
 
@@ -208,16 +236,49 @@ class JobMaster(Endpoint, Module):
         self.source = JobMasterMsgSrc(self.M_NAME)
         self.source.jobs = self._jobs
 
+        self._durations = DurationModel()
+        self.source.durations = self._durations
+
         # Lock to prevent race conditon of
         # unique id access.
         self._lock = asyncio.Lock()
 
     async def begin(self) -> None:
-        return
+        await self._durations_recovery()
 
     async def cleanup(self) -> None:
         return
 
+    def setDurationModel(self, model: DurationModel) -> None:
+        self._durations = model
+        self.source.durations = model
+
+    async def _durations_recovery(self) -> None:
+        """
+        Learn durations of builds from history of tasks.
+        """
+        try:
+            tasks = await database_sync_to_async(
+                TaskHistory.objects.filter
+            )(duration__gt=0)
+
+            tasks = await database_sync_to_async(
+                tasks.select_related("jobhistory").order_by
+            )("jobhistory__dateTime")
+
+            task_list = await database_sync_to_async(
+                list
+            )(tasks)
+        except Exception:
+            traceback.print_exc()
+            return
+
+        for t in task_list:
+            job = t.jobhistory
+            ident = DurationModel.MERGE if t.task_name == job.job \
+                else t.task_name
+            self._durations.observe(job.cmdid, ident, t.worker, t.duration)
+
     async def _job_record(self, job: Job) -> None:
         # Job record
         job_db = await database_sync_to_async(
@@ -288,8 +349,9 @@ class JobMaster(Endpoint, Module):
         self.bind(job)
 
         # Assign job to another module typically
-        # is Dispatcher.
-        for task in job.tasks():
+        # is Dispatcher. The longest builds are the first
+        # so the merge of the job is able to begin sooner.
+        for task in self._durations.longestFirst(job.tasks()):
             await self.peer_notify((Dispatcher.ENDPOINT_DISPATCH, task))
 
         job.state = Job.STATE_IN_PROCESSING
@@ -415,7 +477,7 @@ class JobMaster(Endpoint, Module):
                 needPost='true',
                 extra={}
             )
-            st.job = job
+            st.job = st.origin = job
             job.addTask(build.getIdent(), st)
 
         # Build PostTask
@@ -431,7 +493,7 @@ class JobMaster(Endpoint, Module):
             st_idents,
             merge_command
         )
-        pt.job = job
+        pt.job = pt.origin = job
         job.addTask(job.jobid, pt)
 
     def _bind_build(self, job: Job, cmd: Dict) -> None:
@@ -447,6 +509,7 @@ class JobMaster(Endpoint, Module):
                         revision=sn,
                         build=build,
                         extra={})
+        st.origin = job
         job.addTask(build.getIdent(), st)
 
     def exists(self, jobid: str) -> bool:
@@ -464,6 +527,7 @@ class JobMaster(Endpoint, Module):
         jobHistory = JobHistory(
             unique_id=job.unique_id,
             job=job.jobid,
+            cmdid=job.cmd_id,
             filePath=filePath
         )
 
@@ -475,7 +539,9 @@ class JobMaster(Endpoint, Module):
             taskHistory = TaskHistory(
                 jobhistory=jobHistory,
                 task_name=task_prefix_trim(task.id()),
-                state=task.taskState()
+                state=task.taskState(),
+                worker=task.procWorker,
+                duration=task.procTime or 0
             )
             await database_sync_to_async(
                 taskHistory.save
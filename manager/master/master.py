@@ -129,6 +129,7 @@ class ServerInst(Thread):
         dispatcher.add_worker_search_cond(PostTask, theListener)
         # Set as peer of JobMaster
         jobMaster.set_peer(dispatcher)
+        jobMaster.setDurationModel(dispatcher.durationModel())
 
         self.addModule(dispatcher)
 
@@ -162,6 +163,7 @@ class ServerInst(Thread):
         eventListener.subscribe(EventListener.NOTIFY_LOST, workerRoom)
         workerRoom.subscribe(WorkerRoom.NOTIFY_CONN, eventListener)
         workerRoom.subscribe(WorkerRoom.NOTIFY_DISCONN, dispatcher)
+        workerRoom.subscribe(WorkerRoom.NOTIFY_CONN, dispatcher)
 
         workerRoom.subscribe(WorkerRoom.NOTIFY_LOG, logger)
         eventListener.subscribe(EventListener.NOTIFY_LOG, logger)
@@ -181,7 +183,7 @@ class ServerInst(Thread):
 
         # Install observer handlers to Dispatcher
         async def handler_dispatcher(data):
-            await dispatcher.workerLost_redispatch(data)
+            await dispatcher.worker_notify_handle(data)
         dispatcher.handler_install(WR_M_NAME, handler_dispatcher)
         dispatcher.handler_install(EVENT_M_NAME, dispatcher.job_notify_handle)
 
@@ -191,12 +193,14 @@ class ServerInst(Thread):
 
         # DataLink Init
         dataPort = info.getConfig('dataPort')
+        dataLinkProcs = info.getConfig('dataLinkProcs')
         dataLinker = DataLinker()
 
         # Add a TCP DataLink used to transfer big binaryFile
         dataLinker.addDataLink(
             self._address, dataPort, DataLink.TCP_DATALINK,
-            binaryHandler, env)
+            binaryHandler, env,
+            1 if dataLinkProcs == "" else int(dataLinkProcs))
         dataLinker.addNotify("BINARY", binaryNotify, None)
 
         self._mmanager.addModule(dataLinker)
@@ -132,6 +132,15 @@ class Task(TaskBase):
         # the task belong to.
         self.job = None  # type: Any
 
+        # Job that the task is generated from, unlike job
+        # it's set for tasks of all kinds of jobs.
+        self.origin = None  # type: Any
+
+        # Worker that processed the task and seconds it
+        # taken, they are set while the task is finished.
+        self.procWorker = ""
+        self.procTime = None  # type: Optional[float]
+
     def getType(self) -> TaskType:
         return self.type
 
@@ -36,6 +36,7 @@ from datetime import datetime
 from manager.basic.letter import Letter, receving as letter_receving, \
     sending as letter_sending
 from manager.basic.commands import Command
+from manager.basic.sendQueue import SendQueue
 
 
 WorkerState = int
@@ -65,10 +66,23 @@ class Worker:
 
         self._reader = reader
         self._writer = writer
+        self._sendQ = SendQueue(writer)
         self.address = "0.0.0.0"
 
-        self.max = 0
+        # Codec used to send letters to the worker,
+        # negotiated while the worker is accepted.
+        self._codec = Letter.CODEC_JSON
+        self._compress = Letter.COMPRESS_NONE
+
+        # Called while load or state of the worker is changed.
+        self._listener = None  # type: Optional[Callable[[Worker], None]]
+
+        self._max = 0
         self.inProcTask = TaskGroup()
+
+        # Number of tasks that assigned to the worker
+        # but still on the way to it.
+        self._reserved = 0
         self.menus = []  # type: List[Tuple[str, str]]
         self.ident = ident
         self.needUpdate = False
@@ -103,6 +117,21 @@ class Worker:
 
         self._reader, self._writer = stream
 
+        self._sendQ.close()
+        self._sendQ = SendQueue(self._writer)
+
+    def codec(self) -> str:
+        return self._codec
+
+    def setCodec(self, codec: str) -> None:
+        self._codec = codec
+
+    def compress(self) -> str:
+        return self._compress
+
+    def setCompress(self, compress: str) -> None:
+        self._compress = compress
+
     def waitCounter(self) -> int:
         self._counterSync()
         return self.counters[Worker.STATE_WAITING]
@@ -126,6 +155,16 @@ class Worker:
         self.state = s
         self._clock = datetime.utcnow()
 
+        self._changed()
+
+    def setListener(self, listener: Optional[Callable[['Worker'], None]]) \
+            -> None:
+        self._listener = listener
+
+    def _changed(self) -> None:
+        if self._listener is not None:
+            self._listener(self)
+
     def getAddress(self) -> str:
         return self.address
 
@@ -148,7 +187,7 @@ class Worker:
         return self.inProcTask.numOfTasks() == 0
 
     def isAbleToAccept(self) -> bool:
-        return self.inProcTask.numOfTasks() < self.max
+        return self.inProcTask.numOfTasks() + self._reserved < self.max
 
     def searchTask(self, tid: str) -> Optional[Task]:
         return self.inProcTask.search(tid)
@@ -158,12 +197,23 @@ class Worker:
 
     def removeTask(self, tid: str) -> None:
         self.inProcTask.remove(tid)
+        self._changed()
 
     def removeTaskWithCond(self, predicate: Callable[[Task], bool]) -> None:
-        return self.inProcTask.removeTasks(predicate)
+        self.inProcTask.removeTasks(predicate)
+        self._changed()
+
+    @property
+    def max(self) -> int:
+        return self._max
+
+    @max.setter
+    def max(self, max: int) -> None:
+        self.setMax(max)
 
     def setMax(self, max: int) -> None:
-        self.max = max
+        self._max = max
+        self._changed()
 
     def maxNumOfTask(self) -> int:
         return self.max
@@ -171,6 +221,26 @@ class Worker:
     def numOfTaskProc(self) -> int:
         return self.inProcTask.numOfTasks()
 
+    def load(self) -> float:
+        if self.max <= 0:
+            return float("inf")
+        return (self.inProcTask.numOfTasks() + self._reserved) / self.max
+
+    def reserve(self) -> None:
+        """
+        Occupy capacity for a task before it's sent
+        so the worker is not chosen over its capacity.
+        """
+        self._reserved += 1
+        self._changed()
+
+    def release(self) -> None:
+        self._reserved -= 1
+        self._changed()
+
+    def numOfReserved(self) -> int:
+        return self._reserved
+
     def isMerger(self) -> bool:
         return self._role == Worker.ROLE_MERGER
 
@@ -190,6 +260,7 @@ class Worker:
         task.toProcState()
 
         self.inProcTask.newTask(task)
+        self._changed()
 
     async def sendLetter(self, letter: Letter) -> None:
         await self._send(letter)
@@ -210,6 +281,7 @@ class Worker:
 
         # Remove task from this worker
         self.inProcTask.remove(id)
+        self._changed()
 
         cmd = JobCancelCommand(id)
         await self.control(cmd)
@@ -229,15 +301,16 @@ class Worker:
         return await letter_receving(reader, timeout=timeout)
 
     @staticmethod
-    async def sending(writer: asyncio.StreamWriter, letter: Letter) -> None:
-        return await letter_sending(writer, letter)
+    async def sending(writer: asyncio.StreamWriter, letter: Letter,
+                      codec: str = Letter.CODEC_JSON) -> None:
+        return await letter_sending(writer, letter, codec=codec)
 
     async def _recv(self, timeout=None) -> Optional[Letter]:
         return await Worker.receving(self._reader, timeout=timeout)
 
     async def _send(self, letter: Letter) -> None:
         try:
-            await Worker.sending(self._writer, letter)
+            await self._sendQ.send(letter, self._codec, self._compress)
         except Exception:
             traceback.print_exc()
 
@@ -24,7 +24,9 @@
 #
 # Maintain connection with workers
 
+import heapq
 import asyncio
+import itertools
 
 from datetime import datetime
 from manager.basic.observer import Subject, Observer
@@ -36,7 +38,8 @@ from manager.master.task import Task
 from typing import Tuple, Callable, Any, List, Dict, Optional, cast
 from manager.basic.info import M_NAME as INFO_M_NAME
 from manager.basic.commands import AcceptCommand, AcceptRstCommand
-from manager.basic.letter import receving, PropLetter
+from manager.basic.letter import receving, PropLetter, codec_negotiate, \
+    compress_negotiate
 
 M_NAME = "WorkerRoom"
 
@@ -49,6 +52,65 @@ filterFunc = Callable[[List[Worker]], List[Worker]]
 wrLog = "wrLog"
 
 
+class WorkerIndex:
+    """
+    Online workers of a role, workers that able to accept
+    tasks are ordered by load in a heap so the least loaded
+    one is found without scanning all workers.
+
+    Entry of a worker is replaced while the worker changed,
+    replaced entries are dropped from the heap lazily.
+    """
+
+    def __init__(self) -> None:
+        self._online = {}  # type: Dict[str, Worker]
+        self._entries = {}  # type: Dict[str, Tuple[float, int, str]]
+        self._heap = []  # type: List[Tuple[float, int, str]]
+        self._seq = itertools.count()
+
+    def update(self, worker: Worker) -> None:
+        ident = worker.getIdent()
+
+        if not worker.isOnline():
+            self.remove(ident)
+            return
+
+        self._online[ident] = worker
+
+        if not worker.isAbleToAccept():
+            self._entries.pop(ident, None)
+            return
+
+        entry = (worker.load(), next(self._seq), ident)
+        self._entries[ident] = entry
+        heapq.heappush(self._heap, entry)
+
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = list(self._entries.values())
+            heapq.heapify(self._heap)
+
+    def remove(self, ident: str) -> None:
+        self._online.pop(ident, None)
+        self._entries.pop(ident, None)
+
+    def least(self) -> Optional[Worker]:
+        heap = self._heap
+
+        while heap:
+            entry = heap[0]
+            if self._entries.get(entry[2]) is entry:
+                return self._online[entry[2]]
+            heapq.heappop(heap)
+
+        return None
+
+    def online(self) -> List[Worker]:
+        return list(self._online.values())
+
+    def numOfAcceptable(self) -> int:
+        return len(self._entries)
+
+
 class WorkerRoom(ModuleDaemon, Subject, Observer):
 
     NOTIFY_LOG = "log"
@@ -83,6 +145,12 @@ class WorkerRoom(ModuleDaemon, Subject, Observer):
         # _workers is a collection of workers in online state
         self._workers = {}  # type: Dict[str, Worker]
 
+        # Index of workers by role
+        self._indexes = {
+            Worker.ROLE_NORMAL: WorkerIndex(),
+            Worker.ROLE_MERGER: WorkerIndex()
+        }  # type: Dict[int, WorkerIndex]
+
         # Lock to protect _workers_waiting
         self._lock = asyncio.Lock()
 
@@ -137,6 +205,10 @@ class WorkerRoom(ModuleDaemon, Subject, Observer):
             w_ident = cast(PropLetter, propLetter).getIdent()
             role = cast(PropLetter, propLetter).getRole()
             max = int(cast(PropLetter, propLetter).getMax())
+            codec = codec_negotiate(
+                cast(PropLetter, propLetter).getCodecs())
+            compress = compress_negotiate(
+                cast(PropLetter, propLetter).getCompress())
 
             if role == "MERGER":
                 role_v = Worker.ROLE_MERGER
@@ -146,6 +218,8 @@ class WorkerRoom(ModuleDaemon, Subject, Observer):
             arrived_worker = Worker(w_ident, r, w, role_v)
             arrived_worker.setState(Worker.STATE_ONLINE)
             arrived_worker.setMax(max)
+            arrived_worker.setCodec(codec)
+            arrived_worker.setCompress(compress)
 
             await self._WR_LOG("Worker " + w_ident + " is connected")
 
@@ -167,6 +241,8 @@ class WorkerRoom(ModuleDaemon, Subject, Observer):
             # change to acceptedWorker
             workerInWait = self._workers_waiting[w_ident]
             workerInWait.setStream(arrived_worker.getStream())
+            workerInWait.setCodec(codec)
+            workerInWait.setCompress(compress)
 
             # Note: Need to setup worker's status before listener
             #       address update otherwise
@@ -181,7 +257,7 @@ class WorkerRoom(ModuleDaemon, Subject, Observer):
 
             # Send an accept command to the worker
             # so it able to transfer message.
-            await workerInWait.control(AcceptCommand())
+            await workerInWait.control(AcceptCommand(codec, compress))
 
             await self._WR_LOG("Worker " + w_ident + " is reconnect")
 
@@ -193,7 +269,7 @@ class WorkerRoom(ModuleDaemon, Subject, Observer):
 
         # Need to reset the accepted worker
         # before it transfer any messages.
-        await arrived_worker.control(AcceptRstCommand())
+        await arrived_worker.control(AcceptRstCommand(codec, compress))
 
         self.addWorker(arrived_worker)
         await self.notify(WorkerRoom.NOTIFY_CONN, arrived_worker)
@@ -307,6 +383,20 @@ class WorkerRoom(ModuleDaemon, Subject, Observer):
     def getWorkers(self) -> List[Worker]:
         return list(self._workers.values())
 
+    def leastLoaded(self, role: int) -> Optional[Worker]:
+        """
+        Online worker of the role that is able to accept
+        task and with the lowest load.
+        """
+        return self._indexes[role].least()
+
+    def onlineWorkers(self, role: int) -> List[Worker]:
+        return self._indexes[role].online()
+
+    def _workerChanged(self, w: Worker) -> None:
+        if self._workers.get(w.getIdent()) is w:
+            self._indexes[w._role].update(w)
+
     def addWorker(self, w: Worker) -> State:
         ident = w.getIdent()
         if ident in self._workers:
@@ -316,6 +406,9 @@ class WorkerRoom(ModuleDaemon, Subject, Observer):
         self.numOfWorkers += 1
         self._changePoint()
 
+        w.setListener(self._workerChanged)
+        self._indexes[w._role].update(w)
+
         return Ok
 
     def isExists(self, ident: str) -> bool:
@@ -358,6 +451,10 @@ class WorkerRoom(ModuleDaemon, Subject, Observer):
         if ident not in self._workers:
             return Error
 
+        w = self._workers[ident]
+        w.setListener(None)
+        self._indexes[w._role].remove(ident)
+
         del self._workers[ident]
         self.numOfWorkers -= 1
         self._changePoint()
@@ -97,6 +97,7 @@ class JobHistory(models.Model):
     """
     unique_id = models.BigIntegerField(primary_key=True)
     job = models.CharField(max_length=100)
+    cmdid = models.CharField(max_length=50, default="")
     filePath = models.CharField(max_length=128, default="")
     dateTime = models.DateTimeField(default=timezone.now)
 
@@ -126,6 +127,10 @@ class TaskHistory(models.Model):
     jobhistory = models.ForeignKey(JobHistory, on_delete=models.CASCADE)
     task_name = models.CharField(max_length=64)
     state = models.CharField(max_length=10)
+    # Worker that processed the task and seconds it taken,
+    # used to predict duration of the task.
+    worker = models.CharField(max_length=64, default="")
+    duration = models.FloatField(default=0)
 
 
 def infoBetweenRev(rev1: str, rev2: str) -> List[str]:
@@ -27,7 +27,10 @@ from manager.master.TestCases.eventListenerTestCases import \
     EventListenerTestCases
 
 from manager.master.TestCases.dispatcherTestCases import \
-    WaitAreaTestCases, DispatcherUnitTest
+    WaitAreaTestCases, FairScheduleTestCases, DispatcherUnitTest
+
+from manager.master.TestCases.durationModelTestCases import \
+    DurationModelTestCases
 
 from manager.master.task import \
     TaskTestCases
@@ -86,6 +89,15 @@ from manager.basic.TestCases.notifyTestCases import \
 from manager.basic.TestCases.dataLinkTestCases import \
     DataLinkerTestCases
 
+from manager.basic.TestCases.sendQueueTestCases import \
+    SendQueueTestCases
+
+from manager.basic.TestCases.transferTestCases import \
+    TransferTestCases
+
+from manager.basic.TestCases.deltaTestCases import \
+    DeltaTestCases
+
 from manager.worker.TestCases.monitorTestCases import \
     MonitorTestCase
 
@@ -116,3 +128,9 @@ from manager.worker.TestCases.linkTestCases import \
 
 from manager.worker.TestCases.linkerTestCases import \
     LinkerTestCases
+
+from manager.worker.TestCases.dataLinkPoolTestCases import \
+    DataLinkPoolTestCases
+
+from manager.worker.TestCases.postIndexTestCases import \
+    PostIndexTestCases
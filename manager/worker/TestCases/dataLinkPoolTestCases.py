@@ -0,0 +1,122 @@
+# MIT License
+#
+# Copyright (c) 2020 Gcom
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# dataLinkPoolTestCases.py
+
+import os
+import asyncio
+import unittest
+import typing as T
+
+from manager.basic.letter import BinaryStreamLetter, sending_stream, \
+    receving
+from manager.basic.transfer import TransferSession, TransferTable
+from manager.worker.dataLinkPool import DataLinkPool
+
+
+class DataLinkPoolTestCases(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self) -> None:
+        self.conns = []  # type: T.List[asyncio.StreamWriter]
+        self.files = []  # type: T.List[str]
+        self.sessions = TransferTable()
+
+        self.path = "./pool_file"
+        with open(self.path, "wb") as f:
+            f.write(os.urandom(2 ** 16))
+
+        self.server = await asyncio.start_server(
+            self.datalink, "127.0.0.1", 3505)
+        self.pool = DataLinkPool(maxIdle=2, idleTimeout=0.5)
+
+    async def asyncTearDown(self) -> None:
+        self.pool.close()
+        self.server.close()
+        await self.server.wait_closed()
+        os.remove(self.path)
+
+    async def datalink(self, reader: asyncio.StreamReader,
+                       writer: asyncio.StreamWriter) -> None:
+        self.conns.append(writer)
+
+        while True:
+            try:
+                letter = T.cast(BinaryStreamLetter, await receving(reader))
+                letter.bindStream(reader, writer)
+
+                session = await self.sessions.receive(
+                    letter, lambda: (open(os.devnull, "wb"), os.devnull))
+                self.files.append(T.cast(TransferSession, session).tid)
+            except Exception:
+                writer.close()
+                break
+
+    async def upload(self, tid: str) -> None:
+        conn = await self.pool.acquire("127.0.0.1", 3505)
+        await sending_stream(conn.writer, self.path, tid, "v1", "file",
+                             reader=conn.reader)
+        self.pool.release("127.0.0.1", 3505, conn)
+
+    async def test_DataLinkPool_Reuse(self) -> None:
+        # Exercise
+        for n in range(5):
+            await self.upload("tid_" + str(n))
+
+        # Verify
+        self.assertEqual(1, len(self.conns))
+        self.assertEqual(5, len(self.files))
+        self.assertEqual(1, self.pool.numOfIdle("127.0.0.1", 3505))
+
+    async def test_DataLinkPool_ClosedByTarget(self) -> None:
+        # Setup
+        await self.upload("tid_1")
+
+        # Exercise
+        self.conns[0].close()
+        await asyncio.sleep(0.1)
+        await self.upload("tid_2")
+
+        # Verify
+        self.assertEqual(2, len(self.conns))
+        self.assertEqual(2, len(self.files))
+
+    async def test_DataLinkPool_IdleEviction(self) -> None:
+        # Setup
+        await asyncio.gather(self.upload("tid_1"), self.upload("tid_2"),
+                             self.upload("tid_3"))
+        self.assertEqual(2, self.pool.numOfIdle("127.0.0.1", 3505))
+
+        # Exercise
+        await asyncio.sleep(1)
+
+        # Verify
+        self.assertEqual(0, self.pool.numOfIdle("127.0.0.1", 3505))
+
+    async def test_DataLinkPool_Unreusable(self) -> None:
+        # Exercise
+        conn = await self.pool.acquire("127.0.0.1", 3505)
+        self.pool.release("127.0.0.1", 3505, conn, False)
+
+        # Verify
+        self.assertEqual(0, self.pool.numOfIdle("127.0.0.1", 3505))
+        self.assertTrue(conn.writer.is_closing())
@@ -0,0 +1,148 @@
+# MIT License
+#
+# Copyright (c) 2020 Gcom
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# postIndexTestCases.py
+
+import os
+import shutil
+import asyncio
+import unittest
+import typing as T
+
+from manager.basic.letter import BinaryStreamLetter, sending_file, \
+    querying_file, file_checksum, receving
+from manager.basic.dataLink import DataLinkNotify
+from manager.worker.datalink import binaryStore, binaryStreamStore, \
+    post_file_create
+
+
+class DataLinkRecorder:
+
+    def __init__(self) -> None:
+        self.notifies = []  # type: T.List[T.Any]
+
+    def notify(self, notify: DataLinkNotify) -> None:
+        self.notifies.append(notify.msg)
+
+    def isReusePort(self) -> bool:
+        return False
+
+
+class PostIndexTestCases(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self) -> None:
+        for attr in ["sessions", "index"]:
+            if hasattr(binaryStreamStore, attr):
+                delattr(binaryStreamStore, attr)
+
+        self.dl = DataLinkRecorder()
+        self.post_dir = "./PostIndex"
+
+        self.path = "./post_index_file"
+        with open(self.path, "wb") as f:
+            f.write(os.urandom(2 ** 16))
+        self.size, self.checksum = file_checksum(self.path)
+
+        self.server = await asyncio.start_server(
+            self.datalink, "127.0.0.1", 3506)
+
+    async def asyncTearDown(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+        os.remove(self.path)
+
+        if os.path.exists(self.post_dir):
+            shutil.rmtree(self.post_dir)
+
+    async def datalink(self, reader: asyncio.StreamReader,
+                       writer: asyncio.StreamWriter) -> None:
+        while True:
+            try:
+                letter = T.cast(BinaryStreamLetter, await receving(reader))
+                letter.bindStream(reader, writer)
+                await binaryStore(self.dl, letter,  # type: ignore
+                                  self.post_dir)
+            except Exception:
+                writer.close()
+                break
+
+    def letter(self, tid: str, version: str) -> BinaryStreamLetter:
+        return BinaryStreamLetter(tid, "file", version, self.size,
+                                  self.checksum, resume=True)
+
+    async def test_PostIndex_SkipUpload(self) -> None:
+        r, w = await asyncio.open_connection("127.0.0.1", 3506)
+
+        # Exercise
+        have = await querying_file(w, r, self.letter("tid_1", "v1"))
+        self.assertFalse(have)
+        await sending_file(w, self.letter("tid_1", "v1"), self.path, r)
+
+        have = await querying_file(w, r, self.letter("tid_2", "v2"))
+        w.close()
+
+        # Verify
+        self.assertTrue(have)
+        self.assertEqual([("v1", "tid_1", "file"), ("v2", "tid_2", "file")],
+                         self.dl.notifies)
+        self.assertTrue(os.path.samefile(self.post_dir + "/v1/file",
+                                         self.post_dir + "/v2/file"))
+
+        # Content of v2 outlive v1 after v1 is merged.
+        shutil.rmtree(self.post_dir + "/v1")
+        self.assertEqual((self.size, self.checksum),
+                         file_checksum(self.post_dir + "/v2/file"))
+
+    async def test_PostIndex_Removed(self) -> None:
+        # Setup
+        r, w = await asyncio.open_connection("127.0.0.1", 3506)
+        await sending_file(w, self.letter("tid_1", "v1"), self.path, r)
+        shutil.rmtree(self.post_dir + "/v1")
+
+        # Exercise
+        have = await querying_file(w, r, self.letter("tid_2", "v2"))
+        w.close()
+
+        # Verify
+        self.assertFalse(have)
+        self.assertEqual(0, len(binaryStreamStore.index))  # type: ignore
+
+    async def test_PostIndex_Rewritten(self) -> None:
+        # Setup
+        r, w = await asyncio.open_connection("127.0.0.1", 3506)
+        await sending_file(w, self.letter("tid_1", "v1"), self.path, r)
+
+        # Exercise
+        # Path of the file is rewritten with another
+        # content of the same size.
+        fd = T.cast(T.BinaryIO, post_file_create(self.post_dir, "v1", "file"))
+        fd.write(os.urandom(self.size))
+        fd.close()
+
+        have = await querying_file(w, r, self.letter("tid_2", "v2"))
+        w.close()
+
+        # Verify
+        self.assertFalse(have)
+        self.assertFalse(os.path.exists(self.post_dir + "/v2/file"))
+        self.assertEqual(0, len(binaryStreamStore.index))  # type: ignore
@@ -20,8 +20,10 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import os
 import asyncio
 import typing
+import tempfile
 import platform
 import traceback
 import abc
@@ -30,13 +32,16 @@ import multiprocessing
 
 from datetime import datetime
 from manager.basic.storage import Storage
-from manager.basic.letter import BinaryLetter, sending_sock
-from socket import socket
-from concurrent.futures import ProcessPoolExecutor
+from manager.basic.letter import sending_file, querying_file, \
+    querying_delta, file_checksum, BinaryStreamLetter, STREAM_REFUSED
+from manager.basic import delta
 from datetime import datetime
 from manager.worker.channel import ChannelReceiver
-from manager.basic.letter import receving, sending, HeartbeatLetter, Letter,\
-    PropLetter
+from manager.basic.letter import receving, HeartbeatLetter, Letter,\
+    PropLetter, CommandLetter, SUPPORTED_CODECS, SUPPORTED_COMPRESS
+from manager.basic.commands import CMD_ACCEPT, CMD_ACCEPT_RST
+from manager.basic.sendQueue import SendQueue
+from manager.worker.dataLinkPool import DataLinkPool
 
 
 class Link:
@@ -58,6 +63,7 @@ class Link:
         self.ident = ident
         self.reader = reader
         self.writer = writer
+        self.sendQ = SendQueue(writer)
         self.hbCount = 0
         self.isActive = isActive
         self.state = Link.CONNECTED
@@ -65,6 +71,15 @@ class Link:
         self.host = host
         self.port = port
 
+        # Codec to send letters, JSON is understood
+        # by all masters, switch to another codec
+        # only after master accepted it.
+        self.codec = Letter.CODEC_JSON
+        self.compress = Letter.COMPRESS_NONE
+
+    async def send(self, letter: Letter) -> None:
+        await self.sendQ.send(letter, self.codec, self.compress)
+
     def hb_timeer_udpate(self) -> None:
         self.last = datetime.utcnow()
 
@@ -74,13 +89,22 @@ class Link:
 
 class Linker:
 
+    # Number of times to resume a transfer that is
+    # interrupted and delay between them.
+    SENDFILE_RETRY = 5
+    SENDFILE_RETRY_DELAY = 3
+
+    # Delta larger than this ratio of the file is
+    # given up, the file is transfered instead.
+    DELTA_RATIO = 0.5
+
     def __init__(self) -> None:
         self._links = {}  # type: typing.Dict[str, Link]
         self._links_passive = {}  # type: typing.Dict[str, Link]
         self._lis = {}  # type: typing.Dict[str, typing.Any]
         self.msg_callback = None  # type: typing.Optional[typing.Callable]
         self._loop = asyncio.get_running_loop()
-        self._lock = asyncio.Lock()
+        self._dataLinks = DataLinkPool()
 
         assert(cfg.config is not None)
         self._hostname = cfg.config.getConfig('WORKER_NAME')
@@ -116,7 +140,11 @@ class Linker:
         link.hbCount = 0
         link.reader = reader
         link.writer = writer
+        link.sendQ.close()
+        link.sendQ = SendQueue(writer)
         link.state = Link.CONNECTED
+        link.codec = Letter.CODEC_JSON
+        link.compress = Letter.COMPRESS_NONE
 
         self._loop.create_task(self._active_link(reader, writer, link.ident))
 
@@ -131,15 +159,22 @@ class Linker:
         max_proc_job = cfg.config.getConfig('MAX_TASK_CAN_PROC')
         role = cfg.config.getConfig('ROLE')
 
+        # Compression is offered only if it's enabled.
+        if cfg.config.getConfig('LINK_COMPRESS') is True:
+            compress = SUPPORTED_COMPRESS
+        else:
+            compress = []
+
         try:
             # Send Property LEtter
             # RST command will sended by master
             # so proc must be 0.
-            await sending(writer, PropLetter(
-                self._hostname, max_proc_job, str(0), role))
+            await link.send(PropLetter(
+                self._hostname, max_proc_job, str(0), role,
+                codecs=SUPPORTED_CODECS, compress=compress))
 
             # Send First heartbeat
-            await sending(writer, HeartbeatLetter(self._hostname, 0))
+            await link.send(HeartbeatLetter(self._hostname, 0))
             # Update timer
             link.hb_timeer_udpate()
 
@@ -173,10 +208,34 @@ class Linker:
                 link.hb_timeer_udpate()
                 await self.heartbeat_proc_active(linkid, letter)
             else:
+                if isinstance(letter, CommandLetter):
+                    self._codec_update(link, letter)
+
                 if self.msg_callback is None:
                     raise LINK_MSG_CALLBACK_NOT_EXISTS()
                 await self.msg_callback(letter)
 
+    @staticmethod
+    def _codec_update(link: Link, letter: CommandLetter) -> None:
+        """
+        Accept command carry the codec and the compression that
+        master is able to decode. Older masters do not carry it.
+        """
+        if letter.getType() not in [CMD_ACCEPT, CMD_ACCEPT_RST]:
+            return
+
+        codec = letter.content_('codec')
+        if codec in SUPPORTED_CODECS:
+            link.codec = codec
+        else:
+            link.codec = Letter.CODEC_JSON
+
+        compress = letter.content_('compress')
+        if compress in SUPPORTED_COMPRESS:
+            link.compress = compress
+        else:
+            link.compress = Letter.COMPRESS_NONE
+
     def _link_rebuild_helper(self, linkid: str) -> None:
         link = self._links[linkid]
         link.writer.close()
@@ -240,64 +299,167 @@ class Linker:
         except KeyError:
             raise LINK_NOT_EXISTS(linkid)
 
-        await sending(link.writer, letter, lock=self._lock)
+        await link.send(letter)
 
-    @staticmethod
-    def _do_send_file(sock: socket, path: str, tid: str,
-                      version: str, fileName: str) -> bool:
-
-        try:
-            with open(path, "rb") as f:
-                while True:
-                    bytes = f.read(1024)
-                    if not bytes:
-                        break
+    async def sendfile(self, linkid: str, tid: str, path: str,
+                       version: str, fileName: str) -> bool:
+        """
+        First, borrow a datalink to target from the pool
+        then transfer file.
 
-                    bLetter = BinaryLetter(
-                        tid=tid, bStr=bytes,
-                        parent=version, fileName=fileName)
+        File not smaller than UPLOAD_STREAM_THRES is split into
+        UPLOAD_STREAMS ranges that are transfered in parallel,
+        the whole file is transfered if target refuse ranges.
 
-                    sending_sock(sock, bLetter)
+        Transfer is skipped if target already have the file,
+        if target have last version of the file only delta of
+        the file is transfered.
+        """
+        assert(cfg.config is not None)
+        if linkid == 'Master':
+            address = cfg.config.getConfig('MASTER_ADDRESS')
+        elif linkid == 'Poster':
+            address = cfg.config.getConfig('MERGER_ADDRESS')
 
-            lastLetter = BinaryLetter(
-                tid=tid, bStr=b"",
-                parent=version, fileName=fileName)
-            sending_sock(sock, lastLetter)
+        host, port = address['host'], address['dataPort']
 
+        try:
+            size, checksum = await self._loop.run_in_executor(
+                None, file_checksum, path)
         except Exception:
-            import traceback
             traceback.print_exc()
             return False
 
-        return True
+        streams = cfg.config.getConfig('UPLOAD_STREAMS')
+        thres = cfg.config.getConfig('UPLOAD_STREAM_THRES')
 
-    async def sendfile(self, linkid: str, tid: str, path: str,
-                       version: str, fileName: str) -> bool:
+        if streams != "" and thres != "" and \
+           int(streams) > 1 and size >= int(thres):
+            letters = BinaryStreamLetter.ranges(
+                tid, fileName, version, size, checksum, int(streams))
+        else:
+            letters = [BinaryStreamLetter(
+                tid, fileName, version, size, checksum, resume=True)]
+
+        useDelta = cfg.config.getConfig('UPLOAD_DELTA') in ["", True]
+
+        have, base, sig = await self._queryfile(
+            host, port, letters[0], useDelta)
+        if have:
+            return True
+
+        if base is not None and sig is not None and \
+           await self._senddelta(host, port, path, letters[0], base, sig):
+            return True
+
+        results = await asyncio.gather(
+            *[self._sendfile(host, port, path, letter) for letter in letters],
+            return_exceptions=True)
+
+        if any(isinstance(r, STREAM_REFUSED) for r in results):
+            return await self._sendfile(host, port, path, BinaryStreamLetter(
+                tid, fileName, version, size, checksum, resume=True))
+
+        return all(r is True for r in results)
+
+    async def _queryfile(self, host: str, port: int,
+                         letter: BinaryStreamLetter, useDelta: bool) \
+            -> typing.Tuple[bool, typing.Optional[str],
+                            typing.Optional[bytes]]:
         """
-        First, open a datalink to target then transfer file.
+        Ask target whether it have the file, the file is
+        transfered if target is unable to answer.
         """
-        assert(cfg.config is not None)
-        if linkid == 'Master':
-            address = cfg.config.getConfig('MASTER_ADDRESS')
-        elif linkid == 'Poster':
-            address = cfg.config.getConfig('MERGER_ADDRESS')
-        r, w = await asyncio.open_connection(
-            address['host'], address['dataPort'])
-        sock = w.transport.get_extra_info('socket')
         try:
-            with ProcessPoolExecutor() as e:
-                await self._loop.run_in_executor(
-                    e, self._do_send_file, sock._sock,
-                    path, tid, version, fileName)
+            conn = await self._dataLinks.acquire(host, port)
+        except Exception:
+            return False, None, None
+
+        try:
+            if useDelta:
+                answer = await querying_delta(
+                    conn.writer, conn.reader, letter)
+            else:
+                answer = (await querying_file(
+                    conn.writer, conn.reader, letter), None, None)
+        except Exception:
+            self._dataLinks.release(host, port, conn, False)
+            return False, None, None
+
+        self._dataLinks.release(host, port, conn)
 
-            # Close DataLink
-            w.close()
+        return answer
 
+    async def _senddelta(self, host: str, port: int, path: str,
+                         letter: BinaryStreamLetter, base: str,
+                         sig: bytes) -> bool:
+        """
+        Transfer delta of the file against base, False is
+        returned if delta is not small enough or target failed
+        to rebuild the file from it.
+        """
+        fd, deltaPath = tempfile.mkstemp()
+
+        try:
+            with os.fdopen(fd, "wb") as out:
+                size = await self._loop.run_in_executor(
+                    None, delta.delta, path, sig, out, self.DELTA_RATIO)
+            if size is None:
+                return False
+
+            return await self._sendfile(
+                host, port, deltaPath, BinaryStreamLetter(
+                    letter.getTid(), letter.getFileName(),
+                    letter.getParent(), size, letter.getChecksum(),
+                    resume=True, base=base))
         except Exception:
             traceback.print_exc()
             return False
+        finally:
+            os.remove(deltaPath)
 
-        return True
+    async def _sendfile(self, host: str, port: int, path: str,
+                        letter: BinaryStreamLetter) -> bool:
+        """
+        Transfer interrupted by a broken datalink is resumed
+        from offset the target confirmed via a new datalink.
+
+        STREAM_REFUSED is raised if target refuse the range.
+        """
+        retry = 0
+        while True:
+            try:
+                conn = await self._dataLinks.acquire(host, port)
+                try:
+                    await sending_file(conn.writer, letter, path,
+                                       reader=conn.reader)
+                except STREAM_REFUSED:
+                    # Nothing of the range is sent.
+                    self._dataLinks.release(host, port, conn)
+                    raise
+                except BaseException:
+                    # State of the DataLink is unknown.
+                    self._dataLinks.release(host, port, conn, False)
+                    raise
+
+                self._dataLinks.release(host, port, conn)
+
+                return True
+
+            except (ConnectionError, asyncio.exceptions.TimeoutError):
+                traceback.print_exc()
+
+                retry += 1
+                if retry > self.SENDFILE_RETRY:
+                    return False
+                await asyncio.sleep(self.SENDFILE_RETRY_DELAY)
+
+            except STREAM_REFUSED:
+                raise
+
+            except Exception:
+                traceback.print_exc()
+                return False
 
     async def heartbeat_proc_active(self, linkid: str,
                                     heartbeat: HeartbeatLetter) -> None:
@@ -327,7 +489,7 @@ class Linker:
         link.hbCount += 1
 
         heartbeat.setIdent(self._hostname)
-        await sending(link.writer, heartbeat)
+        await link.send(heartbeat)
 
     async def _next_heartbeat(self, link: Link, delay: int) -> None:
         await asyncio.sleep(delay)
@@ -335,7 +497,7 @@ class Linker:
         hb = HeartbeatLetter(self._hostname, link.hbCount)
 
         try:
-            await sending(link.writer, hb)
+            await link.send(hb)
         except ConnectionError:
             # Just return
             # that link will be rebuild while timer
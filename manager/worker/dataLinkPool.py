@@ -0,0 +1,137 @@
+# MIT License
+#
+# Copyright (c) 2020 Gcom
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# dataLinkPool.py
+#
+# Reusable data connections from a worker to DataLinks
+# of master and merger.
+
+import time
+import asyncio
+import typing as T
+from collections import namedtuple
+
+
+DataConn = namedtuple("DataConn", "reader writer")
+Target = T.Tuple[str, int]
+
+
+class DataLinkPool:
+    """
+    Idle data connections keyed by target, a connection
+    is returned to the pool after a transfer so the next
+    transfer to the target skip connect and slow start.
+
+    Connections that are closed by target or idle longer
+    than IDLE_TIMEOUT are dropped.
+    """
+
+    MAX_IDLE = 4
+    IDLE_TIMEOUT = 60
+
+    def __init__(self, maxIdle: int = MAX_IDLE,
+                 idleTimeout: float = IDLE_TIMEOUT) -> None:
+        self._maxIdle = maxIdle
+        self._idleTimeout = idleTimeout
+        self._idle = {}  # type: T.Dict[Target, T.List[T.Tuple[DataConn, float]]]
+        self._timer = None  # type: T.Optional[asyncio.TimerHandle]
+
+    async def acquire(self, host: str, port: int) -> DataConn:
+        self.evict()
+
+        idle = self._idle.get((host, port), [])
+        while idle:
+            conn, _ = idle.pop()
+            if self.isHealthy(conn):
+                return conn
+            conn.writer.close()
+
+        reader, writer = await asyncio.open_connection(host, port)
+        return DataConn(reader, writer)
+
+    def release(self, host: str, port: int, conn: DataConn,
+                reusable: bool = True) -> None:
+        """
+        Return a connection to the pool, connection that
+        broken or in unknown state should not be reusable.
+        """
+        idle = self._idle.setdefault((host, port), [])
+
+        if not reusable or not self.isHealthy(conn) or \
+           len(idle) >= self._maxIdle:
+            conn.writer.close()
+            return
+
+        idle.append((conn, time.monotonic()))
+        self._schedule_evict()
+
+    @staticmethod
+    def isHealthy(conn: DataConn) -> bool:
+        # A connection closed by target is at eof, data
+        # that buffered while idle means it's out of sync.
+        return not conn.writer.is_closing() and \
+            not conn.reader.at_eof() and \
+            len(conn.reader._buffer) == 0  # type: ignore
+
+    def numOfIdle(self, host: str, port: int) -> int:
+        return len(self._idle.get((host, port), []))
+
+    def evict(self) -> None:
+        now = time.monotonic()
+
+        for target, idle in list(self._idle.items()):
+            alive = []
+            for conn, since in idle:
+                if now - since > self._idleTimeout or \
+                   not self.isHealthy(conn):
+                    conn.writer.close()
+                else:
+                    alive.append((conn, since))
+
+            if alive:
+                self._idle[target] = alive
+            else:
+                del self._idle[target]
+
+    def _schedule_evict(self) -> None:
+        if self._timer is not None:
+            return
+
+        def expired() -> None:
+            self._timer = None
+            self.evict()
+            if self._idle:
+                self._schedule_evict()
+
+        self._timer = asyncio.get_running_loop().call_later(
+            self._idleTimeout, expired)
+
+    def close(self) -> None:
+        for idle in self._idle.values():
+            for conn, _ in idle:
+                conn.writer.close()
+        self._idle = {}
+
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
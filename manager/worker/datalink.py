@@ -21,9 +21,11 @@
 # SOFTWARE.
 
 import os
+import shutil
 import traceback
 from typing import Dict, BinaryIO, Optional, cast, Tuple
-from manager.basic.letter import BinaryLetter
+from manager.basic.letter import BinaryLetter, BinaryStreamLetter
+from manager.basic.transfer import TransferTable
 from manager.basic.dataLink import DataLink, DataLinkNotify
 from manager.worker.processor import Processor
 
@@ -33,7 +35,113 @@ def post_file_create(post_dir: str, version: str, fileName: str) -> Optional[Bin
     if not os.path.exists(path):
         os.makedirs(path)
 
-    return open("/".join([path, fileName]), "wb")
+    path = "/".join([path, fileName])
+
+    # The file may be a link to a file of another version.
+    if os.path.exists(path):
+        os.unlink(path)
+    post_index().forget(path)
+
+    return open(path, "wb")
+
+
+class PostIndex:
+    """
+    Index of files in PostDir by their checksum, files of
+    versions are removed after merged and a path is rewritten
+    by later uploads so an entry is checked before it's used.
+    """
+
+    def __init__(self) -> None:
+        # Checksum to path and identity of the file when it's added.
+        self._files = {}  # type: Dict[str, Tuple[str, Tuple[int, int, int]]]
+        # Path to checksum.
+        self._paths = {}  # type: Dict[str, str]
+
+    @staticmethod
+    def _ident(path: str) -> Tuple[int, int, int]:
+        st = os.stat(path)
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def add(self, checksum: str, path: str) -> None:
+        old = self._paths.pop(path, None)
+        if old is not None:
+            del self._files[old]
+
+        if checksum in self._files:
+            del self._paths[self._files[checksum][0]]
+
+        self._files[checksum] = (path, self._ident(path))
+        self._paths[path] = checksum
+
+    def forget(self, path: str) -> None:
+        """
+        Drop entry of the path, the path is going to be rewritten.
+        """
+        checksum = self._paths.get(path, None)
+        if checksum is not None:
+            self._drop(checksum)
+
+    def _drop(self, checksum: str) -> None:
+        path, _ = self._files.pop(checksum)
+        del self._paths[path]
+
+    def lookup(self, checksum: str, size: int) -> Optional[str]:
+        entry = self._files.get(checksum, None)
+        if entry is None:
+            return None
+
+        path, ident = entry
+
+        # File is removed or rewritten since it's added.
+        try:
+            if self._ident(path) != ident or ident[2] != size:
+                self._drop(checksum)
+                return None
+        except FileNotFoundError:
+            self._drop(checksum)
+            return None
+
+        return path
+
+    def link(self, checksum: str, size: int, post_dir: str,
+             version: str, fileName: str) -> bool:
+        """
+        Reference a file of the checksum as fileName of
+        the version, False is returned if no such file.
+        """
+        src = self.lookup(checksum, size)
+        if src is None:
+            return False
+
+        path = "/".join([post_dir, version])
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+        dst = "/".join([path, fileName])
+        if os.path.exists(dst):
+            if os.path.samefile(src, dst):
+                return True
+            os.unlink(dst)
+
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copyfile(src, dst)
+
+        return True
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+
+def post_index() -> PostIndex:
+    """
+    Index of PostDir that shared by all kind of transfers.
+    """
+    if not hasattr(binaryStreamStore, 'index'):
+        binaryStreamStore.index = PostIndex()  # type: ignore
+    return cast(PostIndex, binaryStreamStore.index)  # type: ignore
 
 
 class POST_BINARY_STORE_FAILED(Exception):
@@ -46,6 +154,9 @@ async def binaryStore(dl: DataLink, bl: BinaryLetter,
     Save binaryfile to to PostDir.
     """
 
+    if isinstance(bl, BinaryStreamLetter):
+        return await binaryStreamStore(dl, bl, post_dir)
+
     try:
         # Cause several file may transfer at the same time
         # so need a dict to keep track of all of in transfered file.
@@ -91,6 +202,62 @@ async def binaryStore(dl: DataLink, bl: BinaryLetter,
         traceback.print_exc()
 
 
+async def binaryStreamStore(dl: DataLink, bl: BinaryStreamLetter,
+                            post_dir: str) -> None:
+    """
+    Save file that follow the BinaryStreamLetter to PostDir,
+    an interrupted transfer is resumed by the next letter of it.
+    """
+    if not hasattr(binaryStreamStore, 'sessions'):
+        binaryStreamStore.sessions = TransferTable()  # type: ignore
+
+    sessions = cast(TransferTable,
+                    binaryStreamStore.sessions)  # type: ignore
+    index = post_index()
+
+    tid = bl.getTid()
+    fileName = bl.getFileName()
+    version = bl.getParent()
+
+    if bl.isQuery():
+        # File already in PostDir is linked instead of transfered.
+        have = index.link(bl.getChecksum(), bl.getSize(),
+                          post_dir, version, fileName)
+        await bl.answer(have)
+
+        if have:
+            dl.notify(DataLinkNotify("BINARY", (version, tid, fileName)))
+        return
+
+    if bl.isRange() and dl.isReusePort():
+        # Ranges of a file may arrive at different processes
+        # which not share sessions of transfers.
+        return await bl.refuse()
+
+    def open_() -> Tuple[BinaryIO, str]:
+        fd = post_file_create(post_dir, version, fileName)
+        if fd is None:
+            raise POST_BINARY_STORE_FAILED()
+        return fd, "/".join([post_dir, version, fileName])
+
+    try:
+        # Sessions of transfers are not shared by processes,
+        # a resumed transfer may arrive at another process.
+        session = await sessions.receive(bl, open_, not dl.isReusePort())
+        if session is None:
+            # Other ranges of the file are in transfer.
+            return
+    except ConnectionError:
+        # Sender is going to resume the transfer.
+        raise
+    except Exception:
+        dl.notify(DataLinkNotify("BINARY", (version, tid, "")))
+        raise
+
+    index.add(session.checksum, session.path)
+    dl.notify(DataLinkNotify("BINARY", (version, tid, fileName)))
+
+
 def binaryStoreNotify(msg: Tuple[str, str, str], proc: Processor) -> None:
     version, tid, fileName = msg[0], msg[1], msg[2]
     bl = BinaryLetter(tid, bStr=b"", fileName=fileName, parent=version)
@@ -232,26 +232,8 @@ async def job_result_transfer(target: str, job: NewLetter,
     result_path = build_dir + "/" + projName + '/' + extra['resultPath']
     fileName = result_path.split("/")[-1]
 
-    await output.sendfile(target, result_path, tid, version, fileName)
-
-
-async def do_job_result_transfer(path, tid: str, linkid: str,
-                                 version: str, fileName: str,
-                                 send_rtn: Callable) -> None:
-    result_file = open(path, "rb")
-
-    for line in result_file:
-        line_bin = BinaryLetter(
-            tid=tid, bStr=line, parent=version,
-            fileName=fileName)
-        line_bin.setHeader("linkid", linkid)
-
-        await send_rtn(line_bin)
-
-    end_bin = BinaryLetter(
-        tid=tid, bStr=b"", parent=version, fileName=fileName)
-    end_bin.setHeader("linkid", linkid)
-    await send_rtn(end_bin)
+    if not await output.sendfile(target, result_path, tid, version, fileName):
+        raise ConnectionError("Failed to transfer result of " + tid)
 
 
 async def job_result_transfer_check_link(
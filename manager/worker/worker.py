@@ -87,9 +87,11 @@ class Worker:
             # Create DataLink
             dataLinker = DataLinker()
 
+            dataLinkProcs = self.cfg.getConfig('DATALINK_PROCS')
             dataLinker.addDataLink(
                 merger_address['host'], merger_address['dataPort'],
-                DataLink.TCP_DATALINK, binaryStore, "./Post")
+                DataLink.TCP_DATALINK, binaryStore, "./Post",
+                1 if dataLinkProcs == "" else int(dataLinkProcs))
             dataLinker.addNotify("BINARY", binaryStoreNotify, processor)
             dataLinker.start()
 